@@ -0,0 +1,216 @@
+"""Stage benchmarks on synthetic orders, with stored throughput baselines.
+
+Every size streams synthetic orders (see synthetic_data.py) through the stages of
+the pipeline chunk by chunk: the cleaning rules, key encoding, the date-dimension
+join and product merge of cleaning.ipynb, the monthly partials of
+create_monthly_data.ipynb, marketing-analysis.py's order preprocessing, category
+aggregation and vertical x channel response matrix, and finally the per-category
+MMModel fits of Model.ipynb. Only the stage calls are timed, not the data generation.
+
+Throughput (rows per second) is compared with benchmarks/baselines.json, and the run
+fails (exit code 1) when a stage falls more than --threshold below its baseline, or
+has no baseline for the size yet.
+Baselines depend on the machine, so record them on the benchmark box first:
+
+    python benchmarks/bench_stages.py --sizes 1M 10M --update
+    python benchmarks/bench_stages.py --sizes 1M 10M
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from cleaning_rules import apply_rules
+from date_dim import join_date_dim
+from key_dictionary import PRODUCT_KEYS, decode_keys, encode_keys
+from mm_model import fit_to_data
+from monthly_aggregates import compute_partials
+import synthetic_data
+
+DASHBOARD_DIR = os.path.join(ROOT_DIR, 'electromart-dashboard', 'electromart-dashboard copy')
+ANALYSIS_SCRIPT = os.path.join(DASHBOARD_DIR, 'src', 'components', 'marketing-analysis.py')
+BASELINE_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'baselines.json')
+
+# Allowed throughput drop below the baseline before a stage counts as a regression
+REGRESSION_THRESHOLD = 0.25
+
+# Keys encoded per chunk: the ones with bounded cardinality (order ids grow with the row count)
+ENCODED_KEYS = ['fsn_id', 'cust_id']
+
+# create_monthly_data.ipynb's order spec
+ORDER_SPEC = {
+    'date': 'order_date',
+    'sum': ['gmv', 'units', 'product_mrp'],
+    'mean': ['deliverybdays', 'deliverycdays', 'sla', 'product_procurement_sla'],
+    'dummies': ['order_payment_type', 'product_analytic_category']
+}
+# Model.ipynb's channels, with SEM, Radio and Other summed into Others
+MM_CHANNELS = ['TV', 'Digital', 'Sponsorship', 'Content Marketing', 'Online marketing', ' Affiliates']
+MM_OTHERS = ['SEM', 'Radio', 'Other']
+
+
+def load_analysis():
+    """marketing-analysis.py as a module (its file name is not importable)."""
+    sys.path.insert(0, os.path.dirname(ANALYSIS_SCRIPT))
+    spec = importlib.util.spec_from_file_location('marketing_analysis', ANALYSIS_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def prepare_orders(chunk):
+    """The type fixes of cleaning.ipynb before the rules run."""
+    chunk['order_date'] = pd.to_datetime(chunk['order_date'])
+    chunk['gmv'] = pd.to_numeric(chunk['gmv'], errors='coerce')
+    for col in ['deliverybdays', 'deliverycdays']:
+        chunk[col] = pd.to_numeric(chunk[col].replace('\\N', 0), errors='coerce')
+    chunk['order_payment_type'] = pd.Categorical(chunk['order_payment_type'])
+    return chunk.drop('pincode', axis=1)
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = {}
+        self.rows = {}
+
+    def run(self, name, rows, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+        self.rows[name] = self.rows.get(name, 0) + int(rows)
+        return result
+
+    def results(self):
+        return {name: {'rows': self.rows[name], 'seconds': round(seconds, 4),
+                       'rows_per_s': round(self.rows[name] / seconds, 1) if seconds > 0 else None}
+                for name, seconds in self.seconds.items()}
+
+
+def fit_category_models(monthly_gmv, media):
+    """Model.ipynb's per-category MMModel fits on monthly GMV and media spend."""
+    channels = media[MM_CHANNELS].assign(Others=media[MM_OTHERS].sum(axis=1)).values
+    return {category: fit_to_data(channels, gmv.values) for category, gmv in monthly_gmv.items()}
+
+
+def run_size(analysis, n_rows, seed=0, chunk_rows=synthetic_data.CHUNK_ROWS):
+    """Time every stage on n_rows synthetic orders. Returns {stage: {rows, seconds, rows_per_s}}."""
+    timer = StageTimer()
+    dim = synthetic_data.build_synthetic_date_dim(seed=seed)
+    media = synthetic_data.generate_media(seed=seed)
+    monthly_gmv = []
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        products = synthetic_data.generate_skus(seed=seed).drop('product_analytic_super_category', axis=1)
+        products = encode_keys(products, ['fsn_id'] + PRODUCT_KEYS, data_dir=data_dir).set_index('fsn_id')
+
+        for chunk in synthetic_data.generate_orders(n_rows, seed, chunk_rows):
+            n = len(chunk)
+            orders, _ = timer.run('clean_orders', n, lambda chunk: apply_rules(prepare_orders(chunk)), chunk)
+            n = len(orders)
+            orders = timer.run('encode_keys', n, encode_keys, orders, ENCODED_KEYS, data_dir=data_dir)
+            orders = timer.run('join_date_dim', n, join_date_dim, orders, dim, 'order_date',
+                               ['Occassion', 'Holiday_Week', 'SaleDay'])
+            orders = timer.run('merge_products', n, lambda orders: decode_keys(
+                pd.merge(orders, products, left_on='fsn_id', right_on='fsn_id', how='left'),
+                PRODUCT_KEYS, data_dir=data_dir), orders)
+            timer.run('monthly_partials', n, compute_partials, orders, ORDER_SPEC)
+            orders = timer.run('preprocess_orders', n, analysis.preprocess_orders, orders)
+            timer.run('aggregate_orders_by_category', n, analysis.aggregate_orders_by_category, orders)
+            timer.run('category_channel_analysis', n, analysis.category_channel_analysis, orders, None, level='vertical')
+
+            monthly_gmv.append(orders.groupby([pd.Grouper(key='order_date', freq='M'), 'product_analytic_category'],
+                                              observed=True)['gmv'].sum())
+
+    monthly_gmv = pd.concat(monthly_gmv).groupby(level=[0, 1]).sum().unstack(fill_value=0)
+    timer.run('mm_fit', monthly_gmv.size, fit_category_models, monthly_gmv, media)
+    return timer.results()
+
+
+def read_baselines(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {'sizes': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_baselines(baselines, path=BASELINE_FILE):
+    baselines['machine'] = {'platform': platform.platform(), 'python': platform.python_version(),
+                            'cpus': os.cpu_count(), 'pandas': pd.__version__, 'numpy': np.__version__}
+    with open(path + '.tmp', 'w') as f:
+        json.dump(baselines, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def regressions(results, baselines, threshold=REGRESSION_THRESHOLD):
+    """
+    (size, stage, throughput, baseline throughput) of the stages slower than the threshold allows,
+    and of the stages without a baseline for their size (baseline throughput None).
+    """
+    slow = []
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            baseline = baselines['sizes'].get(size, {}).get(stage)
+            if baseline is None:
+                slow.append((size, stage, result['rows_per_s'], None))
+                continue
+            if result['rows_per_s'] is None or baseline['rows_per_s'] is None:
+                continue
+            if result['rows_per_s'] < baseline['rows_per_s'] * (1 - threshold):
+                slow.append((size, stage, result['rows_per_s'], baseline['rows_per_s']))
+    return slow
+
+
+def report(results, baselines):
+    print(f"{'Size':<8}{'Stage':<30}{'Rows':>12}{'Seconds':>10}{'Rows/s':>14}{'Baseline':>14}{'Change':>9}")
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            baseline = baselines['sizes'].get(size, {}).get(stage, {}).get('rows_per_s')
+            change = f"{result['rows_per_s'] / baseline - 1:+.0%}" if baseline and result['rows_per_s'] else ''
+            print(f"{size:<8}{stage:<30}{result['rows']:>12}{result['seconds']:>10.3f}"
+                  f"{result['rows_per_s'] or 0:>14,.0f}{baseline or 0:>14,.0f}{change:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the pipeline stages on synthetic orders.')
+    parser.add_argument('--sizes', nargs='+', default=['1M'], help=f'sizes ({", ".join(synthetic_data.SIZES)}) or row counts')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=synthetic_data.CHUNK_ROWS)
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='allowed throughput drop below the baseline (0.25 = 25%%)')
+    parser.add_argument('--baselines', default=BASELINE_FILE)
+    parser.add_argument('--update', action='store_true', help='store the results as the new baselines')
+    args = parser.parse_args(argv)
+
+    analysis = load_analysis()
+    results = {size: run_size(analysis, synthetic_data.size_rows(size), args.seed, args.chunk_rows) for size in args.sizes}
+    baselines = read_baselines(args.baselines)
+    report(results, baselines)
+
+    if args.update:
+        baselines['sizes'].update(results)
+        write_baselines(baselines, args.baselines)
+        print(f'Baselines for {", ".join(results)} written to {args.baselines}')
+        return 0
+
+    slow = regressions(results, baselines, args.threshold)
+    for size, stage, rows_per_s, baseline in slow:
+        if baseline is None:
+            print(f'MISSING BASELINE {size} {stage}: record one with --update')
+        else:
+            print(f'REGRESSION {size} {stage}: {rows_per_s:,.0f} rows/s vs baseline {baseline:,.0f} rows/s')
+    return 1 if slow else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
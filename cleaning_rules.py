@@ -0,0 +1,108 @@
+"""Rule-based row validation for cleaning.ipynb.
+
+Validation rules are declared in one registry, name -> function returning a boolean
+mask of the rows that break the rule. All rules are evaluated as vectorized masks in
+a single pass and the rows breaking any of them are dropped at once, instead of one
+drop (and one rebuilt frame) per rule. Large raw files can be cleaned chunk by chunk.
+
+Every run reports, per rule, how many rows it fired on and how many rows it rejected
+(a row breaking several rules is attributed to the first one in the registry, which is
+the count a chain of drops in that order would remove). Rejected rows can be written
+to a quarantine CSV with the rule that rejected them.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+REJECTED_BY = 'rejected_by'
+
+# Months outside the analysis window
+EXCLUDED_MONTHS = ['2023-05', '2023-06', '2024-07']
+
+
+def outside_timeframe(orders):
+    months = orders['order_date'].values.astype('datetime64[M]')
+    return np.isin(months, np.array(EXCLUDED_MONTHS, dtype='datetime64[M]'))
+
+
+def price_over_mrp(orders):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return orders['product_mrp'] < orders['gmv'] / orders['units']
+
+
+# Order rules, in the order cleaning.ipynb used to apply them
+ORDER_RULES = {
+    'outside_timeframe': outside_timeframe,
+    'negative_delivery': lambda orders: orders['deliverycdays'] < 0,
+    'non_positive_gmv': lambda orders: orders['gmv'] <= 0,
+    'non_positive_units': lambda orders: orders['units'] <= 0,
+    'non_positive_mrp': lambda orders: orders['product_mrp'] <= 0,
+    'price_over_mrp': price_over_mrp
+}
+
+
+def evaluate_rules(frame, rules=ORDER_RULES):
+    """Boolean (rows x rules) array of the rules every row breaks."""
+    masks = np.zeros((len(frame), len(rules)), dtype=bool)
+    for i, rule in enumerate(rules.values()):
+        masks[:, i] = np.asarray(rule(frame), dtype=bool)
+    return masks
+
+
+def rule_stats(masks, rules, rows):
+    """Per-rule counts of rows fired on and rows rejected (by the first rule they break)."""
+    first = np.where(masks.any(axis=1), masks.argmax(axis=1), -1)
+    stats = pd.DataFrame({
+        'fired': masks.sum(axis=0),
+        'rejected': np.bincount(first[first >= 0], minlength=len(rules))
+    }, index=pd.Index(list(rules), name='rule'))
+    stats.loc['total'] = [int(masks.any(axis=1).sum()), int((first >= 0).sum())]
+    stats['share'] = stats['rejected'] / rows if rows else 0.0
+    return stats
+
+
+def write_quarantine(rejected, path, append=False):
+    """Append (or write) rejected rows to a quarantine CSV."""
+    header = not (append and os.path.exists(path))
+    rejected.to_csv(path, mode='a' if append else 'w', header=header)
+
+
+def apply_rules(frame, rules=ORDER_RULES, quarantine=None, append=False):
+    """
+    Drop the rows breaking any rule in one pass.
+    - quarantine: CSV path for the rejected rows, with a rejected_by column
+    Returns the kept rows (original index) and the rule statistics.
+    """
+    masks = evaluate_rules(frame, rules)
+    bad = masks.any(axis=1)
+    if quarantine is not None:
+        rejected = frame[bad].copy()
+        rejected[REJECTED_BY] = np.array(list(rules), dtype=object)[masks[bad].argmax(axis=1)]
+        write_quarantine(rejected, quarantine, append)
+    return frame.take(np.flatnonzero(~bad)), rule_stats(masks, rules, len(frame))
+
+
+def clean_csv(path, prepare=None, rules=ORDER_RULES, chunksize=1000000, quarantine=None, **read_csv_kwargs):
+    """
+    Clean a raw CSV chunk by chunk: prepare(chunk) fixes the types, then every rule runs in one pass.
+    Returns the kept rows and the rule statistics summed over the chunks.
+    """
+    kept, stats, rows = [], None, 0
+    with pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs) as reader:
+        for i, chunk in enumerate(reader):
+            if prepare is not None:
+                chunk = prepare(chunk)
+            clean, chunk_stats = apply_rules(chunk, rules, quarantine, append=i > 0)
+            kept.append(clean)
+            rows += len(chunk)
+            counts = chunk_stats[['fired', 'rejected']]
+            stats = counts if stats is None else stats + counts
+    stats['share'] = stats['rejected'] / rows if rows else 0.0
+
+    # Categories set up per chunk by prepare are unified again
+    result = pd.concat(kept)
+    for col in kept[0].columns:
+        if isinstance(kept[0][col].dtype, pd.CategoricalDtype):
+            result[col] = result[col].astype('category')
+    return result, stats
@@ -0,0 +1,188 @@
+"""Columnar store for the intermediate datasets in ./Data.
+
+Each dataset is a directory of Parquet files (optionally hive-partitioned, e.g. by
+month and product category) plus a `_schema.json` that records the pandas dtypes,
+the index and the categories of every categorical column, so readers get the same
+dtypes and category codes back without re-parsing or re-casting anything.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DATA_DIR = './Data'
+SCHEMA_FILE = '_schema.json'
+CATEGORIES_DIR = '_categories'
+MONTH_COLUMN = 'month'
+
+
+def dataset_path(name, data_dir=DATA_DIR):
+    return os.path.join(data_dir, name)
+
+
+def dataset_exists(name, data_dir=DATA_DIR):
+    return os.path.exists(os.path.join(dataset_path(name, data_dir), SCHEMA_FILE))
+
+
+# Hive partitioning with string keys, shared by the writer and the reader
+def _partitioning(partition_cols):
+    if not partition_cols:
+        return None
+    return ds.partitioning(pa.schema([(col, pa.string()) for col in partition_cols]), flavor='hive')
+
+
+def write_dataset(df, name, partition_cols=None, month_from=None, data_dir=DATA_DIR):
+    """
+    Write df as a Parquet dataset under data_dir/name, replacing any previous version.
+    - partition_cols: columns to partition on (one directory per value)
+    - month_from: datetime column (or 'index') to derive a 'YYYY-MM' month partition from
+    """
+    # Object columns that only hold numbers (e.g. read from Excel) become numeric
+    frame = df.infer_objects()
+    partition_cols = list(partition_cols or [])
+    derived = []
+
+    # Keep a meaningful index as a regular column
+    index = None
+    if not isinstance(frame.index, pd.RangeIndex):
+        index = frame.index.name or '__index__'
+        frame = frame.rename_axis(index).reset_index()
+
+    if month_from is not None:
+        dates = pd.to_datetime(frame[index] if month_from == 'index' else frame[month_from])
+        frame[MONTH_COLUMN] = dates.dt.strftime('%Y-%m')
+        partition_cols = [MONTH_COLUMN] + partition_cols
+        derived.append(MONTH_COLUMN)
+
+    schema = {
+        'columns': {col: str(dtype) for col, dtype in frame.dtypes.items() if col not in derived},
+        'categorical': {},
+        'index': index,
+        'partition_cols': partition_cols,
+        'derived': derived
+    }
+
+    # Write to a temporary directory first so readers never see a half-written dataset
+    path = dataset_path(name, data_dir)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(os.path.join(tmp_path, CATEGORIES_DIR))
+
+    # Categories are persisted once per column so codes are stable across readers
+    for col, dtype in frame.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            schema['categorical'][col] = {'ordered': bool(dtype.ordered)}
+            categories = pd.DataFrame({'category': dtype.categories})
+            categories.to_parquet(os.path.join(tmp_path, CATEGORIES_DIR, f'{col}.parquet'), index=False)
+
+    # Partition keys are stored as strings in the directory names (missing keys as null)
+    for col in partition_cols:
+        frame[col] = frame[col].astype(str).where(frame[col].notna(), None)
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    ds.write_dataset(
+        table, tmp_path, format='parquet',
+        partitioning=_partitioning(partition_cols),
+        existing_data_behavior='overwrite_or_ignore'
+    )
+    with open(os.path.join(tmp_path, SCHEMA_FILE), 'w') as f:
+        json.dump(schema, f, indent=2)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmp_path, path)
+
+
+def read_schema(name, data_dir=DATA_DIR):
+    with open(os.path.join(dataset_path(name, data_dir), SCHEMA_FILE)) as f:
+        return json.load(f)
+
+
+def read_categories(name, column, data_dir=DATA_DIR):
+    path = os.path.join(dataset_path(name, data_dir), CATEGORIES_DIR, f'{column}.parquet')
+    return pd.read_parquet(path)['category']
+
+
+def partition_row_counts(name, column, data_dir=DATA_DIR):
+    """Number of rows per value of a partition column, from the Parquet footers only."""
+    schema = read_schema(name, data_dir)
+    dataset = ds.dataset(
+        dataset_path(name, data_dir), format='parquet',
+        partitioning=_partitioning(schema['partition_cols'])
+    )
+    counts = {}
+    for fragment in dataset.get_fragments():
+        key = ds.get_partition_keys(fragment.partition_expression).get(column)
+        counts[key] = counts.get(key, 0) + fragment.count_rows()
+    return pd.Series(counts, dtype='int64').sort_index()
+
+
+def partition_fingerprints(name, column, data_dir=DATA_DIR):
+    """Content hash of the Parquet files of every value of a partition column."""
+    schema = read_schema(name, data_dir)
+    dataset = ds.dataset(
+        dataset_path(name, data_dir), format='parquet',
+        partitioning=_partitioning(schema['partition_cols'])
+    )
+    digests = {}
+    for fragment in sorted(dataset.get_fragments(), key=lambda fragment: fragment.path):
+        key = ds.get_partition_keys(fragment.partition_expression).get(column)
+        digest = digests.setdefault(key, hashlib.sha256())
+        with open(fragment.path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return pd.Series({key: digest.hexdigest() for key, digest in digests.items()}, dtype=object).sort_index()
+
+
+def read_dataset(name, columns=None, filters=None, data_dir=DATA_DIR):
+    """
+    Read a dataset written by write_dataset.
+    - columns: only read these columns (the index is always read)
+    - filters: predicates pushed down to the Parquet reader, e.g.
+      [('product_analytic_category', '==', 'Camera'), ('month', '>=', '2024-01')]
+      Filters on partition columns skip whole directories.
+    """
+    schema = read_schema(name, data_dir)
+    index = schema['index']
+    dataset = ds.dataset(
+        dataset_path(name, data_dir), format='parquet',
+        partitioning=_partitioning(schema['partition_cols'])
+    )
+
+    read_columns = None
+    if columns is not None:
+        read_columns = ([index] if index else []) + [col for col in columns if col != index]
+
+    expression = pq.filters_to_expression(filters) if filters else None
+    frame = dataset.to_table(columns=read_columns, filter=expression).to_pandas()
+
+    # Restore the persisted dtypes (partition keys come back as plain strings)
+    for col in frame.columns:
+        if col in schema['categorical']:
+            categories = read_categories(name, col, data_dir)
+            frame[col] = pd.Categorical(
+                frame[col].astype(categories.dtype), categories=categories.values,
+                ordered=schema['categorical'][col]['ordered']
+            )
+        elif col in schema['columns'] and str(frame[col].dtype) != schema['columns'][col]:
+            frame[col] = frame[col].astype(schema['columns'][col])
+
+    # Derived month keys are only returned when asked for
+    frame = frame.drop(columns=[col for col in schema['derived'] if col in frame.columns and
+                                (columns is None or col not in columns)])
+
+    # Restore the original column order and index
+    ordered = [col for col in schema['columns'] if col in frame.columns]
+    frame = frame[ordered + [col for col in frame.columns if col not in ordered]]
+    if index:
+        frame = frame.set_index(index)
+        if index == '__index__':
+            frame.index.name = None
+
+    return frame
@@ -0,0 +1,104 @@
+"""Date dimension shared by cleaning.ipynb and eda.ipynb.
+
+One row per calendar day with the calendar features the notebooks used to derive
+row by row (season, week start, holiday, holiday week, sale day, payday and payday
+week). Rows are keyed by an integer day number (days since 1970-01-01), so joining
+the table onto orders is a subtraction and an array lookup instead of per-row
+Python calls, e.g.
+    dim = build_date_dim('2023-07-01', '2024-06-30', holidays=holidays, sale_days=generate_sale_days(sales_calendar))
+    orders = join_date_dim(orders, dim, 'order_date', ['Occassion', 'Holiday_Week', 'SaleDay'])
+"""
+import numpy as np
+import pandas as pd
+
+DAY_KEY = 'day_key'
+NO_HOLIDAY = 'NoHoliday'
+
+# Season of every month, indexed by month number (index 0 unused)
+SEASONS = np.array(['', 'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                    'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'], dtype=object)
+
+
+def day_key(dates):
+    """Integer day number (days since 1970-01-01) of datetimes, as int32."""
+    return np.asarray(pd.DatetimeIndex(dates).values.astype('datetime64[D]').astype(np.int64), dtype=np.int32)
+
+
+def week_start(dates):
+    """Monday of the week of every date, at midnight."""
+    dates = pd.DatetimeIndex(dates).normalize()
+    return dates - pd.to_timedelta(dates.dayofweek, unit='D')
+
+
+def generate_sale_days(calendar):
+    """Every day of the sale periods of a {year: [(start, end), ...]} calendar."""
+    periods = [pd.date_range(start, end, freq='D') for periods in calendar.values() for start, end in periods]
+    return pd.DatetimeIndex(np.concatenate([period.values for period in periods])).unique().sort_values()
+
+
+def generate_paydays(start, end):
+    """Paydays on the 1st and the 15th of every month from start's month up to end."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    months = pd.date_range(start=pd.Timestamp(year=start.year, month=start.month, day=1), end=end, freq='MS')
+    paydays = months.append(months + pd.Timedelta(days=14))
+    return paydays[paydays <= end].sort_values()
+
+
+def build_date_dim(start, end, holidays=None, sale_days=None, paydays=None):
+    """
+    One row per day from start to end (inclusive), indexed by day_key.
+    - holidays: frame indexed by day (e.g. the holiday list with its Occassion column), its
+      columns are carried over and days that are not holidays get 'NoHoliday'
+    - sale_days: days of sales (see generate_sale_days)
+    - paydays: payday dates, the 1st and 15th of every month by default
+    Holiday and payday weeks are the weeks (Monday to Sunday) that contain one.
+    """
+    dates = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq='D')
+    weeks = week_start(dates)
+    dim = pd.DataFrame({
+        'date': dates,
+        'season': SEASONS[dates.month],
+        'week_start': weeks
+    }, index=pd.Index(day_key(dates), name=DAY_KEY))
+
+    holiday_days = pd.DatetimeIndex([])
+    if holidays is not None:
+        holiday_days = pd.DatetimeIndex(holidays.index).normalize()
+        carried = holidays.set_axis(holiday_days)
+        carried = carried[~carried.index.duplicated()].reindex(dates)
+        for col in carried.columns:
+            values = carried[col].values
+            if carried[col].dtype == object:
+                values = pd.Categorical(carried[col].fillna(NO_HOLIDAY))
+            dim[col] = values
+    dim['Holiday'] = dates.isin(holiday_days).astype(int)
+    dim['Holiday_Week'] = weeks.isin(week_start(holiday_days)).astype(int)
+
+    dim['SaleDay'] = dates.isin(pd.DatetimeIndex([] if sale_days is None else sale_days).normalize())
+
+    if paydays is None:
+        paydays = generate_paydays(start, end)
+    paydays = pd.DatetimeIndex(paydays).normalize()
+    dim['Payday'] = dates.isin(paydays).astype(int)
+    dim['Payday_Week'] = weeks.isin(week_start(paydays)).astype(int)
+    return dim
+
+
+def join_date_dim(frame, dim, date_column, columns):
+    """
+    Add date-dimension columns to frame by its date column: the day keys are turned into row
+    positions of the dimension, so no per-row Python call and no hash join is needed.
+    Dates outside the dimension raise a ValueError.
+    """
+    positions = day_key(frame[date_column]) - dim.index[0]
+    if len(positions) and (positions.min() < 0 or positions.max() >= len(dim)):
+        raise ValueError(f'{date_column} has dates outside the date dimension '
+                         f'({dim["date"].iloc[0].date()} to {dim["date"].iloc[-1].date()})')
+    frame = frame.copy()
+    for col in columns:
+        values = dim[col].values[positions]
+        # Only the categories that occur, as pd.Categorical on the joined column would give
+        if isinstance(values, pd.Categorical):
+            values = values.remove_unused_categories()
+        frame[col] = values
+    return frame
@@ -4,6 +4,15 @@ import { Tabs, TabsList, TabsTrigger, TabsContent } from '@/components/ui/tabs';
 import { LineChart, Line, BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell, AreaChart, Area, Scatter, ScatterChart, ZAxis } from 'recharts';
 import { TrendingUp, TrendingDown, AlertCircle, Award, BarChart2, PieChart as PieChartIcon, DollarSign } from 'lucide-react';
 
+// The analysis exports tables column-oriented ({ columns: { name: [values] } }), turn them back into rows
+const toRecords = (table) => {
+  if (!table || Array.isArray(table) || !table.columns) return table;
+  const names = Object.keys(table.columns);
+  const length = names.length ? table.columns[names[0]].length : 0;
+  return Array.from({ length }, (_, i) =>
+    Object.fromEntries(names.map(name => [name, table.columns[name][i]])));
+};
+
 const MarketingDashboard = () => {
   const [activeTab, setActiveTab] = useState('overview');
   const [isLoading, setIsLoading] = useState(true);
@@ -40,11 +49,11 @@ const MarketingDashboard = () => {
         ]);
 
         // Parse JSON
-        const monthlyData = JSON.parse(monthlyDataText);
-        const budgetOptimization = JSON.parse(budgetOptimizationText);
-        const categoryRevenue = JSON.parse(categoryRevenueText);
-        const channelResponse = JSON.parse(channelResponseText);
-        const topChannels = JSON.parse(topChannelsText);
+        const monthlyData = toRecords(JSON.parse(monthlyDataText));
+        const budgetOptimization = toRecords(JSON.parse(budgetOptimizationText));
+        const categoryRevenue = toRecords(JSON.parse(categoryRevenueText));
+        const channelResponse = toRecords(JSON.parse(channelResponseText));
+        const topChannels = toRecords(JSON.parse(topChannelsText));
         const summaryStats = JSON.parse(summaryStatsText);
 
         // Format date fields
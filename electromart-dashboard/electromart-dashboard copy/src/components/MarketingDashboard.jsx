@@ -3,6 +3,15 @@ import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { LineChart, Line, BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 
+// The analysis exports tables column-oriented ({ columns: { name: [values] } }), turn them back into rows
+const toRecords = (table) => {
+  if (!table || Array.isArray(table) || !table.columns) return table;
+  const names = Object.keys(table.columns);
+  const length = names.length ? table.columns[names[0]].length : 0;
+  return Array.from({ length }, (_, i) =>
+    Object.fromEntries(names.map(name => [name, table.columns[name][i]])));
+};
+
 const MarketingDashboard = () => {
   const [activeTab, setActiveTab] = useState('overview');
   const [isLoading, setIsLoading] = useState(true);
@@ -22,6 +31,12 @@ const MarketingDashboard = () => {
       try {
         setIsLoading(true);
         
+        // The manifest holds a content hash per file. Putting it in the URL lets the browser
+        // keep each file cached until the analysis actually changes it.
+        const manifestResponse = await fetch('/data/manifest.json', { cache: 'no-cache' });
+        const manifest = manifestResponse.ok ? (await manifestResponse.json()).files : {};
+        const fetchData = (file) => fetch(manifest[file] ? `/data/${file}?v=${manifest[file].etag}` : `/data/${file}`);
+
         // Fetch all data files
         const [
           monthlyDataResponse,
@@ -31,12 +46,12 @@ const MarketingDashboard = () => {
           topChannelsResponse,
           summaryStatsResponse
         ] = await Promise.all([
-          fetch('/data/monthly_data.json'),
-          fetch('/data/budget_optimization.json'),
-          fetch('/data/category_revenue.json'),
-          fetch('/data/channel_response.json'),
-          fetch('/data/top_channels.json'),
-          fetch('/data/summary_stats.json')
+          fetchData('monthly_data.json'),
+          fetchData('budget_optimization.json'),
+          fetchData('category_revenue.json'),
+          fetchData('channel_response.json'),
+          fetchData('top_channels.json'),
+          fetchData('summary_stats.json')
         ]);
 
         // Check if all responses are OK
@@ -47,11 +62,11 @@ const MarketingDashboard = () => {
         }
 
         // Parse JSON from each response
-        const monthlyData = await monthlyDataResponse.json();
-        const budgetOptimization = await budgetOptimizationResponse.json();
-        const categoryRevenue = await categoryRevenueResponse.json();
-        const channelResponse = await channelResponseResponse.json();
-        const topChannels = await topChannelsResponse.json();
+        const monthlyData = toRecords(await monthlyDataResponse.json());
+        const budgetOptimization = toRecords(await budgetOptimizationResponse.json());
+        const categoryRevenue = toRecords(await categoryRevenueResponse.json());
+        const channelResponse = toRecords(await channelResponseResponse.json());
+        const topChannels = toRecords(await topChannelsResponse.json());
         const summaryStats = await summaryStatsResponse.json();
 
         // Update state with fetched data
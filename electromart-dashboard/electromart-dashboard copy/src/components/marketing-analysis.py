@@ -1,40 +1,78 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.linear_model import LinearRegression, ElasticNet
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.metrics import mean_squared_error, r2_score
-import statsmodels.api as sm
-from statsmodels.stats.outliers_influence import variance_inflation_factor
-from scipy import stats
-import datetime
-import calendar
+# sklearn, statsmodels, matplotlib and seaborn take seconds to import, so they are imported
+# inside the stages that use them, and commands that do not run those stages start fast
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import builtins
+import contextlib
+import cProfile
+import hashlib
+import importlib.metadata
+import inspect
+import json
+import os
+import pickle
+import sys
+import time
 import warnings
+try:
+    import resource
+except ImportError:
+    resource = None
+from model_registry import (REGISTRY_DIR, CHANNEL_IMPACT_MODEL, BEST_IMPACT_MODEL,
+                            allocate_budget_proportional, data_fingerprint, register_model, score_channel_budget)
+from response_matrix import LEVEL_COLUMNS, ResponseMatrix
 warnings.filterwarnings('ignore')
 
-# Set plotting style
-plt.style.use('ggplot')
-sns.set(style='whitegrid')
+# Shared helpers (mm_model.py, date_dim.py) live at the repository root
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), *[os.pardir] * 4))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from date_dim import SEASONS
+
+# Input files
+WEATHER_DATA_FILE = 'weather_combined_missing.csv'
+ORDER_DATA_FILE = 'daily_data.csv'
+
+# On-disk stage cache: location and size cap (least recently used entries are evicted first),
+# fitted tournament models are cached in a subdirectory of it when the cache is on
+STAGE_CACHE_DIR = '.stage_cache'
+STAGE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+MODEL_CACHE_SUBDIR = 'models'
+
+# Stage trace in Chrome trace-event format (opens in chrome://tracing or ui.perfetto.dev);
+# the cProfile stats of a profiled stage are written next to it
+TRACE_FILE = 'pipeline_trace.json'
+
+# Figures: output directory, default format and the record of the data each file was drawn from
+VISUALIZATION_DIR = 'visualizations'
+FIGURE_FORMAT = 'png'
+FIGURE_KEYS_FILE = 'figure_keys.json'
+
+# Dashboard export: directory, significant digits kept for floats (None keeps full precision)
+# and the manifest of content hashes the dashboard fetches first
+EXPORT_DIR = 'src/data'
+EXPORT_FLOAT_DIGITS = 6
+EXPORT_MANIFEST_FILE = 'manifest.json'
 
 # Load datasets
 def load_data():
-    weather_data = pd.read_csv('weather_combined_missing.csv')
-    order_data = pd.read_csv('daily_data.csv')
-    return weather_data, order_data
+    return load_weather_data(), load_order_data()
+
+def load_weather_data():
+    return pd.read_csv(WEATHER_DATA_FILE)
+
+def load_order_data():
+    return pd.read_csv(ORDER_DATA_FILE)
 
 # Preprocess weather data
 def preprocess_weather(weather_data):
     weather_clean = weather_data.copy()
     
-    # Fill missing values
-    for col in weather_clean.columns:
-        if weather_clean[col].dtype in [np.float64, np.int64]:
-            weather_clean[col].fillna(weather_clean[col].median(), inplace=True)
+    # Fill missing values with the column medians, all numeric columns at once
+    numeric = [col for col in weather_clean.columns if weather_clean[col].dtype in [np.float64, np.int64]]
+    weather_clean[numeric] = weather_clean[numeric].fillna(weather_clean[numeric].median())
     
     # Calculate additional weather metrics
     weather_clean['Extreme_Temp'] = (weather_clean['Max Temp (°C)'] > 30) | (weather_clean['Min Temp (°C)'] < -20)
@@ -46,30 +84,38 @@ def preprocess_weather(weather_data):
     weather_clean['Date'] = date_range
     weather_clean['Month'] = weather_clean['Date'].dt.month
     weather_clean['Year'] = weather_clean['Date'].dt.year
-    weather_clean['Season'] = weather_clean['Month'].apply(get_season)
+    weather_clean['Season'] = SEASONS[weather_clean['Month'].values]
     
     return weather_clean
 
-# Get season from month
+# Get season from month (the date dimension's season table)
 def get_season(month):
-    if month in [12, 1, 2]:
-        return 'Winter'
-    elif month in [3, 4, 5]:
-        return 'Spring'
-    elif month in [6, 7, 8]:
-        return 'Summer'
-    else:
-        return 'Fall'
+    return SEASONS[month]
 
 # Preprocess order data
 def preprocess_orders(order_data):
     orders_clean = order_data.copy()
     
+    # Global statistics over the filled GMV column
+    gmv_median = orders_clean['gmv'].median()
+    gmv = orders_clean['gmv'].fillna(gmv_median)
+    order_stats = {
+        'gmv_median': gmv_median,
+        'gmv_threshold': gmv.quantile(0.8),
+        'size_edges': gmv.quantile(np.linspace(0, 1, 4)).values,
+        'category_revenue': gmv.groupby(orders_clean['product_analytic_category']).sum(),
+        'subcategory_revenue': gmv.groupby(orders_clean['product_analytic_sub_category']).sum()
+    }
+    
+    return transform_orders(orders_clean, order_stats)
+
+# Apply the row-level preprocessing given the global order statistics
+def transform_orders(orders_clean, order_stats):
     # Convert SaleDay to boolean
-    orders_clean['SaleDay'] = orders_clean['SaleDay'].apply(lambda x: x == 'True')
+    orders_clean['SaleDay'] = orders_clean['SaleDay'] == 'True'
     
     # Fill missing GMV values
-    orders_clean['gmv'].fillna(orders_clean['gmv'].median(), inplace=True)
+    orders_clean['gmv'] = orders_clean['gmv'].fillna(order_stats['gmv_median'])
     
     # Replace "\N" values in delivery columns with 0
     for col in ['deliverybdays', 'deliverycdays']:
@@ -86,31 +132,326 @@ def preprocess_orders(order_data):
     orders_clean['total_delivery_days'] = orders_clean['deliverybdays'] + orders_clean['deliverycdays']
     
     # Classify products as luxury or mass-market (80th percentile GMV threshold)
-    gmv_threshold = orders_clean['gmv'].quantile(0.8)
-    orders_clean['product_type'] = orders_clean['gmv'].apply(
-        lambda x: 'Luxury' if x >= gmv_threshold else 'Mass-market'
+    orders_clean['product_type'] = np.where(
+        orders_clean['gmv'] >= order_stats['gmv_threshold'], 'Luxury', 'Mass-market'
     )
     
-    # Extract category and sub-category counts and revenue
-    category_revenue = orders_clean.groupby('product_analytic_category')['gmv'].sum().reset_index()
-    category_revenue.rename(columns={'gmv': 'category_revenue'}, inplace=True)
-    
-    subcategory_revenue = orders_clean.groupby('product_analytic_sub_category')['gmv'].sum().reset_index()
-    subcategory_revenue.rename(columns={'gmv': 'subcategory_revenue'}, inplace=True)
+    # Attach category and sub-category revenue
+    orders_clean['category_revenue'] = orders_clean['product_analytic_category'].map(order_stats['category_revenue'])
+    orders_clean['subcategory_revenue'] = orders_clean['product_analytic_sub_category'].map(order_stats['subcategory_revenue'])
     
-    # Merge back
-    orders_clean = orders_clean.merge(category_revenue, on='product_analytic_category', how='left')
-    orders_clean = orders_clean.merge(subcategory_revenue, on='product_analytic_sub_category', how='left')
-    
-    # Categorize order size
-    orders_clean['order_size'] = pd.qcut(
+    # Categorize order size (GMV terciles)
+    orders_clean['order_size'] = pd.cut(
         orders_clean['gmv'], 
-        q=3, 
-        labels=['Small', 'Medium', 'Large']
+        bins=order_stats['size_edges'], 
+        labels=['Small', 'Medium', 'Large'],
+        include_lowest=True
     )
     
     return orders_clean
 
+# Read the order file in chunks of rows
+def read_order_chunks(path, chunksize, usecols=None):
+    return pd.read_csv(path, chunksize=chunksize, usecols=usecols)
+
+# Exact order statistics of a GMV column that is only available in chunks.
+# Each pass histograms the values inside the interval that holds a rank and narrows it,
+# until the interval is small enough to be collected and sorted in memory.
+# fill_value/fill_count stand for missing values that will be filled with a constant.
+def select_gmv_ranks(path, chunksize, ranks, gmv_min, gmv_max, fill_value=None, fill_count=0,
+                     n_bins=4096, max_buffer=1000000):
+    ranks = sorted(set(int(r) for r in ranks))
+    search = {r: {'lo': gmv_min, 'hi': gmv_max, 'below': 0, 'count': None} for r in ranks}
+    values = {}
+    
+    def fill_in(lo, hi):
+        return fill_count > 0 and lo <= fill_value <= hi
+    
+    while len(values) < len(ranks):
+        pending = [r for r in ranks if r not in values]
+        collect = [r for r in pending if search[r]['count'] is not None and search[r]['count'] <= max_buffer]
+        hist = {r: np.zeros(n_bins, dtype=np.int64) for r in pending if r not in collect}
+        edges = {r: np.linspace(search[r]['lo'], search[r]['hi'], n_bins + 1) for r in hist}
+        kept = {r: [] for r in collect}
+        seen_min = {r: np.inf for r in pending}
+        seen_max = {r: -np.inf for r in pending}
+        
+        for chunk in read_order_chunks(path, chunksize, usecols=['gmv']):
+            gmv = chunk['gmv'].dropna().values
+            for r in pending:
+                lo, hi = search[r]['lo'], search[r]['hi']
+                inside = gmv[(gmv >= lo) & (gmv <= hi)]
+                if len(inside) == 0:
+                    continue
+                seen_min[r] = min(seen_min[r], inside.min())
+                seen_max[r] = max(seen_max[r], inside.max())
+                if r in kept:
+                    kept[r].append(inside)
+                else:
+                    bins = np.clip(np.searchsorted(edges[r], inside, side='right') - 1, 0, n_bins - 1)
+                    hist[r] += np.bincount(bins, minlength=n_bins)
+        
+        for r in pending:
+            lo, hi = search[r]['lo'], search[r]['hi']
+            offset = r - search[r]['below']
+            
+            # Nothing but fill values, or a single distinct value, is left in the interval
+            if not np.isfinite(seen_min[r]):
+                values[r] = fill_value
+                continue
+            if seen_min[r] == seen_max[r] and not (fill_in(lo, hi) and fill_value != seen_min[r]):
+                values[r] = seen_min[r]
+                continue
+            
+            if r in kept:
+                inside = np.sort(np.concatenate(kept[r]))
+                if fill_in(lo, hi):
+                    # Place the fill values without materializing them
+                    position = np.searchsorted(inside, fill_value, side='left')
+                    if position <= offset < position + fill_count:
+                        values[r] = fill_value
+                        continue
+                    if offset >= position + fill_count:
+                        offset -= fill_count
+                values[r] = inside[offset]
+                continue
+            
+            # Narrow to the bin that holds the rank (the last bin is closed on the right)
+            counts = hist[r]
+            observed = counts.copy()
+            if fill_in(lo, hi):
+                fill_bin = min(np.searchsorted(edges[r], fill_value, side='right') - 1, n_bins - 1)
+                counts = counts.copy()
+                counts[fill_bin] += fill_count
+            cumulative = np.cumsum(counts)
+            b = int(np.searchsorted(cumulative, offset, side='right'))
+            search[r]['below'] += int(cumulative[b - 1]) if b > 0 else 0
+            search[r]['count'] = int(observed[b])
+            search[r]['lo'] = edges[r][b]
+            # Half-open bins end just below the next edge
+            search[r]['hi'] = edges[r][b + 1] if b == n_bins - 1 else np.nextafter(edges[r][b + 1], -np.inf)
+    
+    return values
+
+# Linearly interpolated quantiles (as pandas computes them) from exact order statistics
+def chunked_quantiles(path, chunksize, qs, n, gmv_min, gmv_max, fill_value=None, fill_count=0):
+    positions = [(n - 1) * q for q in qs]
+    ranks = set()
+    for h in positions:
+        ranks.update({int(np.floor(h)), min(int(np.floor(h)) + 1, n - 1)})
+    values = select_gmv_ranks(path, chunksize, ranks, gmv_min, gmv_max, fill_value, fill_count)
+    
+    quantiles = []
+    for h in positions:
+        lower = int(np.floor(h))
+        upper = min(lower + 1, n - 1)
+        quantiles.append(np.quantile([values[lower], values[upper]], h - lower))
+    return np.array(quantiles)
+
+# Mergeable KLL quantile sketch. Items at level h stand for 2**h original values, and a
+# level is compacted (sorted, every other item promoted) when it outgrows its capacity.
+# The rank error is about 1.65 / k of the item count, independent of how many values are
+# added, and sketches built per chunk, per day or per partition can be merged.
+class QuantileSketch:
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+    
+    @property
+    def rank_error(self):
+        return 1.65 / self.k
+    
+    # Lower levels get geometrically smaller capacities (factor 2/3 per level)
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+    
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.compress()
+        return self
+    
+    # Add count copies of one value without materializing them (binary decomposition of count)
+    def update_constant(self, value, count):
+        count = int(count)
+        if count <= 0 or np.isnan(value):
+            return self
+        self.n += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        level = 0
+        while count:
+            if count & 1:
+                while level >= len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level] = np.append(self.levels[level], value)
+            count >>= 1
+            level += 1
+        self.compress()
+        return self
+    
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.compress()
+        return self
+    
+    def compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so the promoted items keep the total weight
+                stay, items = items[:len(items) % 2], items[len(items) % 2:]
+                offset = self.rng.integers(2)
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+                self.levels[level] = stay
+                # A new top level shrinks every capacity, so start over from the bottom
+                level = 0
+            else:
+                level += 1
+    
+    def quantile(self, q):
+        q = np.asarray(q, dtype=float)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        result = items[np.clip(positions, 0, len(items) - 1)]
+        # The extremes are tracked exactly
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result if result.ndim else float(result)
+    
+    # Plain-data form, so a sketch can be persisted and updated on the next run
+    def to_dict(self):
+        return {
+            'k': self.k, 'n': self.n, 'min': float(self.min), 'max': float(self.max),
+            'levels': [items.tolist() for items in self.levels]
+        }
+    
+    @classmethod
+    def from_dict(cls, state, seed=None):
+        sketch = cls(k=state['k'], seed=seed)
+        sketch.n = state['n']
+        sketch.min = state['min']
+        sketch.max = state['max']
+        sketch.levels = [np.asarray(items, dtype=float) for items in state['levels']]
+        return sketch
+
+# Compute the global statistics used by transform_orders in passes over the order file,
+# keeping only per-group partial sums and fixed-size histograms in memory.
+# With quantile_method='sketch' the GMV quantiles come from a QuantileSketch built in the
+# first pass instead, so the file is read once at the cost of a rank error of ~1.65 / sketch_k.
+def compute_order_statistics(path, chunksize=500000, quantile_method='exact', sketch_k=200):
+    n_valid = 0
+    n_missing = 0
+    gmv_min, gmv_max = np.inf, -np.inf
+    category_parts, subcategory_parts = [], []
+    sketch = QuantileSketch(k=sketch_k, seed=0) if quantile_method == 'sketch' else None
+    
+    # Pass 1: counts, range and mergeable group aggregates (GMV sum and missing count)
+    usecols = ['gmv', 'product_analytic_category', 'product_analytic_sub_category']
+    for chunk in read_order_chunks(path, chunksize, usecols=usecols):
+        if sketch is not None:
+            sketch.update(chunk['gmv'].values)
+        missing = chunk['gmv'].isna()
+        n_missing += int(missing.sum())
+        n_valid += int((~missing).sum())
+        if (~missing).any():
+            gmv_min = min(gmv_min, chunk['gmv'].min())
+            gmv_max = max(gmv_max, chunk['gmv'].max())
+        parts = pd.DataFrame({'gmv': chunk['gmv'].fillna(0), 'missing': missing.astype(int)})
+        category_parts.append(parts.groupby(chunk['product_analytic_category']).sum())
+        subcategory_parts.append(parts.groupby(chunk['product_analytic_sub_category']).sum())
+        
+        # Merge partials as we go so memory stays bounded by the number of groups
+        category_parts = [pd.concat(category_parts).groupby(level=0).sum()]
+        subcategory_parts = [pd.concat(subcategory_parts).groupby(level=0).sum()]
+    
+    # Without a single GMV value the statistics are NaN, as the in-memory median and quantiles are
+    # (and every group's revenue is 0, the sum of nothing)
+    if n_valid == 0:
+        return {
+            'gmv_median': np.nan,
+            'gmv_threshold': np.nan,
+            'size_edges': np.full(4, np.nan),
+            'category_revenue': category_parts[0]['gmv'] if category_parts else pd.Series(dtype=float),
+            'subcategory_revenue': subcategory_parts[0]['gmv'] if subcategory_parts else pd.Series(dtype=float)
+        }
+    
+    if sketch is not None:
+        return sketch_order_statistics(sketch, n_missing, category_parts[0], subcategory_parts[0])
+    
+    # Pass 2: exact median of the non-missing GMV values
+    if n_valid % 2:
+        gmv_median = select_gmv_ranks(path, chunksize, [n_valid // 2], gmv_min, gmv_max)[n_valid // 2]
+    else:
+        middle = select_gmv_ranks(path, chunksize, [n_valid // 2 - 1, n_valid // 2], gmv_min, gmv_max)
+        gmv_median = (middle[n_valid // 2 - 1] + middle[n_valid // 2]) / 2
+    
+    # Pass 3: threshold and terciles of the GMV column after filling with the median
+    n = n_valid + n_missing
+    quantiles = chunked_quantiles(path, chunksize, [0.8, 0, 1 / 3, 2 / 3, 1], n, gmv_min, gmv_max,
+                                  fill_value=gmv_median, fill_count=n_missing)
+    
+    # Missing values count towards their group's revenue once filled
+    category_revenue = category_parts[0]['gmv'] + category_parts[0]['missing'] * gmv_median
+    subcategory_revenue = subcategory_parts[0]['gmv'] + subcategory_parts[0]['missing'] * gmv_median
+    
+    return {
+        'gmv_median': gmv_median,
+        'gmv_threshold': quantiles[0],
+        'size_edges': quantiles[1:],
+        'category_revenue': category_revenue,
+        'subcategory_revenue': subcategory_revenue
+    }
+
+# Order statistics from a GMV sketch and per-group partial sums (GMV sum and missing count)
+def sketch_order_statistics(sketch, n_missing, category_parts, subcategory_parts):
+    gmv_median = sketch.quantile(0.5)
+    
+    # The filled values are added to a copy with their full weight
+    filled = QuantileSketch.from_dict(sketch.to_dict(), seed=0).update_constant(gmv_median, n_missing)
+    quantiles = filled.quantile([0.8, 0, 1 / 3, 2 / 3, 1])
+    
+    return {
+        'gmv_median': gmv_median,
+        'gmv_threshold': quantiles[0],
+        'size_edges': quantiles[1:],
+        'category_revenue': category_parts['gmv'] + category_parts['missing'] * gmv_median,
+        'subcategory_revenue': subcategory_parts['gmv'] + subcategory_parts['missing'] * gmv_median
+    }
+
+# Preprocess order data chunk by chunk with bounded memory (yields preprocessed chunks)
+def preprocess_orders_chunked(path, chunksize=500000, order_stats=None, quantile_method='exact'):
+    if order_stats is None:
+        order_stats = compute_order_statistics(path, chunksize, quantile_method)
+    
+    def chunks():
+        for chunk in read_order_chunks(path, chunksize):
+            yield transform_orders(chunk, order_stats)
+    
+    return chunks()
+
 # Generate synthetic media spend data (since it wasn't provided)
 def generate_synthetic_media_data():
     months = pd.date_range(start='2023-01-01', end='2024-06-30', freq='MS')
@@ -231,122 +572,144 @@ def generate_sale_calendar():
     
     return pd.DataFrame(sales_events)
 
+# Build one row per calendar day with the weekday, month, holiday, sale and payday flags
+def build_calendar(start_date, end_date, holidays_df, sales_df):
+    dates = pd.date_range(start=pd.to_datetime(start_date), end=pd.to_datetime(end_date))
+    
+    calendar_df = pd.DataFrame({
+        'Date': dates,
+        'Weekday': dates.weekday,
+        'Month': dates.month,
+        'Year': dates.year,
+        'Day': dates.day
+    })
+    
+    # Holiday and sale flags are key lookups against the event dates
+    calendar_df['Is_Holiday'] = dates.isin(pd.to_datetime(holidays_df['date']))
+    calendar_df['Is_Sale_Day'] = dates.isin(pd.to_datetime(sales_df['date']))
+    
+    # Payday effect (assume 15th and last day of month)
+    calendar_df['Days_In_Month'] = dates.days_in_month
+    calendar_df['Is_Payday'] = (calendar_df['Day'] == 15) | (calendar_df['Day'] == calendar_df['Days_In_Month'])
+    
+    # Integer month key (months since year 0) used to join monthly media data
+    calendar_df['Month_Key'] = calendar_df['Year'] * 12 + calendar_df['Month'] - 1
+    
+    return calendar_df
+
+# Index monthly media rows by month key so daily rows can be joined without string scans
+def index_media_by_month(media_data):
+    media_dates = pd.to_datetime(media_data['Date'])
+    
+    # Only rows dated on the first of a month describe that month's spend
+    is_month_start = (media_dates.dt.day == 1) & (media_dates == media_dates.dt.normalize())
+    month_media = media_data[is_month_start.values].copy()
+    month_dates = media_dates[is_month_start]
+    month_media['Month_Key'] = (month_dates.dt.year * 12 + month_dates.dt.month - 1).values
+    
+    # Keep the first row for a month, as the per-day lookup did
+    month_media = month_media.drop_duplicates('Month_Key', keep='first').set_index('Month_Key')
+    
+    return month_media
+
 # Generate synthetic daily aggregated order data
-def generate_daily_order_data(orders_clean, media_data, holidays_df, sales_df):
-    # Create a date range covering the entire period
-    start_date = pd.to_datetime('2023-01-01')
-    end_date = pd.to_datetime('2024-06-30')
-    date_range = pd.date_range(start=start_date, end=end_date)
-    
-    # Generate synthetic daily order data
-    daily_orders = []
-    
-    for date in date_range:
-        # Base daily revenue with weekday effect
-        weekday = date.weekday()
-        base_revenue = 50000 + (4 - weekday if weekday < 5 else -15000)  # Less revenue on weekends
-        
-        # Month effect
-        month = date.month
-        if month in [11, 12]:  # Holiday season
-            month_factor = 1.3
-        elif month in [6, 7, 8]:  # Summer
-            month_factor = 1.1
-        else:
-            month_factor = 1.0
-        
-        # Holiday effect
-        is_holiday = date.strftime('%Y-%m-%d') in holidays_df['date'].values
-        holiday_factor = 1.3 if is_holiday else 1.0
-        
-        # Sale day effect
-        is_sale = date.strftime('%Y-%m-%d') in sales_df['date'].values
-        sale_factor = 1.5 if is_sale else 1.0
-        
-        # Payday effect (assume 15th and last day of month)
-        is_payday = date.day == 15 or date.day == calendar.monthrange(date.year, date.month)[1]
-        payday_factor = 1.2 if is_payday else 1.0
-        
-        # Marketing effect (using previous month's spending)
-        prev_month = (date - pd.DateOffset(months=1)).replace(day=1)
-        prev_month_str = prev_month.strftime('%Y-%m-%d')
-        
-        media_effect = 1.0
-        if any(media_data['Date'].dt.strftime('%Y-%m-%d') == prev_month_str):
-            month_media = media_data[media_data['Date'].dt.strftime('%Y-%m-%d') == prev_month_str].iloc[0]
-            # Simplified media effect model
-            tv_effect = month_media['TV_Spend'] / 50000 * 0.05
-            digital_effect = month_media['Digital_Spend'] / 40000 * 0.08
-            social_effect = month_media['SocialMedia_Spend'] / 30000 * 0.07
-            radio_effect = month_media['Radio_Spend'] / 20000 * 0.03
-            print_effect = month_media['Print_Spend'] / 15000 * 0.02
-            outdoor_effect = month_media['Outdoor_Spend'] / 10000 * 0.01
-            
-            media_effect = 1.0 + tv_effect + digital_effect + social_effect + radio_effect + print_effect + outdoor_effect
-        
-        # Random fluctuation
-        random_factor = np.random.normal(1, 0.05)
-        
-        # Calculate final daily revenue
-        daily_revenue = base_revenue * month_factor * holiday_factor * sale_factor * payday_factor * media_effect * random_factor
-        
-        # Calculate daily orders based on average order value
-        avg_order_value = 250
-        daily_order_count = int(daily_revenue / avg_order_value)
-        
-        # Get the nearest month's NPS and Stock value
-        month_start = date.replace(day=1)
-        month_str = month_start.strftime('%Y-%m-%d')
-        nps = 70  # Default
-        stock = 50  # Default
-        
-        if any(media_data['Date'].dt.strftime('%Y-%m-%d') == month_str):
-            month_data = media_data[media_data['Date'].dt.strftime('%Y-%m-%d') == month_str].iloc[0]
-            nps = month_data['NPS_Score']
-            stock = month_data['Stock_Value']
-        
-        # Calculate media spend data for the specific day
-        tv_spend = 0
-        radio_spend = 0
-        digital_spend = 0
-        social_spend = 0
-        print_spend = 0
-        outdoor_spend = 0
-        
-        if any(media_data['Date'].dt.strftime('%Y-%m-%d') == month_str):
-            month_data = media_data[media_data['Date'].dt.strftime('%Y-%m-%d') == month_str].iloc[0]
-            # Divide monthly spend by days in month to get daily spend
-            days_in_month = calendar.monthrange(date.year, date.month)[1]
-            tv_spend = month_data['TV_Spend'] / days_in_month
-            radio_spend = month_data['Radio_Spend'] / days_in_month
-            digital_spend = month_data['Digital_Spend'] / days_in_month
-            social_spend = month_data['SocialMedia_Spend'] / days_in_month
-            print_spend = month_data['Print_Spend'] / days_in_month
-            outdoor_spend = month_data['Outdoor_Spend'] / days_in_month
-        
-        # Append to daily_orders list
-        daily_orders.append({
-            'Date': date,
-            'Revenue': daily_revenue,
-            'Orders': daily_order_count,
-            'Is_Holiday': is_holiday,
-            'Is_Sale_Day': is_sale,
-            'Is_Payday': is_payday,
-            'NPS_Score': nps,
-            'Stock_Value': stock,
-            'TV_Spend': tv_spend,
-            'Radio_Spend': radio_spend,
-            'Digital_Spend': digital_spend,
-            'Social_Spend': social_spend,
-            'Print_Spend': print_spend,
-            'Outdoor_Spend': outdoor_spend,
-            'Weekday': date.weekday(),
-            'Month': date.month,
-            'Year': date.year,
-            'Day': date.day
-        })
-    
-    return pd.DataFrame(daily_orders)
+def generate_daily_order_data(orders_clean, media_data, holidays_df, sales_df,
+                              start_date='2023-01-01', end_date='2024-06-30', stores=None, store_factors=None):
+    # Calendar features for the entire period
+    calendar_df = build_calendar(start_date, end_date, holidays_df, sales_df)
+    n_days = len(calendar_df)
+    
+    # Base daily revenue with weekday effect (less revenue on weekends)
+    weekday = calendar_df['Weekday'].values
+    base_revenue = 50000 + np.where(weekday < 5, 4 - weekday, -15000)
+    
+    # Month effect (holiday season and summer)
+    month = calendar_df['Month'].values
+    month_factor = np.select([np.isin(month, [11, 12]), np.isin(month, [6, 7, 8])], [1.3, 1.1], default=1.0)
+    
+    # Holiday, sale day and payday effects
+    holiday_factor = np.where(calendar_df['Is_Holiday'].values, 1.3, 1.0)
+    sale_factor = np.where(calendar_df['Is_Sale_Day'].values, 1.5, 1.0)
+    payday_factor = np.where(calendar_df['Is_Payday'].values, 1.2, 1.0)
+    
+    # Join the current and previous month's media rows on the month key (-1 where missing)
+    month_media = index_media_by_month(media_data)
+    month_key = calendar_df['Month_Key'].values
+    current_pos = month_media.index.get_indexer(month_key)
+    prev_pos = month_media.index.get_indexer(month_key - 1)
+    has_current = current_pos >= 0
+    has_prev = prev_pos >= 0
+    
+    # Marketing effect (using previous month's spending, simplified media effect model)
+    media_weights = {
+        'TV_Spend': 0.05 / 50000,
+        'Digital_Spend': 0.08 / 40000,
+        'SocialMedia_Spend': 0.07 / 30000,
+        'Radio_Spend': 0.03 / 20000,
+        'Print_Spend': 0.02 / 15000,
+        'Outdoor_Spend': 0.01 / 10000
+    }
+    monthly_effect = month_media[list(media_weights)].values.astype(float) @ np.array(list(media_weights.values()))
+    media_effect = np.where(has_prev, 1.0 + monthly_effect[prev_pos], 1.0)
+    
+    # Revenue without the random fluctuation, shared by every store
+    expected_revenue = base_revenue * month_factor * holiday_factor * sale_factor * payday_factor * media_effect
+    
+    # Get the month's NPS and Stock value, with defaults where the month has no media row
+    nps = np.where(has_current, month_media['NPS_Score'].values[current_pos], 70)
+    stock = np.where(has_current, month_media['Stock_Value'].values[current_pos], 50)
+    
+    # Divide monthly spend by days in month to get daily spend
+    days_in_month = calendar_df['Days_In_Month'].values
+    daily_spend = {}
+    for out_col, media_col in [('TV_Spend', 'TV_Spend'), ('Radio_Spend', 'Radio_Spend'),
+                               ('Digital_Spend', 'Digital_Spend'), ('Social_Spend', 'SocialMedia_Spend'),
+                               ('Print_Spend', 'Print_Spend'), ('Outdoor_Spend', 'Outdoor_Spend')]:
+        daily_spend[out_col] = np.where(has_current, month_media[media_col].values[current_pos] / days_in_month, 0)
+    
+    # Stores to simulate; a single unlabelled store reproduces the original output
+    if stores is None:
+        store_ids = [None]
+    elif np.isscalar(stores):
+        store_ids = list(range(int(stores)))
+    else:
+        store_ids = list(stores)
+    n_stores = len(store_ids)
+    if store_factors is None:
+        store_factors = np.ones(n_stores)
+    store_factors = np.asarray(store_factors, dtype=float).reshape(n_stores, 1)
+    
+    # Random fluctuation, one draw per store and day
+    random_factor = np.random.normal(1, 0.05, size=(n_stores, n_days))
+    
+    # Calculate final daily revenue and daily orders based on average order value
+    daily_revenue = (expected_revenue * store_factors * random_factor).ravel()
+    avg_order_value = 250
+    daily_order_count = (daily_revenue / avg_order_value).astype(int)
+    
+    def tile(values):
+        return np.tile(values, n_stores)
+    
+    daily_orders = pd.DataFrame({
+        'Date': tile(calendar_df['Date'].values),
+        'Revenue': daily_revenue,
+        'Orders': daily_order_count,
+        'Is_Holiday': tile(calendar_df['Is_Holiday'].values),
+        'Is_Sale_Day': tile(calendar_df['Is_Sale_Day'].values),
+        'Is_Payday': tile(calendar_df['Is_Payday'].values),
+        'NPS_Score': tile(nps),
+        'Stock_Value': tile(stock),
+        **{col: tile(values) for col, values in daily_spend.items()},
+        'Weekday': tile(weekday),
+        'Month': tile(month),
+        'Year': tile(calendar_df['Year'].values),
+        'Day': tile(calendar_df['Day'].values)
+    })
+    
+    if stores is not None:
+        daily_orders.insert(0, 'Store', np.repeat(store_ids, n_days))
+    
+    return daily_orders
 
 # Aggregate orders by product category
 def aggregate_orders_by_category(orders_clean):
@@ -369,6 +732,29 @@ def aggregate_orders_by_category(orders_clean):
     
     return category_agg
 
+# Aggregate preprocessed order chunks by product category using mergeable partial sums
+def aggregate_orders_by_category_chunked(order_chunks):
+    partial = None
+    
+    for chunk in order_chunks:
+        chunk_partial = chunk.groupby('product_analytic_category').agg(
+            Total_Revenue=('gmv', 'sum'),
+            Total_Units=('units', 'sum'),
+            Total_Orders=('order_item_id', 'count'),
+            Discount_Sum=('discount_percent', 'sum'),
+            Discount_Count=('discount_percent', 'count')
+        )
+        partial = chunk_partial if partial is None else partial.add(chunk_partial, fill_value=0)
+    
+    category_agg = partial.reset_index()
+    category_agg['Avg_Discount'] = category_agg['Discount_Sum'] / category_agg['Discount_Count']
+    category_agg = category_agg[['product_analytic_category', 'Total_Revenue', 'Total_Units', 'Total_Orders', 'Avg_Discount']]
+    
+    category_agg['Revenue_Per_Order'] = category_agg['Total_Revenue'] / category_agg['Total_Orders']
+    category_agg['Revenue_Percentage'] = category_agg['Total_Revenue'] / category_agg['Total_Revenue'].sum() * 100
+    
+    return category_agg
+
 # Perform time series analysis on daily order data
 def time_series_analysis(daily_orders):
     # Convert date to datetime if it's not already
@@ -415,8 +801,126 @@ def time_series_analysis(daily_orders):
     
     return monthly_orders
 
-# Analyze the impact of marketing spending on revenue
-def marketing_impact_analysis(monthly_orders):
+# Candidate models for the tournament: name -> (estimator class or its import path, parameters)
+MODEL_CANDIDATES = {
+    'Linear Regression': ('sklearn.linear_model.LinearRegression', {}),
+    'ElasticNet': ('sklearn.linear_model.ElasticNet', {'alpha': 0.5, 'l1_ratio': 0.5, 'random_state': 42}),
+    'Random Forest': ('sklearn.ensemble.RandomForestRegressor', {'n_estimators': 100, 'random_state': 42}),
+    'Gradient Boosting': ('sklearn.ensemble.GradientBoostingRegressor', {'n_estimators': 100, 'random_state': 42})
+}
+
+# Class from an import path such as 'sklearn.linear_model.LinearRegression' (classes are returned as is)
+def load_class(path):
+    if not isinstance(path, str):
+        return path
+    module, _, name = path.rpartition('.')
+    return getattr(__import__(module, fromlist=[name]), name)
+
+# Fit a model, reusing an earlier fit of the same estimator on the same data from the cache
+# in cache_dir (None fits without caching)
+def fit_cached_model(estimator_class, params, X_train, y_train, cache_dir=None):
+    estimator_class = load_class(estimator_class)
+    digest = hashlib.sha256(repr((estimator_class.__name__, sorted(params.items()), list(X_train.columns))).encode())
+    digest.update(np.ascontiguousarray(X_train.values, dtype=float).tobytes())
+    digest.update(np.ascontiguousarray(y_train.values, dtype=float).tobytes())
+    key = digest.hexdigest()
+    
+    cache = StageCache(cache_dir) if cache_dir else None
+    if cache is not None:
+        hit, model = cache.get(key)
+        if hit:
+            return model
+    
+    model = estimator_class(**params).fit(X_train, y_train)
+    if cache is not None:
+        cache.put(key, model)
+    return model
+
+# Fit one candidate on the training months of a fold and predict its test months (runs in the worker processes)
+def score_fold(estimator_class, params, X_train, y_train, X_test, cache_dir=None):
+    return fit_cached_model(estimator_class, params, X_train, y_train, cache_dir).predict(X_test)
+
+# Score candidate models on rolling-origin folds: each fold trains on the months before its test
+# window, so no model sees the future. Fold x model fits run in a process pool (n_jobs=1 runs
+# them in this process). Once every remaining candidate has finished the same number of folds
+# (at least min_folds, as the first folds train on very few months), those whose pooled R2
+# trails the leader by more than prune_margin are dropped. With cache_dir, fitted models are
+# cached there (see fit_cached_model).
+def run_model_tournament(X, y, candidates=MODEL_CANDIDATES, n_folds=3, n_jobs=None, prune_margin=0.5,
+                         min_folds=2, cache_dir=None):
+    from sklearn.metrics import r2_score
+    from sklearn.model_selection import TimeSeriesSplit
+    
+    folds = list(TimeSeriesSplit(n_splits=min(n_folds, len(X) - 1)).split(X))
+    tasks = [(name, k) for k in range(len(folds)) for name in candidates]
+    
+    def task_args(name, k):
+        train_idx, test_idx = folds[k]
+        estimator_class, params = candidates[name]
+        return estimator_class, params, X.iloc[train_idx], y.iloc[train_idx], X.iloc[test_idx], cache_dir
+    
+    # Pooled out-of-sample R2 over a candidate's first n folds
+    def pooled_score(name, n):
+        y_true = np.concatenate([y.values[folds[k][1]] for k in range(n)])
+        y_pred = np.concatenate([predictions[name][k] for k in range(n)])
+        return r2_score(y_true, y_pred)
+    
+    predictions = {name: {} for name in candidates}
+    alive = set(candidates)
+    pruned_after = {}
+    
+    executor = None
+    if n_jobs == 1:
+        results = ((name, k, score_fold(*task_args(name, k))) for name, k in tasks if name in alive)
+    else:
+        executor = ProcessPoolExecutor(max_workers=n_jobs)
+        futures = {executor.submit(score_fold, *task_args(name, k)): (name, k) for name, k in tasks}
+        results = (futures[future] + (future.result(),) for future in as_completed(futures) if not future.cancelled())
+    
+    rounds_checked = 0
+    try:
+        for name, k, fold_predictions in results:
+            if name not in alive:
+                continue
+            predictions[name][k] = fold_predictions
+            
+            # Number of leading folds every remaining candidate has finished
+            rounds = min(next(n for n in range(len(folds) + 1) if n not in predictions[candidate])
+                         for candidate in alive)
+            if max(rounds_checked, min_folds - 1) < rounds < len(folds):
+                rounds_checked = rounds
+                scores = {candidate: pooled_score(candidate, rounds) for candidate in alive}
+                leader = max(scores.values())
+                for pruned in [candidate for candidate in alive if scores[candidate] < leader - prune_margin]:
+                    alive.discard(pruned)
+                    pruned_after[pruned] = rounds
+                if executor is not None:
+                    for future, (candidate, _) in futures.items():
+                        if candidate not in alive:
+                            future.cancel()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    
+    leaderboard = pd.DataFrame({
+        'Model': list(candidates),
+        'Folds': [pruned_after.get(name, len(folds)) for name in candidates],
+        'Pruned': [name in pruned_after for name in candidates]
+    })
+    leaderboard['R2'] = [pooled_score(name, n) for name, n in zip(leaderboard['Model'], leaderboard['Folds'])]
+    leaderboard = leaderboard.sort_values(['Pruned', 'R2'], ascending=[True, False]).reset_index(drop=True)
+    
+    # Refit the winner on the full history
+    best_name = leaderboard['Model'].iloc[0]
+    estimator_class, params = candidates[best_name]
+    best_model = fit_cached_model(estimator_class, params, X, y, cache_dir)
+    
+    return best_model, leaderboard['R2'].iloc[0], leaderboard
+
+# Analyze the impact of marketing spending on revenue (cache_dir: fitted model cache, see run_model_tournament)
+def marketing_impact_analysis(monthly_orders, candidates=MODEL_CANDIDATES, n_jobs=None, cache_dir=None):
+    import statsmodels.api as sm
+    
     # Create lag features for marketing spend
     for channel in ['TV_Spend', 'Radio_Spend', 'Digital_Spend', 'Social_Spend', 'Print_Spend', 'Outdoor_Spend']:
         monthly_orders[f'{channel}_Lag1'] = monthly_orders[channel].shift(1)
@@ -437,28 +941,8 @@ def marketing_impact_analysis(monthly_orders):
     X = model_data[X_cols]
     y = model_data['Revenue']
     
-    # Train-test split
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
-    
-    # Train multiple models
-    models = {
-        'Linear Regression': LinearRegression(),
-        'ElasticNet': ElasticNet(alpha=0.5, l1_ratio=0.5, random_state=42),
-        'Random Forest': RandomForestRegressor(n_estimators=100, random_state=42),
-        'Gradient Boosting': GradientBoostingRegressor(n_estimators=100, random_state=42)
-    }
-    
-    best_model = None
-    best_score = -float('inf')
-    
-    for name, model in models.items():
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
-        r2 = r2_score(y_test, y_pred)
-        
-        if r2 > best_score:
-            best_score = r2
-            best_model = model
+    # Train multiple models and pick the best on time-ordered folds
+    best_model, best_score, leaderboard = run_model_tournament(X, y, candidates, n_jobs=n_jobs, cache_dir=cache_dir)
     
     # For interpretability, use statsmodels with the same features
     X_sm = sm.add_constant(X)
@@ -468,6 +952,7 @@ def marketing_impact_analysis(monthly_orders):
     model_summary = {
         'best_model': best_model,
         'best_model_score': best_score,
+        'model_leaderboard': leaderboard,
         'statsmodels_summary': sm_model.summary(),
         'feature_importance': None
     }
@@ -490,6 +975,12 @@ def marketing_impact_analysis(monthly_orders):
     
     return model_summary, sm_model
 
+# Stage wrapper: marketing_impact_analysis adds lag columns to monthly_orders in place, and the
+# later stages use those columns, so the extended frame is returned as an output of its own
+def marketing_impact_stage(monthly_orders, cache_dir=None):
+    model_summary, sm_model = marketing_impact_analysis(monthly_orders, cache_dir=cache_dir)
+    return model_summary, sm_model, monthly_orders
+
 # Calculate the optimal budget allocation
 def optimize_marketing_budget(sm_model, monthly_orders, future_budget=None):
     # Get the last month's total spend as baseline
@@ -504,36 +995,12 @@ def optimize_marketing_budget(sm_model, monthly_orders, future_budget=None):
     if future_budget is None:
         future_budget = total_current_spend
     
-    # Extract coefficients from statsmodels results
-    coefs = sm_model.params
-    
-    # Create a dictionary of channel -> coefficient (ROI impact)
-    channel_impact = {
-        'TV': coefs['TV_Spend_Lag1'] + coefs['TV_Spend_Lag2'],
-        'Radio': coefs['Radio_Spend_Lag1'] + coefs['Radio_Spend_Lag2'],
-        'Digital': coefs['Digital_Spend_Lag1'] + coefs['Digital_Spend_Lag2'],
-        'Social': coefs['Social_Spend_Lag1'] + coefs['Social_Spend_Lag2'],
-        'Print': coefs['Print_Spend_Lag1'] + coefs['Print_Spend_Lag2'],
-        'Outdoor': coefs['Outdoor_Spend_Lag1'] + coefs['Outdoor_Spend_Lag2']
-    }
-    
-    # Calculate total impact
-    total_impact = sum(max(0, impact) for impact in channel_impact.values())
+    # Combined lag coefficient per channel (ROI impact)
+    channel_impact = channel_impact_sets(sm_model).loc['Estimate']
     
     # Allocate budget based on relative impact (only for positive impacts)
-    optimized_budget = {}
-    
-    for channel, impact in channel_impact.items():
-        if impact > 0:
-            optimized_budget[channel] = future_budget * (impact / total_impact)
-        else:
-            optimized_budget[channel] = 0
-    
-    # Handle the case where all channels have negative impact (unlikely)
-    if total_impact <= 0:
-        # Fallback to equal distribution
-        for channel in channel_impact.keys():
-            optimized_budget[channel] = future_budget / len(channel_impact)
+    allocation = allocate_budget_proportional(channel_impact.values[None, :], np.array([future_budget]))[0]
+    optimized_budget = dict(zip(BUDGET_CHANNELS, allocation))
     
     # Create a comparison with current allocation
     current_allocation = {
@@ -561,326 +1028,925 @@ def optimize_marketing_budget(sm_model, monthly_orders, future_budget=None):
     
     return comparison
 
-# Analyze the relationship between product categories and marketing channels
-def category_channel_analysis(orders_clean, media_data):
-    # Simulate category response to different channels
-    # In a real-world scenario, this would be based on actual data
-    category_channel_response = {
-        'EntertainmentSmall': {
-            'TV': 0.6,
-            'Radio': 0.3,
-            'Digital': 0.8,
-            'Social': 0.7,
-            'Print': 0.2,
-            'Outdoor': 0.1
-        },
-        'GamingHardware': {
-            'TV': 0.5,
-            'Radio': 0.2,
-            'Digital': 0.9,
-            'Social': 0.8,
-            'Print': 0.1,
-            'Outdoor': 0.1
-        },
-        'ComputersHardware': {
-            'TV': 0.7,
-            'Radio': 0.4,
-            'Digital': 0.8,
-            'Social': 0.6,
-            'Print': 0.5,
-            'Outdoor': 0.3
-        },
-        'MobilesPhones': {
-            'TV': 0.8,
-            'Radio': 0.5,
-            'Digital': 0.9,
-            'Social': 0.8,
-            'Print': 0.5,
-            'Outdoor': 0.4
-        },
-        'Audio': {
-            'TV': 0.6,
-            'Radio': 0.7,
-            'Digital': 0.7,
-            'Social': 0.6,
-            'Print': 0.3,
-            'Outdoor': 0.2
-        }
-    }
-    
-    # Create a response matrix (will use synthetic data since we don't have real mappings)
-    categories = list(set(orders_clean['product_analytic_category']))
-    channels = ['TV', 'Radio', 'Digital', 'Social', 'Print', 'Outdoor']
-    
-    response_data = []
-    
-    for category in categories:
-        category_response = category_channel_response.get(category, {})
-        
-        for channel in channels:
-            # Default response if category not in predefined dict
-            response = category_response.get(channel, np.random.uniform(0.1, 0.9))
-            
-            response_data.append({
-                'Category': category,
-                'Channel': channel,
-                'Response_Factor': response
-            })
+# Marketing channels of the budget model and the grid of budget changes the scenario sweep evaluates
+BUDGET_CHANNELS = ['TV', 'Radio', 'Digital', 'Social', 'Print', 'Outdoor']
+BUDGET_CHANGES = np.round(np.arange(-0.5, 1.0001, 0.05), 2)
+
+# Combined lag coefficients per channel for the point estimate and the 95% confidence bounds
+def channel_impact_sets(sm_model):
+    coefs = pd.DataFrame({
+        'Estimate': sm_model.params,
+        'Lower_Bound': sm_model.conf_int()[0],
+        'Upper_Bound': sm_model.conf_int()[1]
+    })
+    impacts = {channel: coefs.loc[f'{channel}_Spend_Lag1'] + coefs.loc[f'{channel}_Spend_Lag2'] for channel in BUDGET_CHANNELS}
+    return pd.DataFrame(impacts)
+
+# Revenue the model expects in a month without marketing spend
+def model_baseline_revenue(sm_model, month):
+    coefs = sm_model.params
+    baseline_cols = [col for col in coefs.index if col != 'const' and '_Spend_' not in col]
+    return coefs.get('const', 0) + sum(coefs[col] * month[col] for col in baseline_cols)
+
+# Evaluate a grid of budget scenarios in one pass: every total budget (current spend scaled by
+# budget_changes) under every set of channel caps and every coefficient set (estimate and
+# confidence bounds). caps maps a scenario name to {channel: maximum budget} (None for no caps).
+# Returns the spend -> expected revenue frontier with the allocation per channel.
+def budget_scenarios(sm_model, monthly_orders, budget_changes=BUDGET_CHANGES, caps=None):
+    last_month = monthly_orders.iloc[-1]
+    current_allocation = np.array([last_month[f'{channel}_Spend'] for channel in BUDGET_CHANNELS])
+    total_current_spend = current_allocation.sum()
+    
+    baseline_revenue = model_baseline_revenue(sm_model, last_month)
+    
+    # Confidence bounds are undefined when the model has no residual degrees of freedom
+    impact_sets = channel_impact_sets(sm_model)
+    impact_sets = impact_sets[np.isfinite(impact_sets.values).all(axis=1)]
+    if caps is None:
+        caps = {'Uncapped': None}
+    cap_matrix = np.array([[np.inf if not cap else cap.get(channel, np.inf) for channel in BUDGET_CHANNELS]
+                           for cap in caps.values()])
+    budget_changes = np.asarray(budget_changes, dtype=float)
+    
+    # Cartesian product of coefficient sets x cap scenarios x budgets, one row per scenario
+    n_sets, n_caps, n_budgets = len(impact_sets), len(caps), len(budget_changes)
+    set_idx, cap_idx, budget_idx = [idx.ravel() for idx in np.indices((n_sets, n_caps, n_budgets))]
+    impacts = impact_sets.values[set_idx]
+    budgets = total_current_spend * (1 + budget_changes[budget_idx])
+    allocation = allocate_budget_proportional(impacts, budgets, cap_matrix[cap_idx])
+    
+    incremental_revenue = (impacts * allocation).sum(axis=1)
+    frontier = pd.DataFrame({
+        'Coefficient_Set': impact_sets.index.values[set_idx],
+        'Cap_Scenario': np.array(list(caps.keys()), dtype=object)[cap_idx],
+        'Budget_Change_Percentage': budget_changes[budget_idx] * 100,
+        'Total_Budget': budgets,
+        'Allocated_Budget': allocation.sum(axis=1),
+        'Incremental_Revenue': incremental_revenue,
+        'Expected_Revenue': baseline_revenue + incremental_revenue
+    })
+    for i, channel in enumerate(BUDGET_CHANNELS):
+        frontier[f'{channel}_Budget'] = allocation[:, i]
+    
+    # Revenue gained per extra unit of budget from the previous budget level, and whether a
+    # scenario beats every cheaper one with the same coefficients and caps (the efficient frontier)
+    frontier = frontier.sort_values(['Coefficient_Set', 'Cap_Scenario', 'Total_Budget'], kind='stable').reset_index(drop=True)
+    groups = frontier.groupby(['Coefficient_Set', 'Cap_Scenario'], sort=False)
+    frontier['Marginal_ROI'] = (groups['Expected_Revenue'].diff() / groups['Allocated_Budget'].diff()).replace([np.inf, -np.inf], np.nan)
+    previous_best = groups['Expected_Revenue'].transform(lambda revenue: revenue.cummax().shift(1))
+    frontier['Efficient'] = previous_best.isna() | (frontier['Expected_Revenue'] > previous_best)
+    
+    return frontier
+
+# OLS refits of a chunk of bootstrap replicates on the precomputed design matrix (runs in the
+# worker processes); the pseudo-inverse matches statsmodels' default fit, also when rank deficient.
+# The moving-block resampling is mm_model's, shared with the Michaelis-Menten bootstrap.
+def bootstrap_ols_chunk(exog, endog, n_replicates, block_size, seed):
+    from mm_model import block_bootstrap_indices
+    rng = np.random.default_rng(seed)
+    indices = block_bootstrap_indices(len(endog), n_replicates, block_size, rng)
+    return (np.linalg.pinv(exog[indices]) @ endog[indices][:, :, None])[:, :, 0]
+
+# Block-bootstrap percentile intervals for every OLS coefficient, each channel's impact and the
+# optimised allocation of the current budget. Chunks of replicates run in a process pool
+# (n_jobs=1 runs them here), each with its own seed stream, so results depend only on seed.
+def bootstrap_channel_impact(sm_model, monthly_orders, n_replicates=2000, block_size=3, ci=0.95, seed=42,
+                             n_jobs=None, chunk_size=250):
+    exog = np.asarray(sm_model.model.exog, dtype=float)
+    endog = np.asarray(sm_model.model.endog, dtype=float)
+    names = list(sm_model.model.exog_names)
+    
+    sizes = [len(chunk) for chunk in np.array_split(np.arange(n_replicates), -(-n_replicates // chunk_size))]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(exog, endog, size, block_size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    if n_jobs == 1:
+        chunks = [bootstrap_ols_chunk(*chunk_args) for chunk_args in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            chunks = list(executor.map(bootstrap_ols_chunk, *zip(*args)))
+    coefs = np.concatenate(chunks)
+    
+    tail = (1 - ci) / 2 * 100
+    coefficient_intervals = pd.DataFrame({
+        'Estimate': sm_model.params.values,
+        'Lower': np.percentile(coefs, tail, axis=0),
+        'Upper': np.percentile(coefs, 100 - tail, axis=0)
+    }, index=names)
+    
+    # Channel impacts and the allocation of the current budget in every replicate
+    position = {name: i for i, name in enumerate(names)}
+    impacts = np.column_stack([coefs[:, position[f'{channel}_Spend_Lag1']] + coefs[:, position[f'{channel}_Spend_Lag2']]
+                               for channel in BUDGET_CHANNELS])
+    last_month = monthly_orders.iloc[-1]
+    total_current_spend = sum(last_month[f'{channel}_Spend'] for channel in BUDGET_CHANNELS)
+    allocation = allocate_budget_proportional(impacts, np.full(len(impacts), total_current_spend))
+    
+    channel_impact = channel_impact_sets(sm_model).loc['Estimate'].values
+    channel_intervals = pd.DataFrame({
+        'Channel': BUDGET_CHANNELS,
+        'Impact_Coefficient': channel_impact,
+        'Impact_Lower': np.percentile(impacts, tail, axis=0),
+        'Impact_Upper': np.percentile(impacts, 100 - tail, axis=0),
+        'Optimized_Budget': allocate_budget_proportional(channel_impact[None, :], np.array([total_current_spend]))[0],
+        'Budget_Lower': np.percentile(allocation, tail, axis=0),
+        'Budget_Upper': np.percentile(allocation, 100 - tail, axis=0)
+    })
     
-    response_df = pd.DataFrame(response_data)
+    return coefficient_intervals, channel_intervals
+
+# Save the fitted impact models in the model registry with the numbers the score-only
+# mode needs (channel impacts, baseline revenue, current allocation)
+def register_impact_models(model_summary, sm_model, monthly_orders, registry_dir=REGISTRY_DIR):
+    fingerprint = data_fingerprint(monthly_orders)
+    last_month = monthly_orders.iloc[-1]
+    
+    channel_version = register_model(
+        CHANNEL_IMPACT_MODEL, sm_model, sm_model.model.exog_names, fingerprint,
+        metrics={'r2': sm_model.rsquared, 'n_obs': sm_model.nobs},
+        score_params={
+            'channels': BUDGET_CHANNELS,
+            'impacts': channel_impact_sets(sm_model).loc['Estimate'].values,
+            'baseline_revenue': model_baseline_revenue(sm_model, last_month),
+            'current_allocation': [last_month[f'{channel}_Spend'] for channel in BUDGET_CHANNELS],
+            'coefficient_names': list(sm_model.params.index),
+            'coefficients': sm_model.params.values
+        },
+        registry_dir=registry_dir
+    )
     
-    # Get revenue by category
-    category_revenue = orders_clean.groupby('product_analytic_category')['gmv'].sum().reset_index()
-    category_revenue.rename(columns={'gmv': 'Revenue'}, inplace=True)
+    best_model = model_summary['best_model']
+    best_version = register_model(
+        BEST_IMPACT_MODEL, best_model, getattr(best_model, 'feature_names_in_', []), fingerprint,
+        metrics={'r2': model_summary['best_model_score']},
+        registry_dir=registry_dir
+    )
     
-    # Merge with response data
-    response_df = response_df.merge(category_revenue, left_on='Category', right_on='product_analytic_category', how='left')
+    return {CHANNEL_IMPACT_MODEL: channel_version, BEST_IMPACT_MODEL: best_version}
+
+# Analyze the relationship between product categories and marketing channels
+# (category_revenue, a Series of GMV by category, can stand in for orders_clean).
+# level 'sub_category' or 'vertical' scores those segments of orders_clean instead of categories.
+def category_channel_analysis(orders_clean, media_data, category_revenue=None, level='category'):
+    # Simulate category response to different channels (see response_matrix.py)
+    if category_revenue is None:
+        matrix = ResponseMatrix.from_orders(orders_clean, level)
+    else:
+        matrix = ResponseMatrix.simulate(category_revenue)
     
-    # Calculate an effectiveness score (revenue * response factor)
-    response_df['Effectiveness_Score'] = response_df['Revenue'] * response_df['Response_Factor']
+    # Response factors, revenue and effectiveness score (revenue * response factor) per channel
+    response_df = matrix.to_frame()
     
-    # Get top channel for each category
-    top_channels = response_df.sort_values('Effectiveness_Score', ascending=False).groupby('Category').head(2)
+    # Get top channels for each category
+    top_channels = matrix.top_frame(2)
     
     return response_df, top_channels
 
-# Generate visualizations
-def create_visualizations(orders_clean, weather_clean, monthly_orders, comparison, category_agg, response_df, top_channels):
-    # Create a directory for visualizations
-    import os
-    if not os.path.exists('visualizations'):
-        os.makedirs('visualizations')
-    
-    # 1. Revenue Trend Analysis
-    plt.figure(figsize=(12, 6))
-    plt.plot(monthly_orders['Date'], monthly_orders['Revenue'] / 1000, marker='o', linewidth=2)
+# 1. Revenue Trend Analysis
+def plot_revenue_trend(data):
+    import matplotlib.pyplot as plt
+    plt.plot(data['Date'], data['Revenue'] / 1000, marker='o', linewidth=2)
     plt.title('Monthly Revenue Trend (2023-2024)', fontsize=14)
     plt.xlabel('Month', fontsize=12)
     plt.ylabel('Revenue (Thousands)', fontsize=12)
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('visualizations/revenue_trend.png')
-    plt.close()
-    
-    # 2. Marketing Spend by Channel
-    plt.figure(figsize=(12, 6))
-    channels = ['TV_Spend', 'Digital_Spend', 'Social_Spend', 'Radio_Spend', 'Print_Spend', 'Outdoor_Spend']
-    for channel in channels:
-        plt.plot(monthly_orders['Date'], monthly_orders[channel] / 1000, marker='o', label=channel.replace('_Spend', ''))
+
+# 2. Marketing Spend by Channel
+def plot_marketing_spend(data):
+    import matplotlib.pyplot as plt
+    for channel in data.columns.drop('Date'):
+        plt.plot(data['Date'], data[channel] / 1000, marker='o', label=channel.replace('_Spend', ''))
     plt.title('Monthly Marketing Spend by Channel', fontsize=14)
     plt.xlabel('Month', fontsize=12)
     plt.ylabel('Spend (Thousands)', fontsize=12)
     plt.legend()
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('visualizations/marketing_spend.png')
-    plt.close()
-    
-    # 3. ROI by Marketing Channel
-    plt.figure(figsize=(12, 6))
-    roi_cols = ['TV_ROI', 'Radio_ROI', 'Digital_ROI', 'Social_ROI', 'Print_ROI', 'Outdoor_ROI']
-    for col in roi_cols:
-        plt.plot(monthly_orders['Date'], monthly_orders[col], marker='o', label=col.replace('_ROI', ''))
+
+# 3. ROI by Marketing Channel
+def plot_channel_roi(data):
+    import matplotlib.pyplot as plt
+    for col in data.columns.drop('Date'):
+        plt.plot(data['Date'], data[col], marker='o', label=col.replace('_ROI', ''))
     plt.title('ROI by Marketing Channel', fontsize=14)
     plt.xlabel('Month', fontsize=12)
     plt.ylabel('ROI', fontsize=12)
     plt.legend()
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('visualizations/channel_roi.png')
-    plt.close()
-    
-    # 4. Budget Optimization Comparison
-    plt.figure(figsize=(12, 6))
-    x = np.arange(len(comparison))
+
+# 4. Budget Optimization Comparison
+def plot_budget_optimization(data):
+    import matplotlib.pyplot as plt
+    x = np.arange(len(data))
     width = 0.35
-    plt.bar(x - width/2, comparison['Current_Percentage'], width, label='Current Allocation (%)')
-    plt.bar(x + width/2, comparison['Optimized_Percentage'], width, label='Optimized Allocation (%)')
+    plt.bar(x - width/2, data['Current_Percentage'], width, label='Current Allocation (%)')
+    plt.bar(x + width/2, data['Optimized_Percentage'], width, label='Optimized Allocation (%)')
     plt.axhline(y=0, color='black', linestyle='-', alpha=0.3)
-    plt.xticks(x, comparison['Channel'])
+    plt.xticks(x, data['Channel'])
     plt.title('Current vs Optimized Budget Allocation', fontsize=14)
     plt.xlabel('Channel', fontsize=12)
     plt.ylabel('Budget Percentage', fontsize=12)
     plt.legend()
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('visualizations/budget_optimization.png')
-    plt.close()
-    
-    # 5. Category Revenue Analysis
-    plt.figure(figsize=(12, 6))
-    plt.bar(category_agg['product_analytic_category'], category_agg['Total_Revenue'] / 1000)
+
+# 5. Category Revenue Analysis
+def plot_category_revenue(data):
+    import matplotlib.pyplot as plt
+    plt.bar(data['product_analytic_category'], data['Total_Revenue'] / 1000)
     plt.title('Revenue by Product Category', fontsize=14)
     plt.xlabel('Category', fontsize=12)
     plt.ylabel('Revenue (Thousands)', fontsize=12)
     plt.xticks(rotation=45, ha='right')
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('visualizations/category_revenue.png')
-    plt.close()
-    
-    # 6. NPS Score vs Revenue
-    plt.figure(figsize=(12, 6))
-    plt.scatter(monthly_orders['NPS_Score'], monthly_orders['Revenue'] / 1000, s=100, alpha=0.7)
+
+# 6. NPS Score vs Revenue
+def plot_nps_revenue(data):
+    import matplotlib.pyplot as plt
+    plt.scatter(data['NPS_Score'], data['Revenue'] / 1000, s=100, alpha=0.7)
     plt.title('NPS Score vs Revenue', fontsize=14)
     plt.xlabel('NPS Score', fontsize=12)
     plt.ylabel('Revenue (Thousands)', fontsize=12)
-    z = np.polyfit(monthly_orders['NPS_Score'], monthly_orders['Revenue'] / 1000, 1)
+    z = np.polyfit(data['NPS_Score'], data['Revenue'] / 1000, 1)
     p = np.poly1d(z)
-    plt.plot(monthly_orders['NPS_Score'], p(monthly_orders['NPS_Score']), "r--", alpha=0.7)
+    plt.plot(data['NPS_Score'], p(data['NPS_Score']), "r--", alpha=0.7)
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('visualizations/nps_revenue.png')
-    plt.close()
-    
-    # 7. Category-Channel Response Heatmap
-    pivot_data = response_df.pivot(index='Category', columns='Channel', values='Response_Factor')
-    plt.figure(figsize=(12, 8))
+
+# 7. Category-Channel Response Heatmap
+# (one row per segment of the level the response matrix was built at, see heatmap_data)
+def plot_category_channel_heatmap(data):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    pivot_data = data.pivot_table(index='Segment', columns='Channel', values='Response_Factor', aggfunc='mean',
+                                  observed=True)
     sns.heatmap(pivot_data, annot=True, cmap='YlGnBu', vmin=0, vmax=1)
     plt.title('Marketing Channel Effectiveness by Product Category', fontsize=14)
-    plt.tight_layout()
-    plt.savefig('visualizations/category_channel_heatmap.png')
-    plt.close()
-    
-    # 8. Weather Impact on Revenue (if correlation exists)
-    # Merge weather data with daily_orders for analysis
-    # This is a simplified approach since we're using synthetic data
-    plt.figure(figsize=(12, 6))
-    weather_groups = weather_clean.groupby('Season')['Mean Temp (°C)'].mean().reset_index()
+
+# 8. Weather Impact on Revenue (if correlation exists)
+# This is a simplified approach since we're using synthetic data
+def plot_seasonal_temperature(data):
+    import matplotlib.pyplot as plt
     season_colors = {'Winter': 'blue', 'Spring': 'green', 'Summer': 'red', 'Fall': 'orange'}
-    plt.bar(weather_groups['Season'], weather_groups['Mean Temp (°C)'], color=[season_colors[s] for s in weather_groups['Season']])
+    plt.bar(data['Season'], data['Mean Temp (°C)'], color=[season_colors[s] for s in data['Season']])
     plt.title('Average Temperature by Season', fontsize=14)
     plt.xlabel('Season', fontsize=12)
     plt.ylabel('Mean Temperature (°C)', fontsize=12)
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('visualizations/seasonal_temperature.png')
-    plt.close()
-    
-    # 9. Top Marketing Channels by Product Category
-    plt.figure(figsize=(12, 8))
-    sns.barplot(data=top_channels, x='Category', y='Effectiveness_Score', hue='Channel')
+
+# 9. Top Marketing Channels by Product Category
+def plot_top_channels_by_category(data):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.barplot(data=data, x='Category', y='Effectiveness_Score', hue='Channel')
     plt.title('Top Marketing Channels by Product Category', fontsize=14)
     plt.xlabel('Product Category', fontsize=12)
     plt.ylabel('Effectiveness Score', fontsize=12)
     plt.xticks(rotation=45, ha='right')
     plt.legend(title='Channel')
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('visualizations/top_channels_by_category.png')
-    plt.close()
-    
-    # 10. Correlation Heatmap for Marketing Variables
-    plt.figure(figsize=(14, 10))
-    corr_cols = ['Revenue', 'Orders', 'TV_Spend', 'Radio_Spend', 'Digital_Spend', 
-                'Social_Spend', 'Print_Spend', 'Outdoor_Spend', 'NPS_Score']
-    corr = monthly_orders[corr_cols].corr()
+
+# 10. Correlation Heatmap for Marketing Variables
+def plot_correlation_heatmap(data):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    corr = data.set_index('Variable')
+    corr.index.name = None
     mask = np.triu(np.ones_like(corr, dtype=bool))
     sns.heatmap(corr, mask=mask, cmap='coolwarm', annot=True, fmt='.2f', linewidths=0.5)
     plt.title('Correlation Heatmap for Marketing Variables', fontsize=14)
-    plt.tight_layout()
-    plt.savefig('visualizations/correlation_heatmap.png')
-    plt.close()
 
-# Main function to run the entire analysis
-def main():
-    # Load data
-    weather_data, order_data = load_data()
-    
-    # Preprocess data
-    weather_clean = preprocess_weather(weather_data)
-    orders_clean = preprocess_orders(order_data)
-    
-    # Generate synthetic data
-    media_data = generate_synthetic_media_data()
-    holidays_df = generate_holidays()
-    sales_df = generate_sale_calendar()
-    
-    # Generate daily order aggregates
-    daily_orders = generate_daily_order_data(orders_clean, media_data, holidays_df, sales_df)
-    
-    # Perform time series analysis
-    monthly_orders = time_series_analysis(daily_orders)
-    
-    # Analyze the impact of marketing spending
-    model_summary, sm_model = marketing_impact_analysis(monthly_orders)
-    
-    # Optimize marketing budget
-    comparison = optimize_marketing_budget(sm_model, monthly_orders)
-    
-    # Aggregate orders by product category
-    category_agg = aggregate_orders_by_category(orders_clean)
+# Columns of the monthly figures
+SPEND_COLUMNS = ['TV_Spend', 'Digital_Spend', 'Social_Spend', 'Radio_Spend', 'Print_Spend', 'Outdoor_Spend']
+ROI_COLUMNS = ['TV_ROI', 'Radio_ROI', 'Digital_ROI', 'Social_ROI', 'Print_ROI', 'Outdoor_ROI']
+CORRELATION_COLUMNS = ['Revenue', 'Orders', 'TV_Spend', 'Radio_Spend', 'Digital_Spend',
+                       'Social_Spend', 'Print_Spend', 'Outdoor_Spend', 'NPS_Score']
+
+# Figures of create_visualizations: file name -> (plot function, figure size, chart spec).
+# The chart spec describes the figure for the 'json' format, which writes the spec and the
+# figure's data instead of an image, for the dashboard to draw.
+FIGURES = {
+    'revenue_trend': (plot_revenue_trend, (12, 6), {
+        'title': 'Monthly Revenue Trend (2023-2024)', 'mark': 'line', 'x': 'Date', 'y': ['Revenue']}),
+    'marketing_spend': (plot_marketing_spend, (12, 6), {
+        'title': 'Monthly Marketing Spend by Channel', 'mark': 'line', 'x': 'Date', 'y': SPEND_COLUMNS}),
+    'channel_roi': (plot_channel_roi, (12, 6), {
+        'title': 'ROI by Marketing Channel', 'mark': 'line', 'x': 'Date', 'y': ROI_COLUMNS}),
+    'budget_optimization': (plot_budget_optimization, (12, 6), {
+        'title': 'Current vs Optimized Budget Allocation', 'mark': 'bar', 'x': 'Channel',
+        'y': ['Current_Percentage', 'Optimized_Percentage']}),
+    'category_revenue': (plot_category_revenue, (12, 6), {
+        'title': 'Revenue by Product Category', 'mark': 'bar', 'x': 'product_analytic_category', 'y': ['Total_Revenue']}),
+    'nps_revenue': (plot_nps_revenue, (12, 6), {
+        'title': 'NPS Score vs Revenue', 'mark': 'point', 'x': 'NPS_Score', 'y': ['Revenue'], 'trend': 'linear'}),
+    'category_channel_heatmap': (plot_category_channel_heatmap, (12, 8), {
+        'title': 'Marketing Channel Effectiveness by Product Category', 'mark': 'heatmap',
+        'x': 'Channel', 'y': 'Segment', 'value': 'Response_Factor'}),
+    'seasonal_temperature': (plot_seasonal_temperature, (12, 6), {
+        'title': 'Average Temperature by Season', 'mark': 'bar', 'x': 'Season', 'y': ['Mean Temp (°C)']}),
+    'top_channels_by_category': (plot_top_channels_by_category, (12, 8), {
+        'title': 'Top Marketing Channels by Product Category', 'mark': 'bar',
+        'x': 'Category', 'y': ['Effectiveness_Score'], 'color': 'Channel'}),
+    # A lower-triangle matrix: one row per variable, one column per variable
+    'correlation_heatmap': (plot_correlation_heatmap, (14, 10), {
+        'title': 'Correlation Heatmap for Marketing Variables', 'mark': 'heatmap', 'x': CORRELATION_COLUMNS, 'y': 'Variable'})
+}
+
+# Most segments shown in the channel heatmap (sub-category and vertical levels have thousands)
+HEATMAP_MAX_SEGMENTS = 30
+
+# Heatmap slice of the response table: the segment column of its level as 'Segment', for the
+# max_segments segments with the most revenue
+def heatmap_data(response_df, max_segments=HEATMAP_MAX_SEGMENTS):
+    segment = next(col for col in LEVEL_COLUMNS.values() if col in response_df.columns)
+    revenue = response_df.groupby(segment, observed=True)['Revenue'].first()
+    top = revenue.nlargest(max_segments).index
+    data = response_df.loc[response_df[segment].isin(top), [segment, 'Channel', 'Response_Factor']]
+    return data.rename(columns={segment: 'Segment'})
+
+# The data slice every figure is drawn from, so a figure is only redrawn when its slice changes
+def figure_data(weather_clean, monthly_orders, comparison, category_agg, response_df, top_channels):
+    return {
+        'revenue_trend': monthly_orders[['Date', 'Revenue']],
+        'marketing_spend': monthly_orders[['Date'] + SPEND_COLUMNS],
+        'channel_roi': monthly_orders[['Date'] + ROI_COLUMNS],
+        'budget_optimization': comparison[['Channel', 'Current_Percentage', 'Optimized_Percentage']],
+        'category_revenue': category_agg[['product_analytic_category', 'Total_Revenue']],
+        'nps_revenue': monthly_orders[['NPS_Score', 'Revenue']],
+        'category_channel_heatmap': heatmap_data(response_df),
+        'seasonal_temperature': weather_clean.groupby('Season')['Mean Temp (°C)'].mean().reset_index(),
+        'top_channels_by_category': top_channels[['Category', 'Channel', 'Effectiveness_Score']],
+        'correlation_heatmap': monthly_orders[CORRELATION_COLUMNS].corr().rename_axis('Variable').reset_index()
+    }
+
+# Headless plotting in the report style; figures are only saved to files, also from worker processes
+def setup_plotting():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.style.use('ggplot')
+    sns.set(style='whitegrid')
+    return plt
+
+# Key of a figure: its data slice, its plot function's code, its spec and the output format
+def figure_key(name, data, figure_format):
+    plot, figsize, spec = FIGURES[name]
+    parts = [
+        name, figure_format, repr(figsize), repr(spec), code_fingerprint(plot),
+        repr(list(data.columns)), repr(list(data.dtypes.astype(str))),
+        hashlib.sha256(pd.util.hash_pandas_object(data, index=True).values.tobytes()).hexdigest(),
+        importlib.metadata.version('matplotlib'), importlib.metadata.version('seaborn')
+    ]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+# Draw one figure with the headless backend and save it, or write its chart spec and data
+def render_figure(name, data, path, figure_format=FIGURE_FORMAT):
+    plot, figsize, spec = FIGURES[name]
+    if figure_format == 'json':
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'name': name, **spec, 'data': frame_to_columns(data)}, f, separators=(',', ':'), allow_nan=False)
+        os.replace(path + '.tmp', path)
+        return path
+    
+    plt = setup_plotting()
+    fig = plt.figure(figsize=figsize)
+    try:
+        plot(data)
+        plt.tight_layout()
+        plt.savefig(path, format=figure_format)
+    finally:
+        plt.close(fig)
+    return path
+
+# Generate visualizations
+# Figures are drawn in parallel (n_jobs worker processes, 1 draws in this process), and a figure
+# whose data slice and code are unchanged since the last run is not redrawn.
+# figure_format is 'png', a vector format ('svg', 'pdf') or 'json' for chart specs.
+def create_visualizations(weather_clean, monthly_orders, comparison, category_agg, response_df, top_channels,
+                          n_jobs=None, figure_format=FIGURE_FORMAT, output_dir=VISUALIZATION_DIR):
+    # Create a directory for visualizations
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    
+    keys_path = os.path.join(output_dir, FIGURE_KEYS_FILE)
+    keys = {}
+    if os.path.exists(keys_path):
+        with open(keys_path) as f:
+            keys = json.load(f)
+    
+    tasks, paths = [], {}
+    for name, data in figure_data(weather_clean, monthly_orders, comparison, category_agg, response_df, top_channels).items():
+        file_name = f'{name}.{figure_format}'
+        key = figure_key(name, data, figure_format)
+        paths[name] = os.path.join(output_dir, file_name)
+        if keys.get(file_name) != key or not os.path.exists(paths[name]):
+            tasks.append((name, data, paths[name], figure_format, key))
+    
+    if n_jobs == 1 or len(tasks) <= 1:
+        for name, data, path, fmt, _ in tasks:
+            render_figure(name, data, path, fmt)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            list(executor.map(render_figure, *zip(*[task[:4] for task in tasks])))
+    
+    # Keys are recorded once the figures are written
+    if tasks:
+        keys.update({os.path.basename(path): key for _, _, path, _, key in tasks})
+        with open(keys_path + '.tmp', 'w') as f:
+            json.dump(keys, f, indent=2)
+        os.replace(keys_path + '.tmp', keys_path)
+    
+    print(f"Rendered {len(tasks)} changed of {len(paths)} figures to {output_dir}")
+    return paths
+
+# Names of globals used by a code object, including nested functions and comprehensions
+def referenced_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= referenced_names(const)
+    return names
+
+# Whether an object is defined in this script or in a helper module next to it
+def is_local(obj):
+    module = sys.modules.get(obj.__module__)
+    path = getattr(module, '__file__', None)
+    return path is not None and os.path.dirname(os.path.abspath(path)) == os.path.dirname(os.path.abspath(__file__))
+
+# Fingerprint of a function's code, following the functions, classes and constants of this
+# module (and of the helper modules next to it) it refers to, so editing a helper invalidates
+# every stage that uses it
+def code_fingerprint(func, seen=None):
+    seen = set() if seen is None else seen
+    seen.add(func.__name__)
+    
+    # Classes are fingerprinted through their methods (including class and static methods)
+    methods = [func] if inspect.isfunction(func) else [
+        getattr(obj, '__func__', obj) for obj in vars(func).values() if inspect.isfunction(getattr(obj, '__func__', obj))
+    ]
+    parts = [inspect.getsource(method) for method in methods]
+    names = set().union(*(referenced_names(method.__code__) for method in methods))
+    namespace = vars(sys.modules[func.__module__])
+    for name in sorted(names - seen):
+        obj = namespace.get(name)
+        if (inspect.isfunction(obj) or inspect.isclass(obj)) and is_local(obj):
+            parts.append(code_fingerprint(obj, seen))
+        elif isinstance(obj, (str, int, float, tuple, list, dict, np.ndarray)):
+            parts.append(f'{name}={obj!r}')
+    
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+# Fingerprint of an input file from its path, size and modification time
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'
+
+# Pickled stage outputs keyed by fingerprint, with an LRU size cap
+class StageCache:
+    def __init__(self, cache_dir=STAGE_CACHE_DIR, max_bytes=STAGE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+    
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None
+        # The modification time records the last use for LRU eviction
+        # (another process may have evicted the entry since it was read)
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+        return True, value
+    
+    # Several processes (the tournament's workers) can put and evict in the same directory at once,
+    # so temporary files are per process and entries that disappear meanwhile are skipped
+    def put(self, key, value):
+        tmp_path = f'{self.path(key)}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path(key))
+        self.evict(keep=key)
+    
+    def evict(self, keep=None):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pkl'):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name != f'{keep}.pkl':
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+
+# A pipeline stage. inputs maps the function's parameter names to the outputs of other stages
+# (a list means the names are the same), params are fixed keyword arguments, files are input
+# files the stage reads, and stages with side effects (plots) are never cached.
+class Stage:
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, files=(), cached=True):
+        self.name = name
+        self.func = func
+        self.inputs = dict(inputs) if isinstance(inputs, dict) else {name: name for name in inputs}
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.files = list(files)
+        self.cached = cached
+
+# CPU seconds used by this process and its finished child processes (the model and bootstrap workers)
+def cpu_time():
+    cpu = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+    return cpu
+
+# Peak resident set size of this process and of its largest finished child process, in bytes
+def peak_rss():
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+# Memory of the DataFrames and Series among a stage's outputs, in bytes
+def frame_memory(values):
+    total = 0
+    for value in values:
+        if isinstance(value, pd.DataFrame):
+            total += int(value.memory_usage(deep=True).sum())
+        elif isinstance(value, pd.Series):
+            total += int(value.memory_usage(deep=True))
+    return total
+
+# Name of the slowest stage in a trace file, None without a trace
+def slowest_traced_stage(trace_file=TRACE_FILE):
+    try:
+        with open(trace_file) as f:
+            events = json.load(f)['traceEvents']
+    except (OSError, ValueError, KeyError):
+        return None
+    stages = [event for event in events if event.get('cat') == 'stage']
+    return max(stages, key=lambda event: event['dur'])['name'] if stages else None
+
+# Records wall and CPU time, peak RSS and output DataFrame memory of every stage it wraps.
+# profile names a stage to run under cProfile; 'slowest' picks the slowest stage of the
+# previous trace, so a first traced run finds the bottleneck and the next one profiles it.
+class StageTracer:
+    def __init__(self, trace_file=TRACE_FILE, profile=None):
+        self.trace_file = trace_file
+        self.profile = slowest_traced_stage(trace_file) if profile == 'slowest' else profile
+        self.events = []
+        self.origin = time.perf_counter()
+    
+    # Wraps a block; the caller may set event['outputs'] (the stage's outputs) and event['args']
+    @contextlib.contextmanager
+    def span(self, name, category='stage'):
+        event = {'name': name, 'cat': category, 'args': {}}
+        profiler = cProfile.Profile() if category == 'stage' and name == self.profile else None
+        rss_before, _ = peak_rss()
+        start, cpu_start = time.perf_counter(), cpu_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield event
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            end, cpu_end = time.perf_counter(), cpu_time()
+            rss, children_rss = peak_rss()
+            event['args'].update({
+                'wall_s': end - start,
+                'cpu_s': cpu_end - cpu_start,
+                'peak_rss_bytes': rss,
+                # How far the stage raised the process's high-water mark
+                'peak_rss_growth_bytes': None if rss is None else rss - rss_before,
+                'children_peak_rss_bytes': children_rss,
+                'frame_bytes': frame_memory(event.pop('outputs', ()))
+            })
+            if profiler is not None:
+                profile_path = f'{os.path.splitext(self.trace_file)[0]}.{name}.prof'
+                profiler.dump_stats(profile_path)
+                event['args']['profile'] = profile_path
+            event.update({'ph': 'X', 'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6,
+                          'pid': os.getpid(), 'tid': 0})
+            self.events.append(event)
+    
+    def write(self):
+        trace = {'traceEvents': self.events, 'displayTimeUnit': 'ms'}
+        with open(self.trace_file + '.tmp', 'w') as f:
+            json.dump(trace, f, indent=1)
+        os.replace(self.trace_file + '.tmp', self.trace_file)
+    
+    # Stages by wall time, slowest first
+    def report(self):
+        print(f"{'Stage':<42}{'Wall s':>9}{'CPU s':>9}{'Peak RSS MB':>13}{'Frames MB':>11}")
+        for event in sorted(self.events, key=lambda event: -event['dur']):
+            args = event['args']
+            name = event['name'] if event['cat'] == 'stage' else f"{event['name']} ({event['cat']})"
+            rss = '' if args['peak_rss_bytes'] is None else f"{args['peak_rss_bytes'] / 1024 ** 2:.0f}"
+            print(f"{name:<42}{args['wall_s']:>9.3f}{args['cpu_s']:>9.3f}{rss:>13}{args['frame_bytes'] / 1024 ** 2:>11.1f}")
+
+# Stage DAG evaluated lazily: an output is loaded from the cache when its stage's key
+# (code, parameters, input files and upstream keys) is unchanged, and only computed otherwise,
+# so upstream stages are not even loaded unless a downstream stage has to run
+class StagePipeline:
+    def __init__(self, stages, cache=None, tracer=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.producers = {output: stage for stage in stages for output in stage.outputs}
+        self.cache = cache
+        self.tracer = tracer
+        self.values = {}
+        self.keys = {}
+        self.hits = []
+        self.runs = []
+    
+    def key(self, stage):
+        if stage.name not in self.keys:
+            fingerprint = [
+                stage.name, code_fingerprint(stage.func), repr(sorted(stage.params.items())),
+                [file_fingerprint(path) for path in stage.files],
+                sorted((param, output, self.key(self.producers[output])) for param, output in stage.inputs.items()),
+                pd.__version__, np.__version__
+            ]
+            self.keys[stage.name] = hashlib.sha256(repr(fingerprint).encode()).hexdigest()
+        return self.keys[stage.name]
+    
+    # Outputs are cached one by one, so a command that needs a table does not unpickle the models
+    # stored next to it (nor import the libraries they need)
+    def output_key(self, stage, output):
+        return hashlib.sha256(f'{self.key(stage)}:{output}'.encode()).hexdigest()
+    
+    def get(self, output):
+        if output not in self.values:
+            stage = self.producers[output]
+            if not self.load_output(stage, output):
+                self.run_stage(stage)
+        return self.values[output]
+    
+    def span(self, name, category='stage'):
+        return self.tracer.span(name, category) if self.tracer is not None else contextlib.nullcontext({})
+    
+    def load_output(self, stage, output):
+        if self.cache is None or not stage.cached:
+            return False
+        with self.span(stage.name, 'cache') as event:
+            hit, value = self.cache.get(self.output_key(stage, output))
+            event['args'] = {'output': output, 'hit': hit}
+            if hit:
+                self.values[output] = value
+                event['outputs'] = (value,)
+        if hit and stage.name not in self.hits:
+            self.hits.append(stage.name)
+        return hit
+    
+    def run_stage(self, stage):
+        # Upstream stages run (and are traced) before this stage's span opens
+        kwargs = {param: self.get(output) for param, output in stage.inputs.items()}
+        with self.span(stage.name) as event:
+            outputs = self.store(stage, stage.func(**kwargs, **stage.params))
+            event['outputs'] = outputs
+        self.runs.append(stage.name)
+        if self.cache is not None and stage.cached:
+            for output, value in zip(stage.outputs, outputs):
+                self.cache.put(self.output_key(stage, output), value)
+    
+    def store(self, stage, result):
+        if len(stage.outputs) == 1:
+            result = (result,)
+        self.values.update(zip(stage.outputs, result))
+        return result
+
+# Split the chunked order statistics into the category revenue used downstream
+def order_category_revenue(order_stats):
+    return order_stats['category_revenue']
+
+# Aggregate the order file by category, streaming preprocessed chunks
+def aggregate_order_file_by_category(path, chunksize, order_stats):
+    return aggregate_orders_by_category_chunked(preprocess_orders_chunked(path, chunksize, order_stats))
+
+# The stages of the analysis (see main for the chunked mode, registry and bootstrap parameters);
+# model_cache_dir is where the tournament caches fitted models (None: no caching)
+def build_pipeline(chunksize=None, quantile_method='exact', registry_dir=REGISTRY_DIR, figure_format=FIGURE_FORMAT,
+                   figure_jobs=None, model_cache_dir=None, bootstrap_replicates=0, bootstrap_jobs=None):
+    stages = [
+        # Load and preprocess weather data
+        Stage('load_weather_data', load_weather_data, outputs=['weather_data'], files=[WEATHER_DATA_FILE]),
+        Stage('preprocess_weather', preprocess_weather, ['weather_data'], ['weather_clean']),
+        
+        # Generate synthetic data
+        Stage('generate_synthetic_media_data', generate_synthetic_media_data, outputs=['media_data']),
+        Stage('generate_holidays', generate_holidays, outputs=['holidays_df']),
+        Stage('generate_sale_calendar', generate_sale_calendar, outputs=['sales_df']),
+        
+        # Generate daily order aggregates (the synthetic generator does not use the orders)
+        Stage('generate_daily_order_data', generate_daily_order_data, ['media_data', 'holidays_df', 'sales_df'],
+              ['daily_orders'], params={'orders_clean': None}),
+        
+        # Perform time series analysis and analyze the impact of marketing spending
+        Stage('time_series_analysis', time_series_analysis, ['daily_orders'], ['monthly_orders']),
+        Stage('marketing_impact_analysis', marketing_impact_stage, ['monthly_orders'],
+              ['model_summary', 'sm_model', 'monthly_features'], params={'cache_dir': model_cache_dir}),
+        
+        # Optimize marketing budget
+        Stage('optimize_marketing_budget', optimize_marketing_budget,
+              {'sm_model': 'sm_model', 'monthly_orders': 'monthly_features'}, ['comparison']),
+        Stage('budget_scenarios', budget_scenarios,
+              {'sm_model': 'sm_model', 'monthly_orders': 'monthly_features'}, ['frontier']),
+        
+        # Save the fitted models (reads and writes the registry, so it always runs)
+        Stage('register_impact_models', register_impact_models,
+              {'model_summary': 'model_summary', 'sm_model': 'sm_model', 'monthly_orders': 'monthly_features'},
+              ['registered_models'], params={'registry_dir': registry_dir}, cached=False)
+    ]
     
-    # Analyze relationship between product categories and marketing channels
-    response_df, top_channels = category_channel_analysis(orders_clean, media_data)
+    if bootstrap_replicates:
+        # Bootstrap intervals of the channel impacts and the optimized budget
+        stages.append(Stage('bootstrap_channel_impact', bootstrap_channel_impact,
+                            {'sm_model': 'sm_model', 'monthly_orders': 'monthly_features'},
+                            ['coefficient_intervals', 'channel_intervals'],
+                            params={'n_replicates': bootstrap_replicates, 'n_jobs': bootstrap_jobs}))
+    
+    if chunksize is None:
+        stages += [
+            # Load and preprocess order data, aggregate by category and match with channels
+            Stage('load_order_data', load_order_data, outputs=['order_data'], files=[ORDER_DATA_FILE]),
+            Stage('preprocess_orders', preprocess_orders, ['order_data'], ['orders_clean']),
+            Stage('aggregate_orders_by_category', aggregate_orders_by_category, ['orders_clean'], ['category_agg']),
+            Stage('category_channel_analysis', category_channel_analysis, ['orders_clean', 'media_data'],
+                  ['response_df', 'top_channels'])
+        ]
+    else:
+        # Stream the order file in chunks instead
+        chunk_params = {'path': ORDER_DATA_FILE, 'chunksize': chunksize}
+        stages += [
+            Stage('compute_order_statistics', compute_order_statistics, outputs=['order_stats'],
+                  params={**chunk_params, 'quantile_method': quantile_method}, files=[ORDER_DATA_FILE]),
+            Stage('order_category_revenue', order_category_revenue, ['order_stats'], ['category_revenue']),
+            Stage('aggregate_orders_by_category', aggregate_order_file_by_category, ['order_stats'], ['category_agg'],
+                  params=chunk_params, files=[ORDER_DATA_FILE]),
+            Stage('category_channel_analysis', category_channel_analysis, ['media_data', 'category_revenue'],
+                  ['response_df', 'top_channels'], params={'orders_clean': None})
+        ]
     
     # Create visualizations
-    create_visualizations(orders_clean, weather_clean, monthly_orders, comparison, category_agg, response_df, top_channels)
-    
-    # Return key results
-    results = {
-        'weather_clean': weather_clean,
-        'orders_clean': orders_clean,
-        'media_data': media_data,
-        'daily_orders': daily_orders,
-        'monthly_orders': monthly_orders,
-        'model_summary': model_summary,
-        'budget_comparison': comparison,
-        'category_analysis': category_agg,
-        'channel_response': response_df,
-        'top_channels': top_channels
+    visualization_inputs = {
+        'weather_clean': 'weather_clean', 'monthly_orders': 'monthly_features', 'comparison': 'comparison',
+        'category_agg': 'category_agg', 'response_df': 'response_df', 'top_channels': 'top_channels'
     }
+    stages.append(Stage('create_visualizations', create_visualizations, visualization_inputs, ['visualizations'],
+                        params={'figure_format': figure_format, 'n_jobs': figure_jobs}, cached=False))
     
-    return results
+    return stages
 
-# Add this function to your marketing-analysis.py file
-def export_results_to_json(results):
-    """Export analysis results to JSON files for the React dashboard"""
-    import json
-    import os
-    import pandas as pd
+# Results returned by main: result name -> pipeline output
+RESULT_OUTPUTS = {
+    'weather_clean': 'weather_clean',
+    'orders_clean': 'orders_clean',
+    'media_data': 'media_data',
+    'daily_orders': 'daily_orders',
+    'monthly_orders': 'monthly_features',
+    'model_summary': 'model_summary',
+    'budget_comparison': 'comparison',
+    'budget_frontier': 'frontier',
+    'coefficient_intervals': 'coefficient_intervals',
+    'channel_intervals': 'channel_intervals',
+    'category_analysis': 'category_agg',
+    'channel_response': 'response_df',
+    'top_channels': 'top_channels'
+}
+
+# The results export_results_to_json writes
+EXPORT_RESULTS = ['monthly_orders', 'budget_comparison', 'budget_frontier', 'category_analysis',
+                  'channel_response', 'top_channels']
+
+# Pull results from the pipeline; outputs it does not produce (orders_clean in chunked mode, the
+# intervals without bootstrap replicates) are None
+def collect_results(pipeline, names=RESULT_OUTPUTS):
+    return {name: pipeline.get(RESULT_OUTPUTS[name]) if RESULT_OUTPUTS[name] in pipeline.producers else None
+            for name in names}
+
+# Main function to run the entire analysis
+# With chunksize set, orders are streamed in chunks of that many rows instead of loaded at once
+# (quantile_method='sketch' reads them in one pass with approximate GMV thresholds).
+# With use_cache, stage outputs are memoized in cache_dir and reused while their inputs,
+# code and parameters are unchanged (cached synthetic data is reused rather than redrawn),
+# and fitted tournament models are cached in its models subdirectory.
+# With registry_dir, the fitted impact models are saved to that model registry.
+# With a StageTracer, every stage that runs or is loaded from the cache is timed.
+# figure_format is the format of the figures ('png', 'svg', 'pdf' or 'json' chart specs).
+# With bootstrap_replicates, the channel impact intervals are bootstrapped from that many
+# replicates in bootstrap_jobs worker processes (the default 0 skips them).
+def main(chunksize=None, quantile_method='exact', use_cache=False, cache_dir=STAGE_CACHE_DIR, registry_dir=None,
+         tracer=None, figure_format=FIGURE_FORMAT, figure_jobs=None, bootstrap_replicates=0, bootstrap_jobs=None):
+    cache = StageCache(cache_dir) if use_cache else None
+    model_cache_dir = os.path.join(cache_dir, MODEL_CACHE_SUBDIR) if use_cache else None
+    pipeline = StagePipeline(build_pipeline(chunksize, quantile_method, registry_dir, figure_format, figure_jobs,
+                                            model_cache_dir, bootstrap_replicates, bootstrap_jobs), cache, tracer)
+    
+    # Create visualizations, which pulls every stage it depends on
+    pipeline.get('visualizations')
+    if registry_dir is not None:
+        pipeline.get('registered_models')
     
+    # Return key results
+    return collect_results(pipeline)
+
+# Round floats to a number of significant digits, so small ratios keep their precision,
+# but never to coarser than whole units
+def round_significant(values, digits):
+    values = np.asarray(values, dtype=float)
+    if digits is None:
+        return values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    scale = 10.0 ** np.where(np.isfinite(magnitude), np.maximum(digits - 1 - magnitude, 0), 0)
+    return np.round(values * scale) / scale
+
+# Column-oriented table: {"columns": {name: [values, ...]}}, missing and infinite values become null
+def frame_to_columns(frame, float_digits=EXPORT_FLOAT_DIGITS):
+    columns = {}
+    for col in frame.columns:
+        series = frame[col]
+        if pd.api.types.is_float_dtype(series):
+            values = round_significant(series.values, float_digits)
+            columns[col] = [value if np.isfinite(value) else None for value in values.tolist()]
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            columns[col] = series.dt.strftime('%Y-%m-%d').tolist()
+        else:
+            columns[col] = series.astype(object).where(series.notna(), None).tolist()
+    return {'columns': columns}
+
+# Write one export file and its precompressed siblings, unless the manifest shows the same content
+# is already there. The ETag is the content hash, so the dashboard refetches only what changed.
+def write_export_file(export_dir, file_name, payload, manifest):
+    import gzip
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    body = json.dumps(payload, separators=(',', ':'), allow_nan=False).encode()
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    encodings = {'gzip': '.gz'}
+    if brotli is not None:
+        encodings['br'] = '.br'
+
+    path = os.path.join(export_dir, file_name)
+    entry = manifest.get(file_name)
+    if (entry is not None and entry['etag'] == etag and set(entry['encodings']) == set(encodings)
+            and all(os.path.exists(path + suffix) for suffix in [''] + list(encodings.values()))):
+        return False
+
+    # Written through a temporary file, so the dashboard never reads half a file
+    contents = {'': body, '.gz': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        contents['.br'] = brotli.compress(body)
+    for suffix, data in contents.items():
+        with open(path + suffix + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + suffix + '.tmp', path + suffix)
+
+    manifest[file_name] = {'etag': etag, 'bytes': len(body), 'encodings': sorted(encodings)}
+    return True
+
+def export_results_to_json(results, export_dir=EXPORT_DIR, float_digits=EXPORT_FLOAT_DIGITS):
+    """Export analysis results to JSON files for the React dashboard"""
     # Create export directory if it doesn't exist
-    export_dir = 'src/data'
     if not os.path.exists(export_dir):
         os.makedirs(export_dir)
-    
-    # Export monthly data
+
+    manifest_path = os.path.join(export_dir, EXPORT_MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f).get('files', {})
+
     monthly_data = results['monthly_orders'].copy()
     monthly_data['Date'] = monthly_data['Date'].dt.strftime('%Y-%m-%d')
-    monthly_data_json = monthly_data.to_dict(orient='records')
-    
-    with open(f'{export_dir}/monthly_data.json', 'w') as f:
-        json.dump(monthly_data_json, f)
-    
-    # Export budget optimization results
-    budget_data = results['budget_comparison'].copy()
-    budget_data_json = budget_data.to_dict(orient='records')
-    
-    with open(f'{export_dir}/budget_optimization.json', 'w') as f:
-        json.dump(budget_data_json, f)
-    
-    # Export category analysis
-    category_data = results['category_analysis'].copy()
-    category_data_json = category_data.to_dict(orient='records')
-    
-    with open(f'{export_dir}/category_revenue.json', 'w') as f:
-        json.dump(category_data_json, f)
-    
-    # Export channel response data
-    channel_data = results['channel_response'].copy()
-    channel_data_json = channel_data.to_dict(orient='records')
-    
-    with open(f'{export_dir}/channel_response.json', 'w') as f:
-        json.dump(channel_data_json, f)
-    
-    # Export top channels for each category
-    top_channels = results['top_channels'].copy()
-    top_channels_json = top_channels.to_dict(orient='records')
-    
-    with open(f'{export_dir}/top_channels.json', 'w') as f:
-        json.dump(top_channels_json, f)
-    
+
+    # Tables are exported column-oriented
+    tables = {
+        'monthly_data.json': monthly_data,
+        'budget_optimization.json': results['budget_comparison'],
+        # The budget scenario frontier (spend -> expected revenue)
+        'budget_frontier.json': results['budget_frontier'],
+        'category_revenue.json': results['category_analysis'],
+        'channel_response.json': results['channel_response'],
+        # Top channels for each category
+        'top_channels.json': results['top_channels']
+    }
+    payloads = {file_name: frame_to_columns(frame, float_digits) for file_name, frame in tables.items()}
+
     # Create a summary stats file
     last_month = monthly_data.iloc[-1]
     summary_stats = {
@@ -891,13 +1957,166 @@ def export_results_to_json(results):
         'previous_marketing_spend': float(monthly_data[monthly_data['Date'].str.startswith('2023')]['Total_Spend'].sum()),
         'previous_overall_roi': float(monthly_data[monthly_data['Date'].str.startswith('2023')]['Overall_ROI'].mean())
     }
-    
-    with open(f'{export_dir}/summary_stats.json', 'w') as f:
-        json.dump(summary_stats, f)
-    
-    print(f"All data exported to {export_dir} directory")
+    rounded = round_significant(list(summary_stats.values()), float_digits).tolist()
+    payloads['summary_stats.json'] = {name: value if np.isfinite(value) else None for name, value in zip(summary_stats, rounded)}
+
+    written = [file_name for file_name, payload in payloads.items()
+               if write_export_file(export_dir, file_name, payload, manifest)]
+
+    if written or not os.path.exists(manifest_path):
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump({'format': 'columns', 'files': manifest}, f, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    print(f"Exported {len(written)} changed of {len(payloads)} data files to {export_dir} directory")
+
+# Packages that take long enough to import to be worth keeping out of short commands
+HEAVY_PACKAGES = ['sklearn', 'statsmodels', 'scipy', 'matplotlib', 'seaborn']
+
+# Import time per top-level package, for --import-report. Only outermost imports are timed,
+# so a package's time includes the dependencies it pulls in (and those are not counted twice).
+class ImportTimer:
+    def __init__(self):
+        self.seconds = {}
+        self.depth = 0
+        self.original_import = None
+    
+    def __enter__(self):
+        self.original_import = builtins.__import__
+        builtins.__import__ = self.timed_import
+        return self
+    
+    def __exit__(self, *exc_info):
+        builtins.__import__ = self.original_import
+    
+    def timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if self.depth:
+            return self.original_import(name, globals, locals, fromlist, level)
+        loaded = len(sys.modules)
+        start = time.perf_counter()
+        self.depth += 1
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            self.depth -= 1
+            # Imports of modules already loaded are not counted, relative ones count for their package
+            if len(sys.modules) > loaded:
+                module = (globals or {}).get('__package__') or name if level else name
+                package = module.partition('.')[0]
+                self.seconds[package] = self.seconds.get(package, 0.0) + time.perf_counter() - start
+    
+    # startup_cpu: CPU time spent before the command started (interpreter, pandas and numpy)
+    def report(self, startup_cpu):
+        loaded = [package for package in HEAVY_PACKAGES if package in sys.modules]
+        print(f"Startup CPU time: {startup_cpu:.2f} s")
+        print(f"Heavy packages loaded: {', '.join(loaded) if loaded else 'none'}")
+        print(f"{'Package':<24}{'Import s':>10}")
+        for package, seconds in sorted(self.seconds.items(), key=lambda item: -item[1]):
+            print(f"{package:<24}{seconds:>10.3f}")
+
+# The loaded and preprocessed inputs the ingest command prepares
+INGEST_OUTPUTS = ['weather_clean', 'media_data', 'holidays_df', 'sales_df', 'daily_orders', 'monthly_orders',
+                  'category_agg']
+
+# Run one command line command (see cli)
+def run_command(args):
+    if args.command == 'serve':
+        import asyncio
+        from whatif_service import serve
+        options = {option: getattr(args, option) for option in ['host', 'port', 'data_dir', 'cache_size']
+                   if getattr(args, option) is not None}
+        try:
+            asyncio.run(serve(registry_dir=args.registry, **options))
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    # Scoring a budget only reads the registered score parameters, no data and no model
+    if args.command == 'optimize' and args.budget:
+        print(json.dumps(score_channel_budget(args.budget, args.version, args.registry), indent=2))
+        return
+    
+    tracer = StageTracer(profile=args.profile)
+    if args.command is None:
+        results = main(args.chunksize, args.quantile_method, not args.no_cache, args.cache_dir, args.registry, tracer,
+                       bootstrap_replicates=args.bootstrap, bootstrap_jobs=args.bootstrap_jobs)
+        with tracer.span('export_results_to_json'):
+            export_results_to_json(results)
+    else:
+        cache = None if args.no_cache else StageCache(args.cache_dir)
+        model_cache_dir = None if args.no_cache else os.path.join(args.cache_dir, MODEL_CACHE_SUBDIR)
+        stages = build_pipeline(args.chunksize, args.quantile_method, args.registry,
+                                getattr(args, 'format', FIGURE_FORMAT), getattr(args, 'jobs', None), model_cache_dir,
+                                args.bootstrap, args.bootstrap_jobs)
+        pipeline = StagePipeline(stages, cache, tracer)
+        
+        if args.command == 'ingest':
+            for output in INGEST_OUTPUTS:
+                print(f"{output}: {len(pipeline.get(output))} rows")
+        elif args.command == 'model':
+            print(pipeline.get('model_summary'))
+            if not args.no_register:
+                pipeline.get('registered_models')
+        elif args.command == 'optimize':
+            for output in ['comparison', 'frontier', 'channel_intervals']:
+                if output in pipeline.producers:
+                    print(pipeline.get(output))
+        elif args.command == 'plot':
+            pipeline.get('visualizations')
+        elif args.command == 'export':
+            results = collect_results(pipeline, EXPORT_RESULTS)
+            with tracer.span('export_results_to_json'):
+                export_results_to_json(results, args.export_dir, args.float_digits)
+    
+    tracer.write()
+    tracer.report()
+
+# Command line: python marketing-analysis.py [options] [ingest|model|optimize|plot|export|serve]
+# Without a command the whole analysis runs and is exported. Each command pulls only the stages
+# it needs (from the stage cache when they are unchanged), so e.g. export and optimize --budget
+# do not import the modelling and plotting libraries.
+def cli(argv=None):
+    startup_cpu = time.process_time()
+    parser = argparse.ArgumentParser(description='Marketing analysis for the ElectroMart dashboard')
+    parser.add_argument('--no-cache', action='store_true', help='recompute every stage instead of using the stage cache')
+    parser.add_argument('--cache-dir', default=STAGE_CACHE_DIR, help='stage cache directory')
+    parser.add_argument('--chunksize', type=int, help='stream the order file in chunks of this many rows')
+    parser.add_argument('--quantile-method', choices=['exact', 'sketch'], default='exact',
+                        help='GMV thresholds in chunked mode (sketch reads the orders in one pass)')
+    parser.add_argument('--registry', default=REGISTRY_DIR, help='model registry directory')
+    parser.add_argument('--bootstrap', type=int, default=0, metavar='N',
+                        help='bootstrap the channel impact intervals from N replicates (default: off)')
+    parser.add_argument('--bootstrap-jobs', type=int, help='worker processes for --bootstrap (1 runs in this process)')
+    parser.add_argument('--profile', help="stage to profile with cProfile ('slowest': the slowest of the last run)")
+    parser.add_argument('--import-report', action='store_true', help='report startup and per-package import time')
+    commands = parser.add_subparsers(dest='command')
+    
+    commands.add_parser('ingest', help='load and preprocess the weather, order and media data')
+    model = commands.add_parser('model', help='fit the marketing impact models')
+    model.add_argument('--no-register', action='store_true', help='do not save the models to the registry')
+    optimize = commands.add_parser('optimize', help='budget comparison, scenario frontier and channel impact intervals (with --bootstrap)')
+    optimize.add_argument('--budget', type=float, nargs='+',
+                          help='score total budgets with the registered channel impact model instead')
+    optimize.add_argument('--version', type=int, help='model version for --budget (default: latest)')
+    plot = commands.add_parser('plot', help='draw the figures')
+    plot.add_argument('--format', choices=['png', 'svg', 'pdf', 'json'], default=FIGURE_FORMAT)
+    plot.add_argument('--jobs', type=int, help='worker processes (1 draws in this process)')
+    export = commands.add_parser('export', help='export the dashboard JSON')
+    export.add_argument('--export-dir', default=EXPORT_DIR)
+    export.add_argument('--float-digits', type=int, default=EXPORT_FLOAT_DIGITS,
+                        help='significant digits kept for floats')
+    serve = commands.add_parser('serve', help='serve what-if queries on the registered models')
+    serve.add_argument('--host', help='default: whatif_service.HOST')
+    serve.add_argument('--port', type=int, help='default: whatif_service.PORT')
+    serve.add_argument('--data-dir', help='directory of the exported dashboard JSON')
+    serve.add_argument('--cache-size', type=int, help='number of results kept in the LRU cache')
+    args = parser.parse_args(argv)
+    
+    import_timer = ImportTimer() if args.import_report else contextlib.nullcontext()
+    with import_timer:
+        run_command(args)
+    if args.import_report:
+        import_timer.report(startup_cpu)
 
-# Add this to the end of your main() function
 if __name__ == "__main__":
-    results = main()
-    export_results_to_json(results)
\ No newline at end of file
+    cli()
@@ -0,0 +1,210 @@
+# Local registry of fitted models for the marketing analysis and Model.ipynb.
+# Each registered version is a directory registry_dir/<name>/<version>/ holding
+#   meta.json   input fingerprint, feature list, version, metrics and library versions
+#   model.pkl   the fitted model object (loading it needs the training libraries)
+#   score.npz   plain numpy arrays (coefficients, channel names, ...) for score-only use
+# Scoring only reads score.npz, so it needs numpy alone: no pandas, sklearn or
+# statsmodels import and no raw data, e.g.
+#   python src/components/model_registry.py --budget 250000
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+
+import numpy as np
+
+REGISTRY_DIR = 'model_registry'
+META_FILE = 'meta.json'
+MODEL_FILE = 'model.pkl'
+SCORE_FILE = 'score.npz'
+
+# Registered names used by the analysis script and Model.ipynb
+CHANNEL_IMPACT_MODEL = 'channel_impact'
+BEST_IMPACT_MODEL = 'impact_best_model'
+MM_ALPHAS_MODEL = 'mm_alphas'
+
+# Fingerprint of the data a model was fitted on (DataFrames, Series or arrays)
+def data_fingerprint(*frames):
+    digest = hashlib.sha256()
+    for frame in frames:
+        if hasattr(frame, 'columns') or hasattr(frame, 'index'):
+            import pandas as pd
+            digest.update(repr(list(frame.columns) if hasattr(frame, 'columns') else [frame.name]).encode())
+            digest.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+        else:
+            digest.update(np.ascontiguousarray(frame).tobytes())
+    return digest.hexdigest()
+
+def model_dir(name, version, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, name, str(version))
+
+def list_versions(name, registry_dir=REGISTRY_DIR):
+    path = os.path.join(registry_dir, name)
+    if not os.path.isdir(path):
+        return []
+    return sorted(int(version) for version in os.listdir(path)
+                  if version.isdigit() and os.path.exists(os.path.join(path, version, META_FILE)))
+
+def latest_version(name, registry_dir=REGISTRY_DIR):
+    versions = list_versions(name, registry_dir)
+    if not versions:
+        raise FileNotFoundError(f'No registered versions of {name!r} in {registry_dir}')
+    return versions[-1]
+
+def load_metadata(name, version=None, registry_dir=REGISTRY_DIR):
+    version = latest_version(name, registry_dir) if version is None else version
+    with open(os.path.join(model_dir(name, version, registry_dir), META_FILE)) as f:
+        return json.load(f)
+
+# Register a fitted model. score_params are the numpy arrays the score-only functions need.
+# When the latest version was fitted on the same data with the same score parameters,
+# nothing is written and that version is returned.
+def register_model(name, model, features, fingerprint, metrics=None, score_params=None, registry_dir=REGISTRY_DIR):
+    score_params = {key: np.asarray(value) for key, value in (score_params or {}).items()}
+    params_digest = hashlib.sha256()
+    for key in sorted(score_params):
+        params_digest.update(key.encode())
+        params_digest.update(repr(score_params[key].dtype).encode())
+        params_digest.update(np.ascontiguousarray(score_params[key]).tobytes())
+
+    versions = list_versions(name, registry_dir)
+    if versions:
+        latest = load_metadata(name, versions[-1], registry_dir)
+        if latest['fingerprint'] == fingerprint and latest['score_params_digest'] == params_digest.hexdigest():
+            return versions[-1]
+    version = versions[-1] + 1 if versions else 1
+
+    meta = {
+        'name': name,
+        'version': version,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'fingerprint': fingerprint,
+        'features': list(features),
+        'metrics': {key: float(value) for key, value in (metrics or {}).items()},
+        'model_class': f'{type(model).__module__}.{type(model).__name__}',
+        'library_version': getattr(sys.modules.get(type(model).__module__.split('.')[0]), '__version__', None),
+        'numpy_version': np.__version__,
+        'score_params_digest': params_digest.hexdigest()
+    }
+
+    # Write into a temporary directory first so a half-written version is never the latest
+    path = model_dir(name, version, registry_dir)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    with open(os.path.join(tmp_path, MODEL_FILE), 'wb') as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    np.savez(os.path.join(tmp_path, SCORE_FILE), **score_params)
+    with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.rename(tmp_path, path)
+
+    return version
+
+# Load the fitted model object and its metadata (imports whatever libraries the model was built with)
+def load_model(name, version=None, registry_dir=REGISTRY_DIR):
+    meta = load_metadata(name, version, registry_dir)
+    with open(os.path.join(model_dir(name, meta['version'], registry_dir), MODEL_FILE), 'rb') as f:
+        return pickle.load(f), meta
+
+# Load the numpy score parameters of a model (numpy only)
+def load_score_params(name, version=None, registry_dir=REGISTRY_DIR):
+    version = latest_version(name, registry_dir) if version is None else version
+    with np.load(os.path.join(model_dir(name, version, registry_dir), SCORE_FILE), allow_pickle=False) as params:
+        return {key: params[key] for key in params.files}
+
+# Split each budget over channels in proportion to their positive impact, for many scenarios at once.
+# impacts and caps have one row per scenario and one column per channel, budgets one value per scenario.
+# Channels above their cap are held at it and the rest is re-split among the others
+# (when no channel has a positive impact the budget is split equally instead).
+def allocate_budget_proportional(impacts, budgets, caps=None):
+    impacts = np.asarray(impacts, dtype=float)
+    budgets = np.asarray(budgets, dtype=float)
+    positive = np.maximum(impacts, 0)
+    weights = np.where(positive.sum(axis=1, keepdims=True) > 0, positive, 1.0)
+
+    if caps is None:
+        return budgets[:, None] * weights / weights.sum(axis=1, keepdims=True)
+
+    # Find the level t with sum(min(cap, t * weight)) = budget by bisection, then solve the uncapped channels exactly
+    # (when the caps cannot absorb the budget, every channel ends at its cap)
+    caps = np.broadcast_to(np.asarray(caps, dtype=float), impacts.shape)
+    reachable = np.where(weights > 0, caps, 0).sum(axis=1) >= budgets
+    low = np.zeros(len(budgets))
+    high = np.ones(len(budgets))
+    while True:
+        short = reachable & (np.minimum(caps, high[:, None] * weights).sum(axis=1) < budgets)
+        if not short.any():
+            break
+        high = np.where(short, high * 2, high)
+    for _ in range(100):
+        mid = (low + high) / 2
+        short = np.minimum(caps, mid[:, None] * weights).sum(axis=1) < budgets
+        low = np.where(short, mid, low)
+        high = np.where(short, high, mid)
+
+    capped = (weights > 0) & (caps <= high[:, None] * weights)
+    free_weight = np.where(capped, 0, weights).sum(axis=1)
+    remaining = budgets - np.where(capped, caps, 0).sum(axis=1)
+    level = np.divide(remaining, free_weight, out=high.copy(), where=free_weight > 0)
+    allocation = np.where(capped, caps, np.minimum(caps, level[:, None] * weights))
+    return np.where(reachable[:, None], allocation, np.where(weights > 0, caps, 0))
+
+# Score-only allocation and revenue forecast of the channel impact model for one or more total budgets
+def score_channel_budget(budgets, version=None, registry_dir=REGISTRY_DIR):
+    return channel_budget_result(load_score_params(CHANNEL_IMPACT_MODEL, version, registry_dir), budgets)
+
+# Allocation and revenue forecast from already loaded channel impact score parameters
+def channel_budget_result(params, budgets):
+    budgets = np.atleast_1d(np.asarray(budgets, dtype=float))
+    allocation = allocate_budget_proportional(np.broadcast_to(params['impacts'], (len(budgets), len(params['impacts']))), budgets)
+    incremental_revenue = allocation @ params['impacts']
+    return {
+        'channels': params['channels'].tolist(),
+        'budgets': budgets.tolist(),
+        'allocation': allocation.tolist(),
+        'incremental_revenue': incremental_revenue.tolist(),
+        'expected_revenue': (params['baseline_revenue'] + incremental_revenue).tolist()
+    }
+
+# Score-only Michaelis-Menten response of the registered per-category alphas: the aggregated
+# alphas of the chosen categories, the response to a spend vector (default: the channel upper
+# bounds alphas / 1e7 that the notebook's unconstrained allocation picks) and that spend
+def score_mm_response(spend=None, categories=None, name=MM_ALPHAS_MODEL, version=None, registry_dir=REGISTRY_DIR):
+    params = load_score_params(name, version, registry_dir)
+    rows = np.arange(len(params['categories']))
+    if categories is not None:
+        rows = [list(params['categories']).index(category) for category in categories]
+    alphas = params['alphas'][rows].sum(axis=0)
+    spend = alphas / 1e7 if spend is None else np.asarray(spend, dtype=float)
+    return {
+        'channels': params['channels'].tolist(),
+        'alphas': alphas.tolist(),
+        'spend': spend.tolist(),
+        'response': float(np.sum(alphas * spend / (1 + spend)))
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score registered models without retraining')
+    parser.add_argument('--budget', type=float, nargs='*', help='total budgets for the channel impact model')
+    parser.add_argument('--mm', nargs='?', const=MM_ALPHAS_MODEL,
+                        help=f'score registered Michaelis-Menten alphas instead (default: {MM_ALPHAS_MODEL})')
+    parser.add_argument('--categories', nargs='*', help='categories to aggregate for --mm')
+    parser.add_argument('--version', type=int, help='model version (default: latest)')
+    parser.add_argument('--registry', default=REGISTRY_DIR, help='registry directory')
+    args = parser.parse_args()
+
+    if args.mm:
+        result = score_mm_response(categories=args.categories, name=args.mm, version=args.version,
+                                   registry_dir=args.registry)
+    else:
+        budgets = args.budget
+        if not budgets:
+            budgets = [float(load_score_params(CHANNEL_IMPACT_MODEL, args.version, args.registry)['current_allocation'].sum())]
+        result = score_channel_budget(budgets, version=args.version, registry_dir=args.registry)
+    print(json.dumps(result, indent=2))
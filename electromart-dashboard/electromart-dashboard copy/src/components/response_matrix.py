@@ -0,0 +1,113 @@
+# Segment x channel response matrix for the marketing analysis.
+# Segments are product categories, sub-categories or verticals (hundreds to thousands of rows).
+# The response factors are one dense (segments x channels) array next to the segments' revenue:
+# effectiveness scores are the broadcast product revenue[:, None] * factors, the top channels of
+# every segment come from np.argpartition, and the long table the dashboard reads is only built
+# on request. save/load keep a matrix in one .npz of plain arrays, e.g.
+#   matrix = ResponseMatrix.from_orders(orders_clean, 'vertical')
+#   matrix.save('response_matrix.npz')
+import numpy as np
+import pandas as pd
+
+CHANNELS = ['TV', 'Radio', 'Digital', 'Social', 'Print', 'Outdoor']
+
+# Segment level -> order column
+LEVEL_COLUMNS = {
+    'category': 'product_analytic_category',
+    'sub_category': 'product_analytic_sub_category',
+    'vertical': 'product_analytic_vertical'
+}
+
+# Simulated category response to the channels, in CHANNELS order (in a real-world scenario this
+# would be based on actual data). Sub-categories and verticals of these categories inherit the row.
+CATEGORY_RESPONSE = {
+    'EntertainmentSmall': [0.6, 0.3, 0.8, 0.7, 0.2, 0.1],
+    'GamingHardware': [0.5, 0.2, 0.9, 0.8, 0.1, 0.1],
+    'ComputersHardware': [0.7, 0.4, 0.8, 0.6, 0.5, 0.3],
+    'MobilesPhones': [0.8, 0.5, 0.9, 0.8, 0.5, 0.4],
+    'Audio': [0.6, 0.7, 0.7, 0.6, 0.3, 0.2]
+}
+# Range of the random response factors of segments of other categories
+RANDOM_RESPONSE = (0.1, 0.9)
+
+class ResponseMatrix:
+    # segments: names of the rows, categories: the category of each row (the segments themselves
+    # at category level), factors: (segments x channels) response factors, revenue: per segment
+    def __init__(self, segments, channels, factors, revenue, categories=None, level='category'):
+        self.segments = np.asarray(segments).astype(str)
+        self.channels = np.asarray(channels).astype(str)
+        self.factors = np.asarray(factors, dtype=float).reshape(len(self.segments), len(self.channels))
+        self.revenue = np.asarray(revenue, dtype=float)
+        self.categories = self.segments if categories is None else np.asarray(categories).astype(str)
+        self.level = level
+
+    # Simulated factors for a revenue Series indexed by segment: the known category rows, and a
+    # uniform draw for every other cell (one draw per cell, as the original per-channel loop made)
+    @classmethod
+    def simulate(cls, revenue, categories=None, level='category', known=CATEGORY_RESPONSE):
+        segments = np.asarray(revenue.index).astype(str)
+        categories = segments if categories is None else np.asarray(categories).astype(str)
+        factors = np.random.uniform(*RANDOM_RESPONSE, size=(len(segments), len(CHANNELS)))
+        rows = pd.Index(list(known)).get_indexer(categories)
+        factors[rows >= 0] = np.array(list(known.values()), dtype=float)[rows[rows >= 0]]
+        return cls(segments, CHANNELS, factors, revenue.values, categories, level)
+
+    # Simulated matrix of the GMV of every segment of a level in an order frame
+    @classmethod
+    def from_orders(cls, orders, level='category', known=CATEGORY_RESPONSE):
+        column = LEVEL_COLUMNS[level]
+        grouped = orders.groupby(column, observed=True)
+        revenue = grouped['gmv'].sum()
+        categories = None if level == 'category' else grouped[LEVEL_COLUMNS['category']].first().values
+        return cls.simulate(revenue, categories, level, known)
+
+    @property
+    def shape(self):
+        return self.factors.shape
+
+    # Revenue x response factor of every cell
+    def scores(self):
+        return self.revenue[:, None] * self.factors
+
+    # Column indices of the k best channels of every segment, best first
+    def top_k(self, k=2):
+        scores = self.scores()
+        k = min(k, scores.shape[1])
+        # The k best of a row in any order (NaN scores last), then only those k are sorted
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(top, order, axis=1)
+
+    # Long table of cells (flat indices, row * channels + column, which are also the frame index),
+    # with the columns of the dashboard export: Category, Channel, Response_Factor, the segment
+    # column of the level, Revenue and Effectiveness_Score
+    def to_frame(self, cells=None):
+        n_channels = len(self.channels)
+        cells = np.arange(self.factors.size) if cells is None else np.asarray(cells)
+        rows, cols = np.divmod(cells, n_channels)
+        return pd.DataFrame({
+            'Category': self.categories[rows],
+            'Channel': self.channels[cols],
+            'Response_Factor': self.factors.ravel()[cells],
+            LEVEL_COLUMNS[self.level]: self.segments[rows],
+            'Revenue': self.revenue[rows],
+            'Effectiveness_Score': self.scores().ravel()[cells]
+        }, index=cells)
+
+    # The k best channels of every segment as a long table, by effectiveness score across segments
+    def top_frame(self, k=2):
+        top = self.top_k(k)
+        cells = (np.arange(len(top))[:, None] * len(self.channels) + top).ravel()
+        cells = cells[np.argsort(-self.scores().ravel()[cells], kind='stable')]
+        return self.to_frame(cells)
+
+    # Store as one .npz of plain arrays (loading needs no pickle)
+    def save(self, path):
+        np.savez_compressed(path, segments=self.segments, channels=self.channels, factors=self.factors,
+                            revenue=self.revenue, categories=self.categories, level=np.array(self.level))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(arrays['segments'], arrays['channels'], arrays['factors'], arrays['revenue'],
+                       arrays['categories'], str(arrays['level']))
@@ -0,0 +1,246 @@
+# Local what-if query service for the dashboard.
+# Keeps the registered channel impact model and the exported category tables in memory and
+# answers budget-allocation, revenue-forecast and category-slice queries over HTTP, e.g.
+#   python src/components/whatif_service.py --port 8765
+#   GET /allocation?budget=250000&budget=300000
+#   GET /forecast?TV=20000&Digital=50000        (channels left out keep last month's spend)
+#   GET /category?name=Camera
+#   GET /reload                                 (re-read the registry and src/data)
+# Only the standard library and numpy (through model_registry) are used, and nothing but the
+# local artifacts is read.
+# Identical queries in flight at the same time are computed once, and results are kept in an
+# LRU cache until the next reload.
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+from model_registry import REGISTRY_DIR, CHANNEL_IMPACT_MODEL, channel_budget_result, latest_version, load_score_params
+
+HOST = '127.0.0.1'
+PORT = 8765
+DATA_DIR = 'src/data'
+CACHE_SIZE = 1024
+
+# Query errors are answered with 400 Bad Request
+class QueryError(Exception):
+    pass
+
+class WhatIfService:
+    def __init__(self, registry_dir=REGISTRY_DIR, data_dir=DATA_DIR, cache_size=CACHE_SIZE):
+        self.registry_dir = registry_dir
+        self.data_dir = data_dir
+        self.cache_size = cache_size
+        self.handlers = {
+            '/allocation': self.allocation,
+            '/forecast': self.forecast,
+            '/category': self.category,
+            '/health': self.health
+        }
+        # Every load starts a new generation; queries still running from an older one
+        # are answered but neither cached nor joined by newer queries
+        self.generation = 0
+        self.in_flight = {}
+        self.load()
+
+    # Load the model parameters and category tables, and drop every cached result
+    def load(self):
+        self.version = latest_version(CHANNEL_IMPACT_MODEL, self.registry_dir)
+        self.params = load_score_params(CHANNEL_IMPACT_MODEL, self.version, self.registry_dir)
+        self.channels = self.params['channels'].tolist()
+
+        self.categories = {}
+        for row in self.read_records('category_revenue.json'):
+            self.categories[row['product_analytic_category']] = {'summary': row, 'channels': []}
+        for row in self.read_records('channel_response.json'):
+            self.categories.setdefault(row['Category'], {'summary': None, 'channels': []})['channels'].append(row)
+        for category in self.categories.values():
+            category['channels'].sort(key=lambda row: row['Effectiveness_Score'], reverse=True)
+
+        self.cache = OrderedDict()
+        self.generation += 1
+        self.loaded_at = time.time()
+
+    # Rows of an exported table, from the column-oriented export or a plain list of records
+    def read_records(self, file_name):
+        path = os.path.join(self.data_dir, file_name)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            table = json.load(f)
+        if isinstance(table, dict) and 'columns' in table:
+            columns = table['columns']
+            return [dict(zip(columns, values)) for values in zip(*columns.values())]
+        return table
+
+    def allocation(self, query):
+        budgets = self.numbers(query, 'budget')
+        if not budgets:
+            budgets = [float(self.params['current_allocation'].sum())]
+        return channel_budget_result(self.params, budgets)
+
+    def forecast(self, query):
+        spend = self.params['current_allocation'].astype(float).copy()
+        for i, channel in enumerate(self.channels):
+            values = self.numbers(query, channel)
+            if values:
+                spend[i] = values[-1]
+        incremental_revenue = float(spend @ self.params['impacts'])
+        return {
+            'channels': self.channels,
+            'spend': spend.tolist(),
+            'total_spend': float(spend.sum()),
+            'incremental_revenue': incremental_revenue,
+            'expected_revenue': float(self.params['baseline_revenue']) + incremental_revenue
+        }
+
+    def category(self, query):
+        names = query.get('name', [])
+        if not names:
+            return {'categories': sorted(self.categories)}
+        if names[-1] not in self.categories:
+            raise QueryError(f'Unknown category: {names[-1]}')
+        category = self.categories[names[-1]]
+        top = int(self.numbers(query, 'top')[-1]) if 'top' in query else len(category['channels'])
+        return {'category': names[-1], 'summary': category['summary'], 'channels': category['channels'][:top]}
+
+    def health(self, query):
+        return {'status': 'ok', 'model_version': self.version, 'loaded_at': self.loaded_at, 'cached_results': len(self.cache)}
+
+    def numbers(self, query, name):
+        try:
+            return [float(value) for value in query.get(name, [])]
+        except ValueError:
+            raise QueryError(f'{name} must be a number')
+
+    # Answer a query from the cache, by joining an identical query in flight, or by computing it
+    async def query(self, path, query):
+        if path == '/reload':
+            self.load()
+            return self.health(query)
+        if path == '/health':
+            return self.health(query)
+
+        generation = self.generation
+        key = (generation, path, tuple(sorted((name, tuple(values)) for name, values in query.items())))
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        while key in self.in_flight:
+            future = self.in_flight[key]
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only the query computing it was cancelled: compute it in this one instead
+                if not future.cancelled():
+                    raise
+
+        # Computed in a worker thread so other requests are served meanwhile
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.in_flight[key] = future
+        try:
+            result = await loop.run_in_executor(None, self.handlers[path], query)
+        except Exception as e:
+            future.set_exception(e)
+            # The exception is re-raised below, so waiters are the only other consumers
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if generation == self.generation:
+                self.cache[key] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            return result
+        finally:
+            # Cancelled (e.g. its connection closed) before a result: release the waiters
+            if not future.done():
+                future.cancel()
+            self.in_flight.pop(key, None)
+
+    # Minimal HTTP/1.1 handling: GET requests with keep-alive, JSON responses
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    writer.write(http_response(400, {'error': 'Malformed request line'}, False))
+                    await writer.drain()
+                    break
+                url = urlsplit(target)
+                if method == 'OPTIONS':
+                    status, body = 204, None
+                elif method != 'GET':
+                    status, body = 405, {'error': f'Method {method} not allowed'}
+                elif url.path not in self.handlers and url.path != '/reload':
+                    status, body = 404, {'error': f'Unknown path: {url.path}'}
+                else:
+                    try:
+                        status, body = 200, await self.query(url.path, parse_qs(url.query))
+                    except QueryError as e:
+                        status, body = 400, {'error': str(e)}
+                    except Exception as e:
+                        status, body = 500, {'error': f'{type(e).__name__}: {e}'}
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(http_response(status, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+STATUS_TEXT = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+def http_response(status, body, keep_alive):
+    payload = b'' if body is None else json.dumps(body).encode()
+    headers = [
+        f'HTTP/1.1 {status} {STATUS_TEXT[status]}',
+        'Content-Type: application/json',
+        f'Content-Length: {len(payload)}',
+        # The dashboard's development server runs on another port
+        'Access-Control-Allow-Origin: *',
+        'Access-Control-Allow-Methods: GET, OPTIONS',
+        f'Connection: {"keep-alive" if keep_alive else "close"}'
+    ]
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode() + payload
+
+async def serve(host=HOST, port=PORT, registry_dir=REGISTRY_DIR, data_dir=DATA_DIR, cache_size=CACHE_SIZE):
+    service = WhatIfService(registry_dir, data_dir, cache_size)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f'What-if service (model version {service.version}) listening on http://{host}:{port}')
+    async with server:
+        await server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local what-if query service for the dashboard')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--registry', default=REGISTRY_DIR, help='model registry directory')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='directory of the exported dashboard JSON')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='number of results kept in the LRU cache')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.registry, args.data_dir, args.cache_size))
+    except KeyboardInterrupt:
+        pass
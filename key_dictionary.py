@@ -0,0 +1,104 @@
+"""Global dictionary encoding of the order and product keys.
+
+High-cardinality string keys (fsn_id, cust_id, order_id, order_item_id) and the
+product_analytic_* levels are mapped to int32 codes through one dictionary per key,
+persisted under ./Data/_key_dictionary/<key>.parquet. A value keeps its code for
+good: new values are appended at the end, so every notebook, and every rerun, sees
+the same codes, and joins and groupbys run on compact integer columns.
+
+decode_keys turns codes back into categoricals whose categories are the whole
+dictionary, so category codes are the same in every step too.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from datastore import DATA_DIR
+
+KEY_DIR = '_key_dictionary'
+
+ID_KEYS = ['order_id', 'order_item_id', 'fsn_id', 'cust_id']
+PRODUCT_KEYS = ['product_analytic_category', 'product_analytic_sub_category', 'product_analytic_vertical']
+KEY_COLUMNS = ID_KEYS + PRODUCT_KEYS
+
+CODE_DTYPE = np.int32
+# Code of missing values (and, when the dictionary is not updated, of unknown ones)
+MISSING_CODE = -1
+
+
+def dictionary_path(key, data_dir=DATA_DIR):
+    return os.path.join(data_dir, KEY_DIR, f'{key}.parquet')
+
+
+def load_dictionary(key, data_dir=DATA_DIR):
+    """Values of a key in code order (position = code)."""
+    path = dictionary_path(key, data_dir)
+    if not os.path.exists(path):
+        return pd.Index([], dtype=object)
+    return pd.Index(pd.read_parquet(path)['value'].values, dtype=object)
+
+
+def update_dictionary(key, values, data_dir=DATA_DIR):
+    """Append the values not in the dictionary yet (in first-seen order) and return it."""
+    dictionary = load_dictionary(key, data_dir)
+    values = pd.Index(values, dtype=object).unique()
+    new = values[dictionary.get_indexer(values) < 0]
+    if len(new) == 0:
+        return dictionary
+    if len(dictionary) + len(new) > np.iinfo(CODE_DTYPE).max:
+        raise OverflowError(f'The {key} dictionary would exceed the {np.dtype(CODE_DTYPE).name} code range')
+
+    dictionary = dictionary.append(new)
+    path = dictionary_path(key, data_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame({'value': dictionary.values}).to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    return dictionary
+
+
+def key_strings(values):
+    """
+    Dictionary strings of distinct (non-missing) key values. Integral floats are written as
+    integers, so 1 and 1.0 (e.g. an id column read as float because of missing values) match.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        strings = values.astype(str).astype(object)
+        integral = (np.mod(values, 1) == 0) & (np.abs(values) < 2 ** 63)
+        strings[integral] = values[integral].astype(np.int64).astype(str)
+        return strings.astype(str)
+    if values.dtype.kind == 'O':
+        return np.array([str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+                         for value in values], dtype=str)
+    return values.astype(str)
+
+
+def encode_keys(frame, keys=KEY_COLUMNS, update=True, data_dir=DATA_DIR):
+    """
+    Replace key columns (strings, numbers or categoricals) by their int32 dictionary codes.
+    Values are compared as strings (see key_strings); only the distinct values of a column are looked up.
+    - update: add unseen values to the dictionaries, otherwise they get MISSING_CODE
+    """
+    frame = frame.copy()
+    for key in keys:
+        if key not in frame.columns:
+            continue
+        codes, uniques = pd.factorize(frame[key])
+        uniques = key_strings(uniques)
+        dictionary = update_dictionary(key, uniques, data_dir) if update else load_dictionary(key, data_dir)
+        positions = np.append(dictionary.get_indexer(uniques), MISSING_CODE).astype(CODE_DTYPE)
+        # factorize marks missing values with -1, which picks the appended MISSING_CODE
+        frame[key] = positions[codes]
+    return frame
+
+
+def decode_keys(frame, keys=KEY_COLUMNS, data_dir=DATA_DIR):
+    """Turn code columns into categoricals over the whole dictionary (missing codes become NaN)."""
+    frame = frame.copy()
+    for key in keys:
+        if key not in frame.columns:
+            continue
+        codes = frame[key].fillna(MISSING_CODE).to_numpy().astype(CODE_DTYPE)
+        frame[key] = pd.Categorical.from_codes(codes, categories=load_dictionary(key, data_dir))
+    return frame
@@ -0,0 +1,226 @@
+"""Michaelis-Menten response model used by Model.ipynb.
+
+    y = sum_i alpha_i * x_i / (1 + x_i)
+
+The model is linear in the alphas, so its Jacobian with respect to them is the
+saturated feature matrix x / (1 + x). It does not depend on the alphas and is
+computed once per fit, so the solver never needs finite differences. A fit can
+be warm-started from earlier alphas (e.g. last month's fit for the same product),
+which makes refits on refreshed data or resampled series take a few iterations.
+
+Budgets are allocated over channels by maximising the same response,
+sum_i a_i * x_i / (1 + x_i), within per-channel bounds and (optionally) a total
+budget. The objective is concave and separable, so the KKT conditions give
+x_i = sqrt(a_i / lambda) - 1 clipped to the bounds ("water-filling"), and the
+multiplier lambda is found by bisection, for many problems at once.
+
+Uncertainty comes from a moving-block bootstrap over months: each replicate
+refits the alphas on resampled rows of the precomputed saturated matrix,
+warm-started from the full-data fit, with replicates spread over a process pool.
+Every chunk of replicates draws from its own SeedSequence stream, so results
+depend only on the seed, not on the number of workers.
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.optimize import OptimizeResult, curve_fit
+
+
+def saturate(X):
+    """Saturated features x / (1 + x), the Jacobian of mmequation."""
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X.reshape(-1, 1)
+    return X / (1 + X)
+
+
+# Michaelis-Menten model
+def mmequation(X, *alphas):
+    return saturate(X) @ np.asarray(alphas, dtype=float)
+
+
+def mmequation_jacobian(X, *alphas):
+    return saturate(X)
+
+
+def fit_to_data(x_data, y_data, iter=1000000, components=None, alphas0=None):
+    """
+    Fit non-negative alphas by least squares.
+    - alphas0: previous alphas to start from instead of all ones
+    """
+    if x_data.ndim == 1:
+        x_data = x_data.reshape(-1, 1)
+    if components is None:
+        components = x_data.shape[1]
+
+    # Initial parameter guess (the solver needs a start strictly inside the bounds)
+    if alphas0 is None:
+        initial_guess = np.ones(components)
+    else:
+        initial_guess = np.maximum(np.asarray(alphas0, dtype=float), 1e-8)
+
+    # The Jacobian is constant, so it is evaluated once and reused for every step
+    return fit_saturated(mmequation_jacobian(x_data), y_data, initial_guess, iter)
+
+
+def fit_saturated(jacobian, y_data, initial_guess, iter=1000000):
+    """Least-squares alphas >= 0 for the saturated feature matrix (the model's Jacobian)."""
+    # Set bounds: all parameters must be positive
+    bounds_lower = [0] * jacobian.shape[1]
+    bounds_upper = [np.inf] * jacobian.shape[1]
+
+    alphas, _ = curve_fit(
+        lambda X, *alphas: jacobian @ np.asarray(alphas),
+        jacobian,
+        y_data,
+        p0=initial_guess,
+        bounds=(bounds_lower, bounds_upper),
+        jac=lambda X, *alphas: jacobian,
+        maxfev=iter
+    )
+
+    return alphas
+
+
+def block_bootstrap_indices(n, n_replicates, block_size, rng):
+    """Row indices of moving-block bootstrap samples, shape (n_replicates, n)."""
+    block_size = min(block_size, n)
+    starts = rng.integers(0, n - block_size + 1, size=(n_replicates, math.ceil(n / block_size)))
+    return (starts[:, :, None] + np.arange(block_size)).reshape(n_replicates, -1)[:, :n]
+
+
+def bootstrap_chunk(jacobian, y_data, alphas0, n_replicates, block_size, seed, iter=1000000):
+    rng = np.random.default_rng(seed)
+    indices = block_bootstrap_indices(len(y_data), n_replicates, block_size, rng)
+    initial_guess = np.maximum(alphas0, 1e-8)
+    return np.array([fit_saturated(jacobian[idx], y_data[idx], initial_guess, iter) for idx in indices])
+
+
+def percentile_interval(samples, ci=0.95):
+    """Lower and upper percentile bounds of samples along the first axis."""
+    tail = (1 - ci) / 2 * 100
+    return np.percentile(samples, tail, axis=0), np.percentile(samples, 100 - tail, axis=0)
+
+
+def bootstrap_fit(x_data, y_data, n_replicates=1000, block_size=3, seed=0, alphas0=None, ci=0.95,
+                  n_jobs=None, chunk_size=100, iter=1000000):
+    """
+    Moving-block bootstrap of fit_to_data.
+    - block_size: consecutive months resampled together, keeping short-range autocorrelation
+    - seed: the same seed gives the same resampled months for series of the same length
+    - alphas0: the full-data fit, computed when not given; every replicate starts from it
+    - n_jobs: worker processes (1 runs in this process)
+    Returns a dict with the full-data 'estimate', the replicate 'alphas' and their
+    percentile interval 'lower' / 'upper'.
+    """
+    x_data = np.asarray(x_data, dtype=float)
+    y_data = np.asarray(y_data, dtype=float)
+    if alphas0 is None:
+        alphas0 = fit_to_data(x_data, y_data, iter)
+    alphas0 = np.asarray(alphas0, dtype=float)
+    jacobian = mmequation_jacobian(x_data)
+
+    sizes = [len(chunk) for chunk in np.array_split(np.arange(n_replicates), math.ceil(n_replicates / chunk_size))]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(jacobian, y_data, alphas0, size, block_size, chunk_seed, iter) for size, chunk_seed in zip(sizes, seeds)]
+
+    if n_jobs == 1:
+        chunks = [bootstrap_chunk(*chunk_args) for chunk_args in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            chunks = list(executor.map(bootstrap_chunk, *zip(*args)))
+
+    alphas = np.concatenate(chunks)
+    lower, upper = percentile_interval(alphas, ci)
+    return {'estimate': alphas0, 'alphas': alphas, 'lower': lower, 'upper': upper}
+
+
+def response(A, x):
+    """Total response sum_i a_i * x_i / (1 + x_i) along the last axis."""
+    return np.sum(A * x / (1 + x), axis=-1)
+
+
+def water_fill(A, lam, lower, upper):
+    # Channels with a coefficient <= 0 gain nothing from spend and stay at their lower bound
+    return np.clip(np.sqrt(np.maximum(A, 0) / lam[:, None]) - 1, lower, upper)
+
+
+def allocate_budget(a, budget=None, lower=0.0, upper=np.inf, max_iter=100):
+    """
+    Maximise sum_i a_i * x_i / (1 + x_i) subject to lower <= x <= upper and sum_i x_i = budget.
+    - a: coefficients, shape (n,) or (m, n) for m problems solved together
+    - budget: total to allocate, a scalar or one per problem; None leaves the sum free
+    - lower, upper: per-channel minimum and maximum spend, broadcast against a
+    Returns an OptimizeResult with x, fun (the negated response, as minimize reports it),
+    success, message and the multiplier lam.
+    """
+    single = np.ndim(a) == 1 and np.ndim(budget) == 0
+    A = np.atleast_2d(np.asarray(a, dtype=float))
+    if budget is not None:
+        A = np.broadcast_to(A, (max(A.shape[0], np.size(budget)), A.shape[1]))
+    lower = np.broadcast_to(np.asarray(lower, dtype=float), A.shape)
+    upper = np.broadcast_to(np.asarray(upper, dtype=float), A.shape)
+    m = A.shape[0]
+
+    if budget is None:
+        # The response grows with every x, so each channel takes its maximum
+        x = upper.copy()
+        lam = np.zeros(m)
+        success = np.isfinite(x).all(axis=1)
+        messages = np.where(success, 'Optimal allocation found', 'Unbounded: no budget and no upper bound')
+    else:
+        B = np.broadcast_to(np.asarray(budget, dtype=float), (m,))
+        min_total, max_total = lower.sum(axis=1), upper.sum(axis=1)
+        feasible = (min_total <= B) & (B <= max_total)
+
+        # Bracket the multiplier: at lam_high every channel sits at its minimum, at lam_low every
+        # channel is at its largest feasible value, so the allocated total crosses the budget between them
+        positive = A > 0
+        cap = np.minimum(upper, lower + np.maximum(B - min_total, 0)[:, None])
+        tiny = np.finfo(float).tiny
+        lam_high = np.where(positive, A / (1 + lower) ** 2, 0).max(axis=1)
+        lam_low = np.where(positive, A / (1 + cap) ** 2, np.inf).min(axis=1)
+        log_low = np.log(np.maximum(np.minimum(lam_low, lam_high), tiny))
+        log_high = np.log(np.maximum(lam_high, tiny))
+
+        # Bisection on log(lambda), the allocated total decreases as lambda grows
+        for _ in range(max_iter):
+            if np.all(log_high - log_low <= 1e-13 * np.maximum(np.abs(log_high), 1)):
+                break
+            mid = (log_low + log_high) / 2
+            over = water_fill(A, np.exp(mid), lower, upper).sum(axis=1) > B
+            log_low = np.where(over, mid, log_low)
+            log_high = np.where(over, log_high, mid)
+        lam = np.exp((log_low + log_high) / 2)
+        x = water_fill(A, lam, lower, upper)
+
+        # Solve the free channels exactly: sum_free (sqrt(a / lam) - 1) = budget - clipped total
+        free = positive & (x > lower) & (x < upper)
+        n_free = free.sum(axis=1)
+        root_a = np.sqrt(np.maximum(A, 0))
+        root_sum = np.where(free, root_a, 0).sum(axis=1)
+        remaining = B - np.where(free, 0, x).sum(axis=1)
+        scale = np.divide(remaining + n_free, root_sum, out=np.zeros(m), where=root_sum > 0)
+        x = np.where(free, np.clip(scale[:, None] * root_a - 1, lower, upper), x)
+        lam = np.where(scale > 0, np.divide(1, scale ** 2, out=lam.copy(), where=scale > 0), lam)
+
+        # Channels with a coefficient <= 0 take whatever budget the others cannot absorb, largest
+        # coefficient first. The slack before a channel is a shifted cumulative sum, which stays
+        # finite-safe when upper bounds are infinite (inf - inf would give NaN).
+        remainder = np.maximum(B - x.sum(axis=1), 0)[:, None]
+        order = np.argsort(-A, axis=1, kind='stable')
+        slack = np.take_along_axis(upper - x, order, axis=1)
+        before = np.concatenate([np.zeros((m, 1)), np.cumsum(slack[:, :-1], axis=1)], axis=1)
+        extra = np.where(remainder > 0, np.clip(remainder - before, 0, slack), 0)
+        np.put_along_axis(x, order, np.take_along_axis(x, order, axis=1) + extra, axis=1)
+
+        x = np.where(feasible[:, None], x, np.where((B < min_total)[:, None], lower, upper))
+        success = feasible & np.isclose(x.sum(axis=1), B, rtol=1e-9, atol=1e-12)
+        messages = np.where(success, 'Optimal allocation found',
+                            np.where(feasible, 'Allocation did not reach the budget', 'Infeasible: budget outside the bounds'))
+
+    fun = -response(A, x)
+    if single:
+        return OptimizeResult(x=x[0], fun=fun[0], success=bool(success[0]), message=str(messages[0]), lam=lam[0])
+    return OptimizeResult(x=x, fun=fun, success=success, message=messages, lam=lam)
@@ -0,0 +1,133 @@
+"""Incremental monthly aggregation for create_monthly_data.
+
+Instead of resampling the full history on every run, each source dataset keeps
+per-month partial aggregates in the store: row counts, sums, non-null counts
+(so means can be merged as sum / count) and dummy counts for categorical columns.
+Every month's partials record the content hash of the month's partition files, and a
+refresh only recomputes the months whose rows changed: added, removed, or edited in
+place with the same row count.
+
+A spec describes how a dataset is aggregated, e.g.
+    {'date': 'order_date', 'sum': ['gmv'], 'mean': ['sla'], 'dummies': ['order_payment_type']}
+'date' may be 'index' for datasets indexed by date, and 'mean': None averages every column.
+"""
+import numpy as np
+import pandas as pd
+
+from datastore import (DATA_DIR, MONTH_COLUMN, dataset_exists, partition_fingerprints, partition_row_counts,
+                       read_dataset, write_dataset)
+
+ROWS = '_rows'
+FINGERPRINT = '_fingerprint'
+
+
+def partials_name(name):
+    return f'{name}_monthly_partials'
+
+
+def month_end(dates):
+    return pd.DatetimeIndex(dates).normalize() + pd.offsets.MonthEnd(0)
+
+
+def compute_partials(frame, spec):
+    """Per-month partial aggregates of frame, indexed by month end."""
+    dates = frame.index if spec['date'] == 'index' else frame[spec['date']]
+    months = month_end(dates)
+    values = frame if spec['date'] == 'index' else frame.drop(columns=spec['date'])
+
+    mean_cols = spec['mean']
+    if mean_cols is None:
+        mean_cols = [col for col in values.columns if col not in spec['sum'] + spec['dummies']]
+
+    parts = {}
+    for col in spec['sum']:
+        parts[f'sum:{col}'] = values[col].astype(float).values
+    for col in mean_cols:
+        column = values[col].astype(float)
+        parts[f'meansum:{col}'] = column.fillna(0).values
+        parts[f'count:{col}'] = column.notna().astype(int).values
+    for col in spec['dummies']:
+        dummies = pd.get_dummies(values[col].astype(object), dtype=int)
+        for value in dummies.columns:
+            parts[f'dummy:{col}:{value}'] = dummies[value].values
+
+    partials = pd.DataFrame(parts, index=months)
+    partials[ROWS] = 1
+    partials = partials.groupby(level=0).sum()
+    partials.index.name = 'month_end'
+    return partials
+
+
+def stale_months(name, partials, data_dir=DATA_DIR):
+    """
+    Months whose rows in the store differ from the ones the partials were built from:
+    a different row count or different partition file contents (partials without
+    fingerprints, from before they were recorded, count as stale).
+    """
+    counts = partition_row_counts(name, MONTH_COLUMN, data_dir)
+    fingerprints = partition_fingerprints(name, MONTH_COLUMN, data_dir)
+    months = counts.index
+    known_counts = pd.Series(0, index=months, dtype='int64')
+    known_fingerprints = pd.Series(None, index=months, dtype=object)
+    if partials is not None and len(partials):
+        built = partials.set_axis(partials.index.strftime('%Y-%m'))
+        months = months.union(built.index)
+        known_counts = built[ROWS].reindex(months, fill_value=0)
+        if FINGERPRINT in built:
+            known_fingerprints = built[FINGERPRINT]
+        known_fingerprints = known_fingerprints.reindex(months)
+    counts = counts.reindex(months, fill_value=0)
+    fingerprints = fingerprints.reindex(months)
+    changed = (counts.values != known_counts.values) | ((counts.values > 0) & (fingerprints.values != known_fingerprints.values))
+    return list(months[changed])
+
+
+def refresh_partials(name, spec, months=None, data_dir=DATA_DIR):
+    """
+    Bring the stored partials of a month-partitioned dataset up to date and return them.
+    Only the months in `months` ('YYYY-MM'), or those detected by stale_months, are re-read.
+    """
+    stored = read_dataset(partials_name(name), data_dir=data_dir) if dataset_exists(partials_name(name), data_dir) else None
+    if months is None:
+        months = stale_months(name, stored, data_dir)
+    if stored is not None and not months:
+        return stored
+
+    columns = None
+    if spec['mean'] is not None:
+        columns = ([] if spec['date'] == 'index' else [spec['date']]) + spec['sum'] + spec['mean'] + spec['dummies']
+    filters = [(MONTH_COLUMN, 'in', list(months))] if stored is not None else None
+    fresh = compute_partials(read_dataset(name, columns=columns, filters=filters, data_dir=data_dir), spec)
+    fresh[FINGERPRINT] = partition_fingerprints(name, MONTH_COLUMN, data_dir).reindex(fresh.index.strftime('%Y-%m')).values
+
+    # Replace the recomputed months, keep every other month as it was
+    if stored is not None:
+        kept = stored[~stored.index.strftime('%Y-%m').isin(months)]
+        fresh = pd.concat([kept, fresh]).sort_index()
+        numeric = fresh.columns.drop(FINGERPRINT)
+        fresh[numeric] = fresh[numeric].fillna(0)
+
+    write_dataset(fresh, partials_name(name), data_dir=data_dir)
+    return fresh
+
+
+def finalize_partials(partials, spec):
+    """Monthly table equivalent to resample('ME') with sums, means and summed dummies."""
+    months = pd.date_range(partials.index.min(), partials.index.max(), freq=pd.offsets.MonthEnd())
+    partials = partials.reindex(months, fill_value=0)
+
+    monthly = {}
+    for col in spec['sum']:
+        monthly[col] = partials[f'sum:{col}']
+    mean_cols = spec['mean']
+    if mean_cols is None:
+        mean_cols = [name.split(':', 1)[1] for name in partials.columns if name.startswith('count:')]
+    for col in mean_cols:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            monthly[col] = partials[f'meansum:{col}'] / partials[f'count:{col}'].replace(0, np.nan)
+    for col in spec['dummies']:
+        prefix = f'dummy:{col}:'
+        for name in sorted(name for name in partials.columns if name.startswith(prefix)):
+            monthly[f'{col}_{name[len(prefix):]}'] = partials[name].astype(int)
+
+    return pd.DataFrame(monthly, index=months)
@@ -0,0 +1,344 @@
+"""Seeded synthetic data with the schemas of the raw inputs, for scaling tests and benchmarks.
+
+Orders are generated at any row count (SIZES names the benchmark sizes, 1M to 100M
+rows) as a stream of chunks, so 100M rows never have to fit in memory. Chunk i is
+drawn from its own SeedSequence([seed, ORDERS, i]) stream: the data only depends on
+the seed and the chunk size, never on how much of the stream is consumed.
+
+The other inputs are small and generated whole: the SKU table (five categories,
+fourteen sub-categories and 72 verticals, like the real one), the holiday list, a
+sale calendar, monthly media spend and daily station weather. Order volume follows
+media spend, sale days and holidays, so the downstream models have something to fit.
+
+    for chunk in generate_orders(SIZES['10M'], seed=0):   # Customers_Orders_Data.csv rows
+        ...
+    write_raw_data('./Synthetic/Raw_Data', size='1M')       # the raw files on disk
+    write_dashboard_inputs('./Synthetic', size='1M')        # marketing-analysis.py's inputs
+
+Everything runs offline with numpy and pandas only; the holiday list and media data are
+written as CSV rather than Excel, so no Excel writer is needed.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from cleaning_rules import EXCLUDED_MONTHS
+from date_dim import build_date_dim, generate_sale_days, join_date_dim
+from weather_impute import BASE_TEMP
+from weather_ingest import DATE_COLUMN, STATION_COLUMN, WEATHER_COLUMNS
+
+# Benchmark sizes in order rows
+SIZES = {'1M': 1000000, '10M': 10000000, '100M': 100000000}
+
+START_DATE = '2023-07-01'
+END_DATE = '2024-06-30'
+CHUNK_ROWS = 1000000
+
+N_SKUS = 20000
+N_CUSTOMERS = 1000000
+SUPER_CATEGORY = 'CE'
+# Sub-categories of every category and verticals of every sub-category (14 and 72 in total)
+CATEGORIES = {
+    'CameraAccessory': {'CameraAccessory': 14, 'CameraStorage': 4, 'CameraLens': 3},
+    'Camera': {'Camera': 5},
+    'EntertainmentSmall': {'AudioMP3Player': 4, 'HomeAudio': 9, 'AmplifierAndAudio': 3, 'Speaker': 5, 'TVVideoSmall': 6},
+    'GameCDDVD': {'GameCDDVD': 3, 'Game': 2},
+    'GamingHardware': {'GamingAccessory': 10, 'GamingConsole': 2, 'GamingController': 2}
+}
+MEDIA_CHANNELS = ['TV', 'Digital', 'Sponsorship', 'Content Marketing', 'Online marketing', ' Affiliates', 'SEM',
+                  'Radio', 'Other']
+# Typical monthly spend of every channel (in crores)
+MEDIA_SCALE = [5, 2, 40, 1, 20, 7, 15, 1, 5]
+STATION = 'SYNTHETIC STATION'
+
+# Fixed-date holidays as (month, day, name) and holidays on the n-th weekday of a month
+# as (month, weekday, n, name), with Monday = 0 and n = -1 for the last one
+FIXED_HOLIDAYS = [(1, 1, "New Year's Day"), (2, 14, "Valentine's Day"), (3, 17, "St. Patrick's Day"),
+                  (7, 1, 'Canada Day'), (10, 31, 'Halloween'), (11, 11, 'Remembrance Day'),
+                  (12, 24, 'Christmas Eve'), (12, 25, 'Christmas Day'), (12, 26, 'Boxing Day'),
+                  (12, 31, "New Year's Eve")]
+WEEKDAY_HOLIDAYS = [(2, 0, 3, 'Family Day'), (5, 0, -2, 'Victoria Day'), (8, 0, 1, 'Civic Holiday'),
+                    (9, 0, 1, 'Labour Day'), (10, 0, 2, 'Thanksgiving'), (11, 4, 4, 'Black Friday')]
+
+# Seed streams of the generators
+SKUS, ORDERS, CUSTOMERS, SALES, MEDIA, WEATHER = range(6)
+
+# Rows breaking each order rule of cleaning_rules.ORDER_RULES, in the order they are drawn
+DIRTY_KINDS = ['outside_timeframe', 'negative_delivery', 'non_positive_gmv', 'non_positive_units',
+               'non_positive_mrp', 'price_over_mrp', 'missing_gmv']
+
+
+def size_rows(size):
+    """Row count of a size name ('1M', '10M', '100M') or of a plain number."""
+    return SIZES[size] if size in SIZES else int(size)
+
+
+def stream_rng(seed, stream, *keys):
+    return np.random.default_rng(np.random.SeedSequence([seed, stream, *keys]))
+
+
+def generate_skus(n_skus=N_SKUS, seed=0):
+    """SKU_details.csv: fsn_id and the product_analytic_* levels of every product."""
+    verticals = [(category, sub_category, f'{sub_category}{i}' if n > 1 else sub_category)
+                 for category, sub_categories in CATEGORIES.items()
+                 for sub_category, n in sub_categories.items() for i in range(n)]
+    rng = stream_rng(seed, SKUS)
+    levels = np.array(verticals, dtype=object)[rng.integers(0, len(verticals), n_skus)]
+    prefixes = np.char.upper(np.array([category[:3] for category in levels[:, 0]], dtype=str))
+    return pd.DataFrame({
+        'fsn_id': np.char.add(prefixes, np.char.zfill(np.char.upper(
+            np.array([format(value, 'x') for value in rng.integers(0, 2 ** 52, n_skus)], dtype=str)), 13)),
+        'product_analytic_super_category': SUPER_CATEGORY,
+        'product_analytic_category': levels[:, 0],
+        'product_analytic_sub_category': levels[:, 1],
+        'product_analytic_vertical': levels[:, 2]
+    })
+
+
+def sku_attributes(n_skus=N_SKUS, seed=0):
+    """Per-SKU MRP, procurement SLA and popularity (sampling weights) used by the order generator."""
+    rng = stream_rng(seed, SKUS, 1)
+    popularity = 1 / (rng.permutation(n_skus) + 10.0)
+    return {
+        'mrp': np.round(rng.lognormal(7.5, 1.1, n_skus)).clip(99, None),
+        'procurement_sla': rng.integers(0, 11, n_skus),
+        'popularity': popularity / popularity.sum()
+    }
+
+
+def nth_weekday(year, month, weekday, n):
+    """Date of the n-th (or, for n = -1, the last) weekday of a month."""
+    first = pd.Timestamp(year=year, month=month, day=1)
+    days = pd.date_range(first, periods=first.days_in_month)
+    return days[days.dayofweek == weekday][n - 1 if n > 0 else n]
+
+
+def generate_holidays(start=START_DATE, end=END_DATE):
+    """The holiday list as cleaning.ipynb prepares it: an Occassion column indexed by Day."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    days = []
+    for year in range(start.year, end.year + 1):
+        days += [(pd.Timestamp(year=year, month=month, day=day), name) for month, day, name in FIXED_HOLIDAYS]
+        days += [(nth_weekday(year, month, weekday, n), name) for month, weekday, n, name in WEEKDAY_HOLIDAYS]
+    holidays = pd.DataFrame(days, columns=['Day', 'Occassion']).sort_values('Day').set_index('Day')
+    return holidays[(holidays.index >= start) & (holidays.index <= end)]
+
+
+def generate_sale_calendar(start=START_DATE, end=END_DATE, seed=0, sales_per_month=1):
+    """Sale periods of 2 to 8 days as a {year: [(start, end), ...]} calendar, like cleaning.ipynb's."""
+    rng = stream_rng(seed, SALES)
+    calendar = {}
+    for month in pd.date_range(pd.Timestamp(start).replace(day=1), end, freq='MS'):
+        for _ in range(rng.poisson(sales_per_month)):
+            first = month + pd.Timedelta(days=int(rng.integers(0, month.days_in_month)))
+            last = first + pd.Timedelta(days=int(rng.integers(1, 8)))
+            calendar.setdefault(first.year, []).append((first.strftime('%Y-%m-%d'), last.strftime('%Y-%m-%d')))
+    return calendar
+
+
+def generate_media(start=START_DATE, end=END_DATE, seed=0):
+    """Monthly media spend per channel (in crores) with Year and Month columns, as in the media sheet."""
+    rng = stream_rng(seed, MEDIA)
+    months = pd.date_range(pd.Timestamp(start).replace(day=1), end, freq='MS')
+    spend = np.round(np.array(MEDIA_SCALE) * rng.lognormal(0, 0.6, (len(months), len(MEDIA_CHANNELS))), 2)
+    media = pd.DataFrame(spend, columns=MEDIA_CHANNELS)
+    media.insert(0, 'Total Investment', spend.sum(axis=1))
+    media.insert(0, 'Month', months.month)
+    media.insert(0, 'Year', months.year)
+    return media
+
+
+def generate_weather(start=START_DATE, end=END_DATE, seed=0, missing=0.05, base_temp=BASE_TEMP):
+    """
+    Daily station weather with the station exports' columns (and Date/Time), seasonal with noise.
+    - missing: share of values left empty
+    """
+    rng = stream_rng(seed, WEATHER)
+    dates = pd.date_range(start, end, freq='D')
+    n = len(dates)
+    mean = 8 + 14 * np.sin(2 * np.pi * (dates.dayofyear.values - 110) / 365.25) + rng.normal(0, 3, n)
+    precip = np.where(rng.random(n) < 0.35, rng.exponential(5, n), 0)
+    snow = np.where(mean <= 0, precip, 0)
+
+    # Snow on the ground builds up with snowfall and melts on mild days
+    ground = np.zeros(n)
+    for i in range(1, n):
+        ground[i] = max(0.0, ground[i - 1] + snow[i] - max(0.0, mean[i]) * 1.5)
+
+    weather = pd.DataFrame({
+        DATE_COLUMN: dates,
+        'Max Temp (°C)': mean + rng.uniform(2, 8, n),
+        'Min Temp (°C)': mean - rng.uniform(2, 8, n),
+        'Mean Temp (°C)': mean,
+        'Heat Deg Days (°C)': np.maximum(0, base_temp - mean),
+        'Cool Deg Days (°C)': np.maximum(0, mean - base_temp),
+        'Total Rain (mm)': precip - snow,
+        'Total Snow (cm)': snow,
+        'Total Precip (mm)': precip,
+        'Snow on Grnd (cm)': ground
+    }).round(1)
+    values = weather[WEATHER_COLUMNS].to_numpy()
+    values[rng.random(values.shape) < missing] = np.nan
+    weather[WEATHER_COLUMNS] = values
+    return weather
+
+
+def day_weights(start=START_DATE, end=END_DATE, seed=0):
+    """Share of the orders falling on every day: media spend of the month, sale days and holidays."""
+    dates = pd.date_range(start, end, freq='D')
+    media = generate_media(start, end, seed)
+    investment = media['Total Investment'].values / media['Total Investment'].mean()
+    months = (dates.year - dates[0].year) * 12 + dates.month - dates[0].month
+    weights = 1 + investment[months] / (1 + investment[months])
+    weights *= np.where(dates.isin(generate_sale_days(generate_sale_calendar(start, end, seed))), 3.0, 1.0)
+    weights *= np.where(dates.isin(generate_holidays(start, end).index), 1.5, 1.0)
+    return dates, weights / weights.sum()
+
+
+def generate_orders(n_rows, seed=0, chunk_rows=CHUNK_ROWS, n_skus=N_SKUS, dirty=0.01, start=START_DATE, end=END_DATE):
+    """
+    Stream Customers_Orders_Data.csv rows (without its unnamed index column) in chunks.
+    Delivery days are strings with '\\N' for unknown values, as in the raw file.
+    - dirty: share of rows breaking a cleaning rule (one of DIRTY_KINDS each)
+    """
+    skus = generate_skus(n_skus, seed)
+    attributes = sku_attributes(n_skus, seed)
+    customers = stream_rng(seed, CUSTOMERS).integers(-2 ** 63, 2 ** 63 - 1, N_CUSTOMERS, dtype=np.int64)
+    dates, weights = day_weights(start, end, seed)
+    days = dates.values.astype('datetime64[s]').astype(np.int64)
+    fsn_ids = skus['fsn_id'].values
+
+    for i, offset in enumerate(range(0, n_rows, chunk_rows)):
+        n = min(chunk_rows, n_rows - offset)
+        rng = stream_rng(seed, ORDERS, i)
+        sku = rng.choice(n_skus, n, p=attributes['popularity'])
+        seconds = days[rng.choice(len(days), n, p=weights)] + rng.integers(0, 24 * 3600, n)
+        units = 1 + rng.poisson(0.2, n)
+        mrp = attributes['mrp'][sku]
+        gmv = np.round(mrp * (1 - rng.uniform(0, 0.6, n))) * units
+        delivery = [np.where(rng.random(n) < 0.1, '\\N', np.minimum(rng.geometric(0.8, n) - 1, 9).astype(str))
+                    for _ in range(2)]
+        ids = offset + np.arange(n, dtype=np.int64)
+        chunk = pd.DataFrame({
+            'fsn_id': fsn_ids[sku],
+            'order_date': seconds.astype('datetime64[s]').astype('datetime64[ns]'),
+            'order_id': 3000000000000000 + ids * 7,
+            'order_item_id': 3000000000000000 + ids * 7 + rng.integers(0, 7, n),
+            'gmv': gmv,
+            'units': units,
+            'deliverybdays': delivery[0].astype(object),
+            'deliverycdays': delivery[1].astype(object),
+            'order_payment_type': np.where(rng.random(n) < 0.7, 'COD', 'Prepaid').astype(object),
+            'sla': rng.integers(0, 11, n),
+            'cust_id': customers[rng.integers(0, N_CUSTOMERS, n)],
+            'pincode': rng.integers(100000, 1000000, n),
+            'product_mrp': mrp,
+            'product_procurement_sla': attributes['procurement_sla'][sku]
+        })
+        if dirty:
+            add_dirty_rows(chunk, rng, dirty)
+        yield chunk
+
+
+def add_dirty_rows(chunk, rng, share):
+    """Make a share of the rows break one cleaning rule each (in place)."""
+    rows = np.flatnonzero(rng.random(len(chunk)) < share)
+    kinds = np.array(DIRTY_KINDS)[rng.integers(0, len(DIRTY_KINDS), len(rows))]
+    for kind in DIRTY_KINDS:
+        at = rows[kinds == kind]
+        if kind == 'outside_timeframe':
+            # A time in one of the excluded months
+            months = np.array(EXCLUDED_MONTHS, dtype='datetime64[M]')[rng.integers(0, len(EXCLUDED_MONTHS), len(at))]
+            seconds = months.astype('datetime64[s]') + rng.integers(0, 28 * 24 * 3600, len(at)).astype('timedelta64[s]')
+            chunk.iloc[at, chunk.columns.get_loc('order_date')] = seconds.astype('datetime64[ns]')
+        elif kind == 'negative_delivery':
+            chunk.iloc[at, chunk.columns.get_loc('deliverycdays')] = '-5'
+        elif kind == 'non_positive_gmv':
+            chunk.iloc[at, chunk.columns.get_loc('gmv')] = 0.0
+        elif kind == 'non_positive_units':
+            chunk.iloc[at, chunk.columns.get_loc('units')] = 0
+        elif kind == 'non_positive_mrp':
+            chunk.iloc[at, chunk.columns.get_loc('product_mrp')] = 0.0
+        elif kind == 'price_over_mrp':
+            chunk.iloc[at, chunk.columns.get_loc('gmv')] = chunk['product_mrp'].values[at] * chunk['units'].values[at] * 1.5
+        elif kind == 'missing_gmv':
+            chunk.iloc[at, chunk.columns.get_loc('gmv')] = np.nan
+
+
+def build_synthetic_date_dim(start=START_DATE, end=END_DATE, seed=0):
+    """The date dimension of the synthetic holidays and sale calendar (see date_dim.build_date_dim)."""
+    return build_date_dim(start, end, holidays=generate_holidays(start, end),
+                          sale_days=generate_sale_days(generate_sale_calendar(start, end, seed)))
+
+
+def generate_daily_data(n_rows, seed=0, chunk_rows=CHUNK_ROWS, n_skus=N_SKUS, start=START_DATE, end=END_DATE):
+    """
+    Stream cleaned order rows with the schema of cleaning.ipynb's daily_data.csv: clean orders
+    (numeric delivery days, no pincode) with the holiday and sale columns and the product levels.
+    """
+    products = generate_skus(n_skus, seed).drop('product_analytic_super_category', axis=1)
+    dim = build_synthetic_date_dim(start, end, seed)
+    for chunk in generate_orders(n_rows, seed, chunk_rows, n_skus, dirty=0, start=start, end=end):
+        chunk = chunk.drop('pincode', axis=1)
+        for col in ['deliverybdays', 'deliverycdays']:
+            chunk[col] = pd.to_numeric(chunk[col].replace('\\N', 0))
+        chunk = join_date_dim(chunk, dim, 'order_date', ['Occassion', 'Holiday_Week', 'SaleDay'])
+        yield chunk.merge(products, on='fsn_id', how='left')
+
+
+def write_csv_chunks(chunks, path, index_label=None):
+    """Write a stream of chunks to one CSV, with a running row index when index_label is given."""
+    offset = 0
+    with open(path + '.tmp', 'w', newline='') as f:
+        for i, chunk in enumerate(chunks):
+            if index_label is not None:
+                chunk = chunk.set_axis(pd.RangeIndex(offset, offset + len(chunk)))
+            chunk.to_csv(f, header=i == 0, index=index_label is not None, index_label=index_label)
+            offset += len(chunk)
+    os.replace(path + '.tmp', path)
+    return offset
+
+
+def write_station_file(weather, path, station=STATION):
+    """Write weather as a station export: a preamble with the station name, then the table."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(f'"{STATION_COLUMN}","{station}"\n"Climate ID","0000000"\n\n')
+        weather.to_csv(f, index=False)
+
+
+def write_raw_data(raw_dir, size='1M', seed=0, chunk_rows=CHUNK_ROWS, start=START_DATE, end=END_DATE):
+    """
+    Write the raw inputs in the Raw_Data layout: the order file, SKU table, holiday list, media
+    spend and one station weather file per year. Returns {name: path}.
+    """
+    os.makedirs(raw_dir, exist_ok=True)
+    paths = {name: os.path.join(raw_dir, file_name) for name, file_name in [
+        ('orders', 'Customers_Orders_Data.csv'), ('skus', 'SKU_details.csv'),
+        ('holidays', 'Canada Holiday List.csv'), ('media', 'Media data.csv')]}
+
+    # The raw order file carries its row number as an unnamed first column
+    write_csv_chunks(generate_orders(size_rows(size), seed, chunk_rows, start=start, end=end), paths['orders'], index_label='')
+    generate_skus(seed=seed).to_csv(paths['skus'], index=False)
+    generate_holidays(start, end).to_csv(paths['holidays'])
+    generate_media(start, end, seed).to_csv(paths['media'], index=False)
+
+    weather = generate_weather(start, end, seed)
+    for year, part in weather.groupby(weather[DATE_COLUMN].dt.year):
+        paths[f'weather_{year}'] = os.path.join(raw_dir, f'Weather Data SYNTHETIC-{year}.csv')
+        write_station_file(part, paths[f'weather_{year}'])
+    return paths
+
+
+def write_dashboard_inputs(out_dir, size='1M', seed=0, chunk_rows=CHUNK_ROWS, start=START_DATE, end=END_DATE):
+    """Write marketing-analysis.py's inputs (daily_data.csv and weather_combined_missing.csv) to out_dir."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {'orders': os.path.join(out_dir, 'daily_data.csv'),
+             'weather': os.path.join(out_dir, 'weather_combined_missing.csv')}
+    write_csv_chunks(generate_daily_data(size_rows(size), seed, chunk_rows, start=start, end=end), paths['orders'],
+                     index_label='')
+    weather = generate_weather(start, end, seed)
+    weather[['Max Temp (°C)', 'Min Temp (°C)', 'Mean Temp (°C)', 'Total Precip (mm)', 'Snow on Grnd (cm)',
+             'Total Rain (mm)', 'Total Snow (cm)', 'Heat Deg Days (°C)', 'Cool Deg Days (°C)']].to_csv(
+        paths['weather'], index=False)
+    return paths
@@ -0,0 +1,23 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPONENTS_DIR = os.path.join(ROOT_DIR, 'electromart-dashboard', 'electromart-dashboard copy', 'src', 'components')
+ANALYSIS_SCRIPT = os.path.join(COMPONENTS_DIR, 'marketing-analysis.py')
+
+# The helper modules live at the repository root, the dashboard's next to the analysis script
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, COMPONENTS_DIR)
+
+
+@pytest.fixture(scope='session')
+def analysis():
+    """marketing-analysis.py as a module (its file name is not importable)."""
+    spec = importlib.util.spec_from_file_location('marketing_analysis', ANALYSIS_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,25 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from bench_stages import read_baselines, regressions
+
+
+def result(rows_per_s):
+    return {'rows': 100, 'seconds': 100 / rows_per_s, 'rows_per_s': rows_per_s}
+
+
+def test_regressions_and_missing_baselines():
+    baselines = {'sizes': {'1M': {'fast': result(100.0), 'slow': result(100.0)}}}
+    results = {'1M': {'fast': result(90.0), 'slow': result(50.0), 'new': result(10.0)}, '10M': {'fast': result(90.0)}}
+    assert regressions(results, baselines, threshold=0.25) == [
+        ('1M', 'slow', 50.0, 100.0), ('1M', 'new', 10.0, None), ('10M', 'fast', 90.0, None)]
+
+
+def test_every_benchmarked_stage_has_a_baseline():
+    baselines = read_baselines()
+    stages = set(baselines['sizes']['1M'])
+    assert {'category_channel_analysis', 'mm_fit'} <= stages
+    for size in ['1M', '10M', '100M']:
+        assert set(baselines['sizes'][size]) == stages
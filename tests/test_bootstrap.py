@@ -0,0 +1,22 @@
+def stage_names(stages):
+    return [stage.name for stage in stages]
+
+
+def test_bootstrap_stage_is_opt_in(analysis):
+    assert 'bootstrap_channel_impact' not in stage_names(analysis.build_pipeline())
+    stages = {stage.name: stage for stage in analysis.build_pipeline(bootstrap_replicates=200, bootstrap_jobs=1)}
+    assert stages['bootstrap_channel_impact'].params == {'n_replicates': 200, 'n_jobs': 1}
+
+
+def test_results_without_bootstrap_have_no_intervals(analysis):
+    pipeline = analysis.StagePipeline(analysis.build_pipeline())
+    results = analysis.collect_results(pipeline, ['channel_intervals', 'coefficient_intervals'])
+    assert results == {'channel_intervals': None, 'coefficient_intervals': None}
+
+
+def test_cli_bootstrap_options(analysis, monkeypatch):
+    parsed = []
+    monkeypatch.setattr(analysis, 'run_command', parsed.append)
+    analysis.cli(['optimize'])
+    analysis.cli(['--bootstrap', '500', '--bootstrap-jobs', '2', 'optimize'])
+    assert [(args.bootstrap, args.bootstrap_jobs) for args in parsed] == [(0, None), (500, 2)]
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from cleaning_rules import ORDER_RULES, REJECTED_BY, apply_rules, clean_csv
+
+
+def orders():
+    return pd.DataFrame({
+        'order_date': pd.to_datetime(['2023-07-01', '2023-06-15', '2023-08-01', '2023-08-02', '2023-09-01',
+                                      '2023-10-01']),
+        'deliverycdays': [1, 1, -1, 1, 1, 1],
+        'gmv': [100.0, 100.0, 100.0, 0.0, 300.0, 100.0],
+        'units': [1, 1, 1, 1, 1, 2],
+        'product_mrp': [120.0, 120.0, 120.0, 120.0, 200.0, 60.0]
+    }, index=[10, 11, 12, 13, 14, 15])
+
+
+def sequential_drops(frame):
+    """cleaning.ipynb's chain of drops, one rule after the other."""
+    for rule in ORDER_RULES.values():
+        frame = frame[~np.asarray(rule(frame), dtype=bool)]
+    return frame
+
+
+def test_one_pass_matches_sequential_drops():
+    kept, stats = apply_rules(orders())
+    pd.testing.assert_frame_equal(kept, sequential_drops(orders()))
+    assert list(kept.index) == [10, 15]
+    assert stats.loc['outside_timeframe', 'rejected'] == 1
+    assert stats.loc['negative_delivery', 'rejected'] == 1
+    assert stats.loc['non_positive_gmv', 'rejected'] == 1
+    assert stats.loc['price_over_mrp', 'rejected'] == 1
+    assert stats.loc['total', 'rejected'] == 4 and stats.loc['total', 'share'] == 4 / 6
+
+
+def test_rows_breaking_several_rules_count_for_the_first():
+    frame = orders()
+    # Row 12 also breaks non_positive_gmv, after negative_delivery
+    frame.loc[12, 'gmv'] = -5.0
+    _, stats = apply_rules(frame)
+    assert stats.loc['negative_delivery', 'rejected'] == 1
+    assert stats.loc['non_positive_gmv', 'fired'] == 2 and stats.loc['non_positive_gmv', 'rejected'] == 1
+    assert stats.loc['total', 'fired'] == 4
+
+
+def test_quarantine_and_chunked_csv(tmp_path):
+    orders().to_csv(tmp_path / 'orders.csv', index=False)
+    quarantine = tmp_path / 'rejected.csv'
+    kept, stats = clean_csv(str(tmp_path / 'orders.csv'), chunksize=4, quarantine=str(quarantine),
+                            parse_dates=['order_date'])
+    assert len(kept) == 2
+    assert stats.loc['total', 'rejected'] == 4 and stats.loc['total', 'share'] == 4 / 6
+
+    rejected = pd.read_csv(quarantine)
+    assert list(rejected[REJECTED_BY]) == ['outside_timeframe', 'negative_delivery', 'non_positive_gmv',
+                                           'price_over_mrp']
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from datastore import (dataset_exists, partition_fingerprints, partition_row_counts, read_categories, read_dataset,
+                       write_dataset)
+
+
+def orders():
+    return pd.DataFrame({
+        'order_date': pd.to_datetime(['2023-07-01', '2023-07-15', '2023-08-02', '2023-09-30']),
+        'category': pd.Categorical(['Audio', 'Camera', 'Audio', 'Audio'], categories=['Camera', 'Audio', 'Gaming']),
+        'gmv': [10.0, np.nan, 30.0, 40.0],
+        'units': np.array([1, 2, 3, 4], dtype='int32')
+    })
+
+
+def test_round_trip_keeps_dtypes_categories_and_index(tmp_path):
+    frame = orders().set_index('order_date')
+    write_dataset(frame, 'orders', data_dir=str(tmp_path))
+    assert dataset_exists('orders', str(tmp_path))
+    read = read_dataset('orders', data_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(read, frame)
+    # Unused categories and the category order (so the codes) are kept
+    assert list(read_categories('orders', 'category', str(tmp_path))) == ['Camera', 'Audio', 'Gaming']
+
+
+def test_month_partitions(tmp_path):
+    write_dataset(orders(), 'orders', month_from='order_date', data_dir=str(tmp_path))
+    assert partition_row_counts('orders', 'month', str(tmp_path)).to_dict() == {'2023-07': 2, '2023-08': 1, '2023-09': 1}
+    assert list(partition_fingerprints('orders', 'month', str(tmp_path)).index) == ['2023-07', '2023-08', '2023-09']
+
+    # The derived month column is only returned when asked for
+    assert 'month' not in read_dataset('orders', data_dir=str(tmp_path)).columns
+    august = read_dataset('orders', columns=['gmv', 'month'], filters=[('month', '==', '2023-08')],
+                          data_dir=str(tmp_path))
+    assert august.to_dict('list') == {'gmv': [30.0], 'month': ['2023-08']}
+
+
+def test_partition_columns_and_filters(tmp_path):
+    write_dataset(orders(), 'orders', partition_cols=['category'], data_dir=str(tmp_path))
+    audio = read_dataset('orders', filters=[('category', '==', 'Audio')], data_dir=str(tmp_path))
+    assert len(audio) == 3 and audio['category'].dtype == orders()['category'].dtype
+    assert audio['units'].dtype == np.int32
+
+
+def test_rewrite_replaces_the_dataset(tmp_path):
+    write_dataset(orders(), 'orders', month_from='order_date', data_dir=str(tmp_path))
+    write_dataset(orders().iloc[:1], 'orders', month_from='order_date', data_dir=str(tmp_path))
+    assert partition_row_counts('orders', 'month', str(tmp_path)).to_dict() == {'2023-07': 1}
+    assert len(read_dataset('orders', data_dir=str(tmp_path))) == 1
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from date_dim import NO_HOLIDAY, SEASONS, build_date_dim, generate_paydays, generate_sale_days, join_date_dim
+
+
+def test_seasons_by_month(analysis):
+    months = np.arange(1, 13)
+    assert list(SEASONS[months]) == ['Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer', 'Summer', 'Summer',
+                                     'Fall', 'Fall', 'Fall', 'Winter']
+    # marketing-analysis.py uses the same table
+    assert [analysis.get_season(month) for month in months] == list(SEASONS[months])
+
+
+def test_paydays_and_sale_days():
+    assert list(generate_paydays('2023-07-10', '2023-08-01').strftime('%m-%d')) == ['07-01', '07-15', '08-01']
+    sale_days = generate_sale_days({2023: [('2023-07-18', '2023-07-19'), ('2023-07-19', '2023-07-20')]})
+    assert list(sale_days.strftime('%d')) == ['18', '19', '20']
+
+
+def test_build_date_dim():
+    holidays = pd.DataFrame({'Occassion': ['Independence Day']}, index=pd.to_datetime(['2023-08-15']))
+    dim = build_date_dim('2023-08-01', '2023-08-31', holidays=holidays, sale_days=pd.to_datetime(['2023-08-20']))
+    day = dim.set_index('date')
+    assert len(dim) == 31 and dim.index.is_monotonic_increasing
+    assert day.loc['2023-08-15', 'Occassion'] == 'Independence Day'
+    assert day.loc['2023-08-16', 'Occassion'] == NO_HOLIDAY
+    # 2023-08-15 is a Tuesday: its week runs from Monday the 14th to Sunday the 20th
+    assert list(day.index[day['Holiday_Week'] == 1].day) == list(range(14, 21))
+    assert day['SaleDay'].sum() == 1 and day.loc['2023-08-20', 'SaleDay']
+    assert list(day.index[day['Payday'] == 1].day) == [1, 15]
+
+
+def test_join_date_dim():
+    holidays = pd.DataFrame({'Occassion': ['Diwali']}, index=pd.to_datetime(['2023-11-12']))
+    dim = build_date_dim('2023-11-01', '2023-11-30', holidays=holidays)
+    orders = pd.DataFrame({'order_date': pd.to_datetime(['2023-11-12 10:30', '2023-11-02 08:00'])})
+    joined = join_date_dim(orders, dim, 'order_date', ['Occassion', 'Holiday', 'season'])
+    assert list(joined['Occassion']) == ['Diwali', NO_HOLIDAY]
+    assert list(joined['Holiday']) == [1, 0]
+    assert list(joined['season']) == ['Fall', 'Fall']
+    with pytest.raises(ValueError):
+        join_date_dim(pd.DataFrame({'order_date': pd.to_datetime(['2023-12-01'])}), dim, 'order_date', ['Holiday'])
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from key_dictionary import MISSING_CODE, decode_keys, encode_keys, load_dictionary
+
+
+def test_codes_are_stable_and_new_values_are_appended(tmp_path):
+    first = encode_keys(pd.DataFrame({'fsn_id': ['b', 'a', 'b']}), data_dir=str(tmp_path))
+    second = encode_keys(pd.DataFrame({'fsn_id': ['c', 'a']}), data_dir=str(tmp_path))
+    assert first['fsn_id'].tolist() == [0, 1, 0]
+    assert second['fsn_id'].tolist() == [2, 1]
+    assert list(load_dictionary('fsn_id', str(tmp_path))) == ['b', 'a', 'c']
+    assert second['fsn_id'].dtype == np.int32
+
+
+def test_integer_and_float_keys_share_codes(tmp_path):
+    ints = encode_keys(pd.DataFrame({'cust_id': [1, 2]}), data_dir=str(tmp_path))
+    # An id column read with missing values comes back as float
+    floats = encode_keys(pd.DataFrame({'cust_id': [1.0, 2.0, np.nan]}), data_dir=str(tmp_path))
+    strings = encode_keys(pd.DataFrame({'cust_id': ['2', '1']}), data_dir=str(tmp_path))
+    assert ints['cust_id'].tolist() == [0, 1]
+    assert floats['cust_id'].tolist() == [0, 1, MISSING_CODE]
+    assert strings['cust_id'].tolist() == [1, 0]
+    assert list(load_dictionary('cust_id', str(tmp_path))) == ['1', '2']
+
+
+def test_unknown_values_without_update_are_missing(tmp_path):
+    encode_keys(pd.DataFrame({'order_id': ['x']}), data_dir=str(tmp_path))
+    encoded = encode_keys(pd.DataFrame({'order_id': ['x', 'y']}), update=False, data_dir=str(tmp_path))
+    assert encoded['order_id'].tolist() == [0, MISSING_CODE]
+    assert list(load_dictionary('order_id', str(tmp_path))) == ['x']
+
+
+def test_decode_round_trip(tmp_path):
+    frame = pd.DataFrame({'product_analytic_category': pd.Categorical(['Audio', None, 'Camera'])})
+    decoded = decode_keys(encode_keys(frame, data_dir=str(tmp_path)), data_dir=str(tmp_path))
+    assert decoded['product_analytic_category'].tolist()[::2] == ['Audio', 'Camera']
+    assert decoded['product_analytic_category'].isna().tolist() == [False, True, False]
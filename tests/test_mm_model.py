@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from scipy.optimize import minimize
+
+from mm_model import allocate_budget, response
+
+
+def slsqp_allocation(a, budget, lower, upper):
+    """Reference allocation from SLSQP, the solver allocate_budget replaced."""
+    a = np.asarray(a, dtype=float)
+    bounds = list(zip(np.broadcast_to(lower, a.shape), np.broadcast_to(upper, a.shape)))
+    x0 = np.full(len(a), budget / len(a))
+    result = minimize(lambda x: -response(a, x), x0, method='SLSQP', bounds=bounds,
+                      constraints={'type': 'eq', 'fun': lambda x: x.sum() - budget},
+                      options={'ftol': 1e-14, 'maxiter': 1000})
+    return result.x
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_bounded_matches_slsqp(seed):
+    rng = np.random.default_rng(seed)
+    a = rng.uniform(0.1, 10, 6)
+    upper = rng.uniform(0.5, 3, 6)
+    budget = 0.6 * upper.sum()
+    result = allocate_budget(a, budget, 0.0, upper)
+    assert result.success
+    np.testing.assert_allclose(result.x.sum(), budget)
+    assert -result.fun >= response(a, slsqp_allocation(a, budget, 0.0, upper)) - 1e-9
+
+
+def test_unbounded_matches_closed_form():
+    a = np.array([1.0, 2.0, 3.0])
+    result = allocate_budget(a, 5)
+    # Every channel is free: x_i = sqrt(a_i) * (budget + n) / sum_j sqrt(a_j) - 1
+    expected = np.sqrt(a) * (5 + 3) / np.sqrt(a).sum() - 1
+    assert result.success
+    np.testing.assert_allclose(result.x, expected, rtol=1e-12)
+    np.testing.assert_allclose(result.x, slsqp_allocation(a, 5, 0.0, np.inf), atol=1e-5)
+
+
+def test_all_zero_coefficients_spend_the_budget():
+    result = allocate_budget([0.0, 0.0, 0.0], 5)
+    assert result.success
+    assert np.isfinite(result.x).all()
+    np.testing.assert_allclose(result.x.sum(), 5)
+
+
+@pytest.mark.parametrize('upper', [np.inf, 10.0])
+def test_negative_coefficient_stays_at_lower_bound(upper):
+    result = allocate_budget([1.0, -2.0, 3.0], 5, 0.0, upper)
+    assert result.success
+    assert np.isfinite(result.x).all()
+    assert result.x[1] == 0
+    np.testing.assert_allclose(result.x[[0, 2]], allocate_budget([1.0, 3.0], 5, 0.0, upper).x)
+
+
+def test_batched_problems_match_single_ones():
+    a = np.array([[1.0, 2.0, 3.0], [0.0, 0.0, 0.0], [1.0, -2.0, 3.0]])
+    batch = allocate_budget(a, [5, 5, 5])
+    for row, x in zip(a, batch.x):
+        np.testing.assert_allclose(x, allocate_budget(row, 5).x)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model_registry import (CHANNEL_IMPACT_MODEL, MM_ALPHAS_MODEL, allocate_budget_proportional, data_fingerprint,
+                            latest_version, list_versions, load_metadata, load_model, load_score_params,
+                            register_model, score_channel_budget, score_mm_response)
+
+SCORE_PARAMS = {'channels': ['TV', 'Digital', 'Print'], 'impacts': [1.0, 3.0, -2.0], 'baseline_revenue': 50.0,
+                'current_allocation': [10.0, 10.0, 10.0]}
+
+
+def test_versions_and_deduplication(tmp_path):
+    registry_dir = str(tmp_path)
+    frame = pd.DataFrame({'a': [1.0, 2.0]})
+    assert register_model(CHANNEL_IMPACT_MODEL, {'fit': 1}, ['a'], data_fingerprint(frame),
+                          metrics={'r2': 0.5}, score_params=SCORE_PARAMS, registry_dir=registry_dir) == 1
+    # Same data and score parameters: the latest version is returned, nothing is written
+    assert register_model(CHANNEL_IMPACT_MODEL, {'fit': 2}, ['a'], data_fingerprint(frame),
+                          score_params=SCORE_PARAMS, registry_dir=registry_dir) == 1
+    assert register_model(CHANNEL_IMPACT_MODEL, {'fit': 3}, ['a'], data_fingerprint(frame * 2),
+                          score_params=SCORE_PARAMS, registry_dir=registry_dir) == 2
+
+    assert list_versions(CHANNEL_IMPACT_MODEL, registry_dir) == [1, 2]
+    assert latest_version(CHANNEL_IMPACT_MODEL, registry_dir) == 2
+    model, meta = load_model(CHANNEL_IMPACT_MODEL, 1, registry_dir)
+    assert model == {'fit': 1} and meta['metrics'] == {'r2': 0.5} and meta['features'] == ['a']
+    assert load_metadata(CHANNEL_IMPACT_MODEL, registry_dir=registry_dir)['version'] == 2
+    with pytest.raises(FileNotFoundError):
+        latest_version(MM_ALPHAS_MODEL, registry_dir)
+
+
+def test_score_channel_budget(tmp_path):
+    register_model(CHANNEL_IMPACT_MODEL, None, [], 'data', score_params=SCORE_PARAMS, registry_dir=str(tmp_path))
+    params = load_score_params(CHANNEL_IMPACT_MODEL, registry_dir=str(tmp_path))
+    assert params['channels'].tolist() == SCORE_PARAMS['channels']
+
+    result = score_channel_budget([100.0, 200.0], registry_dir=str(tmp_path))
+    # Split in proportion to the positive impacts only
+    np.testing.assert_allclose(result['allocation'], [[25.0, 75.0, 0.0], [50.0, 150.0, 0.0]])
+    np.testing.assert_allclose(result['expected_revenue'], [50.0 + 250.0, 50.0 + 500.0])
+
+
+def test_proportional_allocation_with_caps():
+    impacts = np.array([[1.0, 1.0, 2.0], [-1.0, -1.0, -1.0]])
+    allocation = allocate_budget_proportional(impacts, [100.0, 30.0], caps=[60.0, 60.0, 30.0])
+    # The capped channel is held at its cap and the rest is split among the others
+    np.testing.assert_allclose(allocation[0], [35.0, 35.0, 30.0])
+    # Without a positive impact the budget is split equally
+    np.testing.assert_allclose(allocation[1], [10.0, 10.0, 10.0])
+    # Budgets beyond what the caps can absorb leave every channel at its cap
+    np.testing.assert_allclose(allocate_budget_proportional(impacts[:1], [500.0], caps=[60.0, 60.0, 30.0]),
+                               [[60.0, 60.0, 30.0]])
+
+
+def test_score_mm_response(tmp_path):
+    register_model(MM_ALPHAS_MODEL, None, [], 'data', score_params={
+        'channels': ['TV', 'Digital'], 'categories': ['Audio', 'Camera'], 'alphas': [[1e7, 2e7], [3e7, 4e7]]
+    }, registry_dir=str(tmp_path))
+    result = score_mm_response([1.0, 1.0], categories=['Camera'], registry_dir=str(tmp_path))
+    assert result['alphas'] == [3e7, 4e7]
+    assert result['response'] == pytest.approx(3e7 / 2 + 4e7 / 2)
+    assert score_mm_response(registry_dir=str(tmp_path))['spend'] == [4.0, 6.0]
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+CANDIDATES = {
+    'Linear Regression': ('sklearn.linear_model.LinearRegression', {}),
+    'Ridge': ('sklearn.linear_model.Ridge', {'alpha': 1.0})
+}
+
+
+def history(n=24):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(n, 3)), columns=['a', 'b', 'c'])
+    y = pd.Series(X.values @ [1.0, 2.0, -1.0] + rng.normal(scale=0.1, size=n))
+    return X, y
+
+
+def test_tournament_without_cache_dir_writes_nothing(analysis, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    X, y = history()
+    _, score, _ = analysis.run_model_tournament(X, y, CANDIDATES, n_jobs=1)
+    assert score > 0.9
+    assert os.listdir(tmp_path) == []
+
+
+def test_tournament_caches_models_in_cache_dir(analysis, tmp_path):
+    X, y = history()
+    cache_dir = str(tmp_path / 'models')
+    first = analysis.run_model_tournament(X, y, CANDIDATES, n_jobs=1, cache_dir=cache_dir)
+    # One fit per candidate and fold, plus the refit of the winner
+    assert len(os.listdir(cache_dir)) == 2 * 3 + 1
+    second = analysis.run_model_tournament(X, y, CANDIDATES, n_jobs=1, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(first[2], second[2])
+
+
+def test_pruned_candidates_do_not_shadow_the_result_loop(analysis):
+    X, y = history()
+    candidates = {**CANDIDATES, 'Mean': ('sklearn.dummy.DummyRegressor', {})}
+    _, _, leaderboard = analysis.run_model_tournament(X, y, candidates, n_jobs=1, prune_margin=0.1)
+    pruned = leaderboard.set_index('Model')
+    assert pruned.loc['Mean', 'Pruned'] and pruned.loc['Mean', 'Folds'] == 2
+    assert not pruned.loc['Linear Regression', 'Pruned']
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from datastore import write_dataset
+from monthly_aggregates import finalize_partials, partials_name, refresh_partials, stale_months
+
+SPEC = {'date': 'order_date', 'sum': ['gmv'], 'mean': ['sla'], 'dummies': []}
+
+
+def orders():
+    dates = pd.date_range('2016-01-01', '2016-03-31', freq='D')
+    return pd.DataFrame({'order_date': dates, 'gmv': np.arange(len(dates), dtype=float),
+                         'sla': np.ones(len(dates))})
+
+
+def expected(frame):
+    monthly = frame.set_index('order_date').resample('M')
+    return pd.DataFrame({'gmv': monthly['gmv'].sum(), 'sla': monthly['sla'].mean()})
+
+
+def test_refresh_matches_resample(tmp_path):
+    frame = orders()
+    write_dataset(frame, 'orders', month_from='order_date', data_dir=str(tmp_path))
+    monthly = finalize_partials(refresh_partials('orders', SPEC, data_dir=str(tmp_path)), SPEC)
+    pd.testing.assert_frame_equal(monthly, expected(frame), check_freq=False, check_names=False)
+
+
+def test_unchanged_rewrite_is_not_stale(tmp_path):
+    write_dataset(orders(), 'orders', month_from='order_date', data_dir=str(tmp_path))
+    partials = refresh_partials('orders', SPEC, data_dir=str(tmp_path))
+    write_dataset(orders(), 'orders', month_from='order_date', data_dir=str(tmp_path))
+    assert stale_months('orders', partials, data_dir=str(tmp_path)) == []
+
+
+def test_edit_in_place_is_recomputed(tmp_path):
+    frame = orders()
+    write_dataset(frame, 'orders', month_from='order_date', data_dir=str(tmp_path))
+    partials = refresh_partials('orders', SPEC, data_dir=str(tmp_path))
+
+    # Same row count in every month, one February value replaced
+    frame.loc[frame['order_date'] == '2016-02-10', 'gmv'] = 1000.0
+    write_dataset(frame, 'orders', month_from='order_date', data_dir=str(tmp_path))
+    assert stale_months('orders', partials, data_dir=str(tmp_path)) == ['2016-02']
+
+    monthly = finalize_partials(refresh_partials('orders', SPEC, data_dir=str(tmp_path)), SPEC)
+    pd.testing.assert_frame_equal(monthly, expected(frame), check_freq=False, check_names=False)
+
+
+def test_partials_without_fingerprints_are_stale(tmp_path):
+    write_dataset(orders(), 'orders', month_from='order_date', data_dir=str(tmp_path))
+    partials = refresh_partials('orders', SPEC, data_dir=str(tmp_path)).drop(columns='_fingerprint')
+    write_dataset(partials, partials_name('orders'), data_dir=str(tmp_path))
+    assert stale_months('orders', partials, data_dir=str(tmp_path)) == ['2016-01', '2016-02', '2016-03']
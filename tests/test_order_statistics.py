@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import synthetic_data
+
+QS = [0.8, 0, 1 / 3, 2 / 3, 1]
+
+
+@pytest.fixture(scope='module')
+def gmv():
+    """Synthetic order GMV, with the missing values of the raw file."""
+    chunk = next(synthetic_data.generate_orders(20000, seed=0, chunk_rows=20000, n_skus=500))
+    return chunk['gmv']
+
+
+@pytest.fixture
+def order_file(tmp_path, gmv):
+    path = tmp_path / 'orders.csv'
+    pd.DataFrame({
+        'gmv': gmv,
+        'product_analytic_category': np.where(np.arange(len(gmv)) % 2, 'Camera', 'Audio'),
+        'product_analytic_sub_category': np.where(np.arange(len(gmv)) % 3, 'CameraSub0', 'AudioSub1')
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_select_gmv_ranks_matches_sort(analysis, order_file, gmv):
+    values = np.sort(gmv.dropna().values)
+    ranks = [0, 1, 777, len(values) // 2, len(values) - 1]
+    # Few bins and a small buffer force several narrowing passes
+    selected = analysis.select_gmv_ranks(order_file, 3000, ranks, values.min(), values.max(), n_bins=8, max_buffer=100)
+    assert [selected[r] for r in ranks] == list(values[ranks])
+
+
+def test_exact_order_statistics_match_pandas(analysis, order_file, gmv):
+    stats = analysis.compute_order_statistics(order_file, chunksize=3000)
+    median = gmv.median()
+    filled = gmv.fillna(median)
+    assert stats['gmv_median'] == median
+    np.testing.assert_allclose([stats['gmv_threshold'], *stats['size_edges']], filled.quantile(QS).values)
+    np.testing.assert_allclose(stats['category_revenue'].sort_index().values,
+                               filled.groupby(np.where(np.arange(len(gmv)) % 2, 'Camera', 'Audio')).sum().values)
+
+
+def sketch_rank_errors(sketch, values, qs):
+    """Distance of each q from the range of ranks the sketch's answer covers in the sorted values."""
+    values, qs = np.sort(values), np.asarray(qs)
+    answers = sketch.quantile(qs)
+    low = np.searchsorted(values, answers, side='left') / len(values)
+    high = np.searchsorted(values, answers, side='right') / len(values)
+    return np.maximum(np.maximum(low - qs, qs - high), 0)
+
+
+def test_sketch_rank_error_within_bound(analysis, gmv):
+    values = gmv.dropna().values
+    sketch = analysis.QuantileSketch(k=200, seed=0)
+    for chunk in np.array_split(values, 20):
+        sketch.update(chunk)
+    assert sketch.n == len(values)
+    qs = np.linspace(0.05, 0.95, 19)
+    assert sketch_rank_errors(sketch, values, qs).max() <= 2 * sketch.rank_error
+    assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+
+
+def test_merged_sketches_within_bound(analysis, gmv):
+    values = gmv.dropna().values
+    halves = np.array_split(values, 2)
+    merged = analysis.QuantileSketch(k=200, seed=0).update(halves[0]).merge(analysis.QuantileSketch(k=200, seed=1).update(halves[1]))
+    assert merged.n == len(values)
+    qs = np.linspace(0.05, 0.95, 19)
+    assert sketch_rank_errors(merged, values, qs).max() <= 2 * merged.rank_error
+
+
+def test_sketch_constant_updates_and_round_trip(analysis, gmv):
+    values = gmv.dropna().values
+    sketch = analysis.QuantileSketch(k=200, seed=0).update(values)
+    filled = analysis.QuantileSketch.from_dict(sketch.to_dict(), seed=0).update_constant(1000.0, 5000)
+    assert filled.n == len(values) + 5000
+    reference = np.concatenate([values, np.full(5000, 1000.0)])
+    qs = np.linspace(0.05, 0.95, 19)
+    assert sketch_rank_errors(filled, reference, qs).max() <= 2 * filled.rank_error
+    np.testing.assert_array_equal(analysis.QuantileSketch.from_dict(sketch.to_dict()).quantile(qs), sketch.quantile(qs))
+
+
+@pytest.mark.parametrize('quantile_method', ['exact', 'sketch'])
+def test_order_statistics_without_gmv_are_nan(analysis, tmp_path, quantile_method):
+    path = tmp_path / 'orders.csv'
+    pd.DataFrame({'gmv': [np.nan] * 4, 'product_analytic_category': ['Camera', 'Audio'] * 2,
+                  'product_analytic_sub_category': ['CameraSub0', 'AudioSub1'] * 2}).to_csv(path, index=False)
+    stats = analysis.compute_order_statistics(str(path), chunksize=3, quantile_method=quantile_method)
+    assert np.isnan(stats['gmv_median']) and np.isnan(stats['gmv_threshold'])
+    assert np.isnan(stats['size_edges']).all()
+    assert (stats['category_revenue'] == 0).all() and len(stats['category_revenue']) == 2
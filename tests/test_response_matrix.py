@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from response_matrix import CATEGORY_RESPONSE, CHANNELS, ResponseMatrix
+
+
+def orders():
+    return pd.DataFrame({
+        'product_analytic_category': ['Audio', 'Audio', 'Audio', 'Camera'],
+        'product_analytic_sub_category': ['Speaker', 'Speaker', 'Headphone', 'DSLR'],
+        'product_analytic_vertical': ['Soundbar', 'BoomBox', 'Earbuds', 'Body'],
+        'gmv': [100.0, 50.0, 30.0, 400.0]
+    })
+
+
+def test_top_k_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    matrix = ResponseMatrix(np.arange(50), CHANNELS, rng.uniform(size=(50, 6)), rng.uniform(1, 10, size=50))
+    expected = np.argsort(-matrix.scores(), axis=1)[:, :3]
+    np.testing.assert_array_equal(matrix.top_k(3), expected)
+
+
+def test_from_orders_levels():
+    matrix = ResponseMatrix.from_orders(orders(), 'vertical')
+    frame = matrix.to_frame()
+    assert matrix.shape == (4, len(CHANNELS))
+    assert list(frame.columns) == ['Category', 'Channel', 'Response_Factor', 'product_analytic_vertical', 'Revenue',
+                                   'Effectiveness_Score']
+    # Verticals of a known category inherit its response row
+    audio = frame[frame['Category'] == 'Audio']
+    np.testing.assert_array_equal(audio['Response_Factor'].values.reshape(3, -1),
+                                  np.tile(CATEGORY_RESPONSE['Audio'], (3, 1)))
+    np.testing.assert_allclose(frame['Effectiveness_Score'], frame['Revenue'] * frame['Response_Factor'])
+
+    categories = ResponseMatrix.from_orders(orders(), 'category')
+    assert dict(zip(categories.segments, categories.revenue)) == {'Audio': 180.0, 'Camera': 400.0}
+
+
+def test_top_frame_is_sorted_by_score():
+    top = ResponseMatrix.from_orders(orders(), 'sub_category').top_frame(2)
+    assert len(top) == 3 * 2
+    assert top['Effectiveness_Score'].is_monotonic_decreasing
+    assert (top.groupby('product_analytic_sub_category').size() == 2).all()
+
+
+def test_save_and_load(tmp_path):
+    matrix = ResponseMatrix.from_orders(orders(), 'sub_category')
+    matrix.save(str(tmp_path / 'matrix.npz'))
+    loaded = ResponseMatrix.load(str(tmp_path / 'matrix.npz'))
+    pd.testing.assert_frame_equal(loaded.to_frame(), matrix.to_frame())
+    assert loaded.level == 'sub_category'
+
+
+def test_heatmap_rows_are_the_top_segments(analysis):
+    response_df = ResponseMatrix.from_orders(orders(), 'vertical').to_frame()
+    data = analysis.heatmap_data(response_df, max_segments=2)
+    assert set(data['Segment']) == {'Body', 'Soundbar'}
+    assert list(data.columns) == ['Segment', 'Channel', 'Response_Factor']
+
+
+def test_heatmap_of_sub_category_level_draws(analysis, tmp_path):
+    # Several sub-categories per category: one heatmap row each
+    response_df = ResponseMatrix.from_orders(orders(), 'sub_category').to_frame()
+    data = analysis.heatmap_data(response_df)
+    path = analysis.render_figure('category_channel_heatmap', data, str(tmp_path / 'heatmap.png'))
+    assert (tmp_path / 'heatmap.png').stat().st_size > 0 and path.endswith('heatmap.png')
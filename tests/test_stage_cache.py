@@ -0,0 +1,45 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+
+def test_round_trip_and_miss(analysis, tmp_path):
+    cache = analysis.StageCache(str(tmp_path))
+    frame = pd.DataFrame({'a': [1.0, 2.0]})
+    cache.put('frame', frame)
+    hit, value = cache.get('frame')
+    assert hit
+    pd.testing.assert_frame_equal(value, frame)
+    assert cache.get('missing') == (False, None)
+
+
+def test_least_recently_used_entries_are_evicted(analysis, tmp_path):
+    cache = analysis.StageCache(str(tmp_path), max_bytes=25000)
+    cache.put('a', b'x' * 10000)
+    cache.put('b', b'x' * 10000)
+    # Reading a makes b the least recently used entry
+    os.utime(cache.path('b'), ns=(1, 1))
+    cache.get('a')
+    cache.put('c', b'x' * 10000)
+    assert cache.get('a')[0] and cache.get('c')[0]
+    assert not cache.get('b')[0]
+
+
+def put_many(cache_dir, worker):
+    from marketing_analysis import StageCache
+    cache = StageCache(cache_dir, max_bytes=50000)
+    for i in range(100):
+        cache.put(f'key{(worker * 7 + i) % 40}', b'x' * 10000)
+        cache.get(f'key{i % 40}')
+    return worker
+
+
+def test_concurrent_puts_and_evictions(analysis, tmp_path):
+    # Worker processes share one cache directory, as the model tournament's do
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(put_many, [str(tmp_path)] * 8, range(8))) == list(range(8))
+    sizes = [os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path) if name.endswith('.pkl')]
+    assert sum(sizes) <= 50000 + 10000 * 4
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
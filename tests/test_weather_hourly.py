@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from datastore import read_dataset
+from weather_hourly import HOURLY_FEATURE_COLUMNS, write_hourly_weather
+from weather_ingest import WEATHER_COLUMNS
+
+
+def write_hourly_file(path, days=14):
+    hours = pd.date_range('2023-01-02', periods=24 * days, freq='H')
+    # Warm and cold days alternate around the 18 °C degree-day base
+    temp = np.where(hours.day % 2 == 0, 25.0, -5.0) + np.where(hours.hour < 12, -1.0, 1.0)
+    pd.DataFrame({
+        'Station Name': 'TORONTO CITY',
+        'Date/Time (LST)': hours,
+        'Temp (°C)': temp,
+        'Precip. Amount (mm)': 0.5
+    }).to_csv(path, index=False)
+
+
+def test_daily_table_keeps_the_daily_weather_columns(tmp_path):
+    write_hourly_file(tmp_path / 'hourly.csv')
+    daily, weekly = write_hourly_weather([str(tmp_path / 'hourly.csv')], n_jobs=1, data_dir=str(tmp_path))
+
+    stored = read_dataset('weather_combined', data_dir=str(tmp_path))
+    assert list(stored.columns) == HOURLY_FEATURE_COLUMNS
+    assert HOURLY_FEATURE_COLUMNS[:len(WEATHER_COLUMNS)] == WEATHER_COLUMNS
+    assert list(weekly.columns) == HOURLY_FEATURE_COLUMNS
+    for col in ['Total Rain (mm)', 'Total Snow (cm)', 'Snow on Grnd (cm)']:
+        assert stored[col].isna().all() and stored[col].dtype == float
+
+
+def test_daily_features(tmp_path):
+    write_hourly_file(tmp_path / 'hourly.csv')
+    daily, _ = write_hourly_weather([str(tmp_path / 'hourly.csv')], n_jobs=1, data_dir=str(tmp_path))
+
+    cold = daily.loc['2023-01-03']
+    assert (cold['Min Temp (°C)'], cold['Max Temp (°C)'], cold['Mean Temp (°C)']) == (-6.0, -4.0, -5.0)
+    assert cold['Hours Below Freezing'] == 24
+    assert cold['Heat Deg Days (°C)'] == 23.0 and cold['Cool Deg Days (°C)'] == 0.0
+    assert cold['Total Precip (mm)'] == 12.0
+
+
+def test_weekly_degree_days_are_sums_of_daily_ones(tmp_path):
+    write_hourly_file(tmp_path / 'hourly.csv')
+    daily, weekly = write_hourly_weather([str(tmp_path / 'hourly.csv')], n_jobs=1, data_dir=str(tmp_path))
+
+    expected = daily[['Heat Deg Days (°C)', 'Cool Deg Days (°C)']].resample('W').sum()
+    pd.testing.assert_frame_equal(weekly[['Heat Deg Days (°C)', 'Cool Deg Days (°C)']], expected, check_freq=False)
+    assert weekly['Hours Below Freezing'].sum() == daily['Hours Below Freezing'].sum()
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from weather_impute import BASE_TEMP, fill_weather, interpolate_columns
+from weather_ingest import WEATHER_COLUMNS
+
+
+@pytest.mark.parametrize('limit', [None, 2])
+def test_interpolation_matches_pandas(limit):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(60, 3))
+    values[rng.uniform(size=values.shape) < 0.3] = np.nan
+    values[:2, 0] = np.nan
+    values[-5:, 1] = np.nan
+    index = pd.date_range('2023-01-01', periods=60)
+    expected = pd.DataFrame(values, index=index).interpolate(method='time', limit=limit, limit_direction='forward')
+
+    interpolate_columns(values, index.asi8.astype(float), limit)
+    np.testing.assert_allclose(values, expected.values)
+
+
+def weather(days=400, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2023-01-01', periods=days)
+    mean = 10 + 15 * np.sin(2 * np.pi * np.arange(days) / 365)
+    frame = pd.DataFrame({
+        'Max Temp (°C)': mean + 5, 'Min Temp (°C)': mean - 5, 'Mean Temp (°C)': mean,
+        'Heat Deg Days (°C)': np.maximum(0, BASE_TEMP - mean), 'Cool Deg Days (°C)': np.maximum(0, mean - BASE_TEMP),
+        'Total Rain (mm)': rng.exponential(2, days), 'Total Snow (cm)': rng.exponential(1, days),
+        'Total Precip (mm)': rng.exponential(3, days), 'Snow on Grnd (cm)': rng.exponential(1, days)
+    }, index=index)[WEATHER_COLUMNS]
+    frame = frame.mask(rng.uniform(size=frame.shape) < 0.2)
+    frame.iloc[100:110] = np.nan
+    return frame
+
+
+def test_fill_weather_fills_every_gap_reproducibly():
+    gappy = weather()
+    filled = fill_weather(gappy, seed=1)
+    assert not filled.isna().any().any()
+    pd.testing.assert_frame_equal(fill_weather(gappy, seed=1), filled)
+    assert not filled.equals(fill_weather(gappy, seed=2))
+
+    # Observed values are kept (Total Precip is raised to at least Total Rain), precipitation stays >= 0
+    kept = gappy.columns.drop('Total Precip (mm)')
+    observed = gappy[kept].notna()
+    pd.testing.assert_frame_equal(filled[kept][observed], gappy[kept][observed])
+    assert (filled[['Total Rain (mm)', 'Total Snow (cm)', 'Snow on Grnd (cm)']] >= 0).all().all()
+    assert (filled['Total Precip (mm)'] >= filled['Total Rain (mm)']).all()
+
+    # Missing degree days follow the (filled) mean temperature
+    missing = gappy['Heat Deg Days (°C)'].isna()
+    np.testing.assert_allclose(filled.loc[missing, 'Heat Deg Days (°C)'],
+                               np.maximum(0, BASE_TEMP - filled.loc[missing, 'Mean Temp (°C)']))
+
+
+def test_panel_stations_are_filled_like_single_frames():
+    panel = pd.concat({'A': weather(seed=0), 'B': weather(seed=1)}, axis=1)
+    filled = fill_weather(panel, seed=3)
+    assert not filled.isna().any().any()
+    # Temperatures have no noise, so they match the single-station fill
+    temps = ['Max Temp (°C)', 'Min Temp (°C)', 'Mean Temp (°C)']
+    pd.testing.assert_frame_equal(filled['B'][temps], fill_weather(weather(seed=1), seed=3)[temps])
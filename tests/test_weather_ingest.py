@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from weather_ingest import WEATHER_COLUMNS, find_header, read_weather_files
+
+
+def write_station_file(path, station, dates, preamble=True):
+    lines = []
+    if preamble:
+        lines += [f'"Station Name","{station}"', '"Climate ID","6158355"', '', '"Legend"', '"M","Missing"', '']
+    frame = pd.DataFrame({'Date/Time': pd.DatetimeIndex(dates).strftime('%Y-%m-%d'), 'Data Quality': ''})
+    for i, col in enumerate(WEATHER_COLUMNS):
+        frame[col] = np.arange(len(frame)) + i
+        frame[f'{col} Flag'] = 'M'
+    path.write_text('\n'.join(lines) + ('\n' if lines else '') + frame.to_csv(index=False), encoding='utf-8-sig')
+
+
+def test_find_header_reads_the_preamble(tmp_path):
+    write_station_file(tmp_path / 'toronto.csv', 'TORONTO CITY', pd.date_range('2023-01-01', periods=3))
+    line, header, preamble = find_header(str(tmp_path / 'toronto.csv'))
+    assert line == 6 and header[0] == 'Date/Time'
+    assert preamble['Station Name'] == 'TORONTO CITY' and preamble['Climate ID'] == '6158355'
+
+
+def test_panel_joins_yearly_files_of_a_station(tmp_path):
+    write_station_file(tmp_path / 'toronto-2023.csv', 'TORONTO CITY', pd.date_range('2023-12-30', periods=2))
+    write_station_file(tmp_path / 'toronto-2024.csv', 'TORONTO CITY', pd.date_range('2024-01-01', periods=2))
+    # Without a preamble the station is the file name without its year
+    write_station_file(tmp_path / 'Ottawa-2024.csv', None, pd.date_range('2024-01-02', periods=3), preamble=False)
+    paths = sorted(str(path) for path in tmp_path.glob('*.csv'))
+
+    panel = read_weather_files(paths, n_jobs=1)
+    assert list(panel.columns.get_level_values('station').unique()) == ['Ottawa', 'TORONTO CITY']
+    assert list(panel['TORONTO CITY'].columns) == WEATHER_COLUMNS
+    assert (panel.dtypes == float).all()
+    # Every station on the full date range, missing where it has no reading
+    assert list(panel.index.strftime('%m-%d')) == ['12-30', '12-31', '01-01', '01-02', '01-03', '01-04']
+    np.testing.assert_array_equal(panel['TORONTO CITY']['Max Temp (°C)'], [0, 1, 0, 1, np.nan, np.nan])
+    assert panel['Ottawa']['Max Temp (°C)'].isna().sum() == 3
+
+    pd.testing.assert_frame_equal(read_weather_files(paths, n_jobs=2), panel)
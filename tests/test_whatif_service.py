@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from model_registry import CHANNEL_IMPACT_MODEL, register_model
+from whatif_service import WhatIfService
+
+CHANNELS = ['TV', 'Digital']
+
+
+@pytest.fixture
+def service(tmp_path):
+    registry_dir = str(tmp_path / 'registry')
+    register_model(CHANNEL_IMPACT_MODEL, {}, CHANNELS, 'data', score_params={
+        'channels': CHANNELS, 'impacts': [1.0, 3.0], 'baseline_revenue': 100.0, 'current_allocation': [10.0, 30.0]
+    }, registry_dir=registry_dir)
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    (data_dir / 'category_revenue.json').write_text(json.dumps({'columns': {
+        'product_analytic_category': ['Audio'], 'gmv': [500.0]}}))
+    (data_dir / 'channel_response.json').write_text(json.dumps([
+        {'Category': 'Audio', 'Channel': 'TV', 'Effectiveness_Score': 1.0},
+        {'Category': 'Audio', 'Channel': 'Digital', 'Effectiveness_Score': 2.0}]))
+    return WhatIfService(registry_dir, str(data_dir), cache_size=2)
+
+
+# Replace the allocation handler by a slow one that counts its calls
+def slow_allocation(service, seconds=0.2):
+    calls = []
+    lock = threading.Lock()
+    handler = service.handlers['/allocation']
+
+    def allocation(query):
+        with lock:
+            calls.append(query)
+        time.sleep(seconds)
+        return handler(query)
+
+    service.handlers['/allocation'] = allocation
+    return calls
+
+
+def test_identical_queries_in_flight_are_computed_once(service):
+    calls = slow_allocation(service)
+
+    async def run():
+        return await asyncio.gather(*[service.query('/allocation', {'budget': ['100']}) for _ in range(3)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert results[0] == results[1] == results[2]
+    assert results[0]['allocation'] == [[25.0, 75.0]]
+
+
+def test_least_recently_used_results_are_evicted(service):
+    async def run():
+        for budget in ['1', '2', '1', '3']:
+            await service.query('/allocation', {'budget': [budget]})
+
+    asyncio.run(run())
+    assert [dict(key[2])['budget'] for key in service.cache] == [('1',), ('3',)]
+
+
+def test_results_from_before_a_reload_are_not_cached_or_joined(service):
+    calls = slow_allocation(service)
+
+    async def run():
+        old = asyncio.ensure_future(service.query('/allocation', {'budget': ['100']}))
+        await asyncio.sleep(0.05)
+        await service.query('/reload', {})
+        new = await service.query('/allocation', {'budget': ['100']})
+        return await old, new
+
+    old, new = asyncio.run(run())
+    assert old == new
+    assert len(calls) == 2
+    assert [key[0] for key in service.cache] == [service.generation]
+
+
+def test_waiters_of_a_cancelled_query_compute_it_themselves(service):
+    calls = slow_allocation(service)
+
+    async def run():
+        leader = asyncio.ensure_future(service.query('/allocation', {'budget': ['100']}))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.ensure_future(service.query('/allocation', {'budget': ['100']}))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        return await asyncio.wait_for(waiter, timeout=5)
+
+    result = asyncio.run(run())
+    assert result['allocation'] == [[25.0, 75.0]]
+    assert len(calls) == 2
+    assert not service.in_flight
+
+
+def request(service, raw):
+    async def run():
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(raw)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    status_line, _, body = asyncio.run(run()).partition(b'\r\n\r\n')
+    return int(status_line.split()[1]), json.loads(body)
+
+
+def test_bad_queries_are_answered_with_400(service):
+    status, body = request(service, b'GET /allocation?budget=abc HTTP/1.1\r\nConnection: close\r\n\r\n')
+    assert status == 400 and body == {'error': 'budget must be a number'}
+    status, body = request(service, b'GET /category?name=Camera HTTP/1.1\r\nConnection: close\r\n\r\n')
+    assert status == 400 and body == {'error': 'Unknown category: Camera'}
+    status, _ = request(service, b'garbage\r\n\r\n')
+    assert status == 400
+
+
+def test_forecast_and_category(service):
+    forecast = asyncio.run(service.query('/forecast', {'TV': ['20']}))
+    assert forecast['spend'] == [20.0, 30.0] and forecast['expected_revenue'] == 100.0 + 20.0 + 90.0
+    category = asyncio.run(service.query('/category', {'name': ['Audio'], 'top': ['1']}))
+    assert [row['Channel'] for row in category['channels']] == ['Digital']
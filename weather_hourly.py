@@ -0,0 +1,159 @@
+"""Hourly station weather, streamed down to daily and weekly features.
+
+Hourly exports have 24 times the rows of the daily ones, so they are never loaded
+whole: each file is read in chunks of HOURLY_CHUNK_ROWS rows (only the date,
+temperature and precipitation columns, as float64), and every chunk is reduced to
+per-day partial aggregates (min, max, sum and count of the temperature, hours below
+freezing, precipitation sum). Partials of the same day from different chunks or
+files (e.g. one file per month) are merged, so memory is bounded by one chunk plus
+one row per station-day.
+
+The features have the daily table's columns (weather_ingest.WEATHER_COLUMNS, in
+that order) followed by the extra HOURLY_EXTRA_COLUMNS. Rain, snowfall and snow on
+the ground are not in the hourly exports and stay NaN. So the daily features can
+replace the daily table as the `weather_combined` dataset that create_monthly_data and
+eda.ipynb read, e.g.
+    write_hourly_weather(glob.glob('./Raw_Data/Hourly/*.csv'))
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from datastore import DATA_DIR, write_dataset
+from weather_impute import BASE_TEMP
+from weather_ingest import STATION_COLUMN, WEATHER_COLUMNS, find_header, station_name, weather_panel
+
+HOURLY_DATE_COLUMN = 'Date/Time (LST)'
+HOURLY_TEMP_COLUMN = 'Temp (°C)'
+HOURLY_PRECIP_COLUMN = 'Precip. Amount (mm)'
+HOURLY_CHUNK_ROWS = 100000
+
+# Features only the hourly data provides, after the daily table's columns
+HOURLY_EXTRA_COLUMNS = ['Hours Below Freezing']
+HOURLY_FEATURE_COLUMNS = WEATHER_COLUMNS + HOURLY_EXTRA_COLUMNS
+
+# Per-day partial aggregates and how partials of the same day are merged
+PARTIALS = {'temp_min': 'min', 'temp_max': 'max', 'temp_sum': 'sum', 'temp_count': 'sum',
+            'below_freezing': 'sum', 'precip_sum': 'sum', 'precip_count': 'sum'}
+
+
+def chunk_partials(chunk):
+    """Per-day partial aggregates of a chunk of hourly rows."""
+    days = chunk[HOURLY_DATE_COLUMN].dt.normalize()
+    temp = chunk[HOURLY_TEMP_COLUMN].set_axis(days)
+    precip = chunk[HOURLY_PRECIP_COLUMN].set_axis(days) if HOURLY_PRECIP_COLUMN in chunk else pd.Series(np.nan, index=days)
+    parts = pd.DataFrame({
+        'temp_min': temp,
+        'temp_max': temp,
+        'temp_sum': temp.fillna(0),
+        'temp_count': temp.notna().astype(int),
+        'below_freezing': (temp < 0).astype(int),
+        'precip_sum': precip.fillna(0),
+        'precip_count': precip.notna().astype(int)
+    })
+    return parts.groupby(level=0).agg(PARTIALS)
+
+
+def merge_partials(partials):
+    return pd.concat(partials).groupby(level=0).agg(PARTIALS).sort_index()
+
+
+def read_hourly_file(path, chunksize=HOURLY_CHUNK_ROWS):
+    """One hourly station file as (station, per-day partials), read chunk by chunk."""
+    header_line, header, preamble = find_header(path, marker=HOURLY_DATE_COLUMN)
+    values = [col for col in [HOURLY_TEMP_COLUMN, HOURLY_PRECIP_COLUMN] if col in header]
+    if HOURLY_TEMP_COLUMN not in values:
+        raise ValueError(f'{path} has no {HOURLY_TEMP_COLUMN!r} column')
+    usecols = [HOURLY_DATE_COLUMN] + values + ([STATION_COLUMN] if STATION_COLUMN in header else [])
+
+    station = preamble.get(STATION_COLUMN)
+    partials = []
+    with pd.read_csv(path, skiprows=header_line, usecols=usecols, chunksize=chunksize,
+                     dtype={STATION_COLUMN: 'string', **{col: 'float64' for col in values}},
+                     parse_dates=[HOURLY_DATE_COLUMN], encoding='utf-8-sig') as reader:
+        for chunk in reader:
+            if station is None:
+                station = station_name(path, preamble, chunk.get(STATION_COLUMN))
+            partials.append(chunk_partials(chunk))
+    return station, merge_partials(partials)
+
+
+def partial_features(partials, base_temp=BASE_TEMP):
+    """
+    Daily features (HOURLY_FEATURE_COLUMNS) from merged per-day partials, see weekly_features
+    for weeks. Columns the hourly data does not provide are NaN.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = partials['temp_sum'] / partials['temp_count'].replace(0, np.nan)
+    return pd.DataFrame({
+        'Max Temp (°C)': partials['temp_max'],
+        'Min Temp (°C)': partials['temp_min'],
+        'Mean Temp (°C)': mean,
+        'Heat Deg Days (°C)': np.maximum(0, base_temp - mean),
+        'Cool Deg Days (°C)': np.maximum(0, mean - base_temp),
+        'Total Precip (mm)': partials['precip_sum'].where(partials['precip_count'] > 0),
+        'Hours Below Freezing': partials['below_freezing'].astype(float)
+    }, index=partials.index).reindex(columns=HOURLY_FEATURE_COLUMNS)
+
+
+def weekly_partials(partials):
+    """Merge per-day partials into weeks (ending on Sunday)."""
+    return partials.resample('W').agg(PARTIALS)
+
+
+def weekly_features(partials, base_temp=BASE_TEMP):
+    """
+    Weekly features from merged per-day partials. Temperatures and precipitation come from
+    the weekly partials; degree days are the sums of the daily ones (a degree-day of the
+    weekly mean reads near zero for weeks whose days cross the base temperature).
+    """
+    weekly = partial_features(weekly_partials(partials), base_temp)
+    degree_days = ['Heat Deg Days (°C)', 'Cool Deg Days (°C)']
+    weekly[degree_days] = partial_features(partials, base_temp)[degree_days].resample('W').sum(min_count=1)
+    return weekly
+
+
+def read_hourly_files(paths, chunksize=HOURLY_CHUNK_ROWS, n_jobs=None):
+    """
+    Stream hourly station files (in parallel) down to daily and weekly station x date panels,
+    with the (station, variable) columns of weather_ingest.read_weather_files plus HOURLY_EXTRA_COLUMNS.
+    - n_jobs: worker processes (1 reads in this process)
+    """
+    paths = list(paths)
+    if n_jobs == 1 or len(paths) == 1:
+        files = [read_hourly_file(path, chunksize) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            files = list(executor.map(read_hourly_file, paths, [chunksize] * len(paths)))
+
+    stations = {}
+    for station, partials in files:
+        stations.setdefault(station, []).append(partials)
+    stations = {station: merge_partials(partials) for station, partials in stations.items()}
+
+    daily = weather_panel((station, partial_features(partials)) for station, partials in stations.items())
+    weekly = weather_panel(((station, weekly_features(partials)) for station, partials in stations.items()), freq='W')
+    return daily, weekly
+
+
+def write_hourly_weather(paths, station=None, name='weather_combined', weekly_name='weather_weekly',
+                         chunksize=HOURLY_CHUNK_ROWS, n_jobs=None, data_dir=DATA_DIR):
+    """
+    Write the daily features of one station as the downstream weather table (month-partitioned,
+    like weather.ipynb's export, with its columns plus HOURLY_EXTRA_COLUMNS) and its weekly
+    features next to it. Returns both frames.
+    - station: station to write, may be left out when the files hold a single station
+    """
+    daily, weekly = read_hourly_files(paths, chunksize, n_jobs)
+    stations = daily.columns.get_level_values('station').unique()
+    if station is None:
+        if len(stations) > 1:
+            raise ValueError(f'The files hold {len(stations)} stations, choose one of {list(stations)}')
+        station = stations[0]
+
+    daily, weekly = daily[station], weekly[station]
+    daily.columns.name = weekly.columns.name = None
+    write_dataset(daily, name, month_from='index', data_dir=data_dir)
+    write_dataset(weekly, weekly_name, month_from='index', data_dir=data_dir)
+    return daily, weekly
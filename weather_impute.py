@@ -0,0 +1,143 @@
+"""Gap filling for daily weather, used by weather.ipynb.
+
+All columns of all stations are filled together as one (days x columns) array, for a
+single station's frame or the station x date panel from weather_ingest (columns are
+matched on their last level, the variable name):
+
+- temperatures: linear interpolation across every gap, then Mean Temp from
+  (Max + Min) / 2 where it is still missing
+- precipitation: linear interpolation for the first 2 days of a gap, longer gaps take
+  the week-of-year median plus noise of 10% of the column's standard deviation, kept >= 0;
+  Total Precip is raised to at least Total Rain
+- degree days: computed from Mean Temp against an 18 °C base where missing
+- anything left (e.g. days before a station's first reading) takes the week-of-year
+  median plus noise
+
+Interpolation follows pandas' interpolate (forward direction, trailing gaps hold the
+last value). Week-of-year medians are computed once for every column, and the noise
+comes from one seeded Generator, so the same seed always gives the same panel.
+"""
+import numpy as np
+import pandas as pd
+
+TEMP_COLUMNS = ['Max Temp (°C)', 'Min Temp (°C)', 'Mean Temp (°C)']
+PRECIP_COLUMNS = ['Total Rain (mm)', 'Total Snow (cm)', 'Total Precip (mm)', 'Snow on Grnd (cm)']
+HEAT_DEG_DAYS = 'Heat Deg Days (°C)'
+COOL_DEG_DAYS = 'Cool Deg Days (°C)'
+
+PRECIP_INTERPOLATION_LIMIT = 2
+TEMP_NOISE = 0.5
+PRECIP_NOISE = 0.1
+BASE_TEMP = 18
+
+
+def interpolate_columns(values, times, limit=None):
+    """
+    Linear interpolation of every column of a 2-D array in place, as pandas' interpolate:
+    leading gaps stay missing, trailing gaps hold the last value, and with a limit only the
+    first `limit` days of each gap are filled.
+    """
+    n = len(values)
+    rows = np.arange(n)[:, None]
+    valid = ~np.isnan(values)
+    # Last reading at or before, and first reading at or after, every day
+    before = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    after = np.flip(np.minimum.accumulate(np.flip(np.where(valid, rows, n), axis=0), axis=0), axis=0)
+
+    fill = ~valid & (before >= 0)
+    if limit is not None:
+        fill &= rows - before <= limit
+    cols = np.nonzero(fill)[1]
+    before, after = before[fill], after[fill]
+
+    # Trailing gaps (no later reading) keep the last value
+    after = np.where(after == n, before, after)
+    start, end = values[before, cols], values[after, cols]
+    span = times[after] - times[before]
+    weight = np.divide(times[np.nonzero(fill)[0]] - times[before], span, out=np.zeros(len(span)), where=span > 0)
+    values[fill] = start + (end - start) * weight
+
+
+def seasonal_profile(values, weeks):
+    """Week-of-year median of every column, shape (53, n_columns), computed once."""
+    profile = np.full((53, values.shape[1]), np.nan)
+    for week in np.unique(weeks):
+        rows = values[weeks == week]
+        observed = ~np.isnan(rows).all(axis=0)
+        profile[week - 1, observed] = np.nanmedian(rows[:, observed], axis=0)
+    return profile
+
+
+def fill_seasonal(values, weeks, columns, noise_scale, rng, lower=None):
+    """Fill the remaining gaps of the given columns in place with the week-of-year median plus noise."""
+    block = values[:, columns]
+    profile = seasonal_profile(block, weeks)
+    missing = np.isnan(block)
+    rows, cols = np.nonzero(missing)
+    filled = profile[weeks[rows] - 1, cols] + rng.normal(0, 1, size=len(rows)) * noise_scale[cols]
+    if lower is not None:
+        filled = np.maximum(filled, lower)
+    block[rows, cols] = filled
+    values[:, columns] = block
+
+
+def column_positions(columns, variable):
+    """Positions of a variable for every station, in the order of the stations."""
+    if isinstance(columns, pd.MultiIndex):
+        stations = columns.droplevel(-1).unique()
+        return np.array([columns.get_loc(station + (variable,) if isinstance(station, tuple) else (station, variable))
+                         for station in stations])
+    return np.array([columns.get_loc(variable)])
+
+
+def fill_weather(weather, seed=0, base_temp=BASE_TEMP):
+    """
+    Fill every gap of a daily weather frame (flat columns or a (station, variable) panel).
+    - seed: seed (or numpy Generator) of the seasonal noise, the same seed gives the same result
+    """
+    rng = np.random.default_rng(seed)
+    variables = weather.columns.get_level_values(-1)
+    values = weather.to_numpy(dtype=float, copy=True)
+    times = weather.index.asi8.astype(float)
+    weeks = weather.index.isocalendar().week.to_numpy(dtype=int)
+
+    # Temperatures: linear interpolation across every gap
+    temps = np.nonzero(variables.isin(TEMP_COLUMNS))[0]
+    block = values[:, temps]
+    interpolate_columns(block, times)
+    values[:, temps] = block
+
+    # Mean Temp from Max and Min where it is still missing
+    if set(TEMP_COLUMNS) <= set(variables):
+        mean, high, low = (column_positions(weather.columns, col) for col in
+                           ['Mean Temp (°C)', 'Max Temp (°C)', 'Min Temp (°C)'])
+        values[:, mean] = np.where(np.isnan(values[:, mean]), (values[:, high] + values[:, low]) / 2, values[:, mean])
+
+    # Precipitation: short gaps are interpolated, longer ones take the seasonal median plus noise
+    precip = np.nonzero(variables.isin(PRECIP_COLUMNS))[0]
+    block = values[:, precip]
+    interpolate_columns(block, times, limit=PRECIP_INTERPOLATION_LIMIT)
+    values[:, precip] = block
+    std = np.nanstd(block, axis=0, ddof=1) if len(block) > 1 else np.zeros(len(precip))
+    noise = np.where(std > 0, std * PRECIP_NOISE, PRECIP_NOISE)
+    fill_seasonal(values, weeks, precip, noise, rng, lower=0)
+
+    # Total Precip should be >= Total Rain
+    if {'Total Precip (mm)', 'Total Rain (mm)'} <= set(variables):
+        total, rain = column_positions(weather.columns, 'Total Precip (mm)'), column_positions(weather.columns, 'Total Rain (mm)')
+        values[:, total] = np.where(values[:, total] < values[:, rain], values[:, rain], values[:, total])
+
+    # Degree days from Mean Temp where they are missing
+    if 'Mean Temp (°C)' in set(variables):
+        mean = values[:, column_positions(weather.columns, 'Mean Temp (°C)')]
+        for col, degree_days in [(HEAT_DEG_DAYS, np.maximum(0, base_temp - mean)),
+                                 (COOL_DEG_DAYS, np.maximum(0, mean - base_temp))]:
+            if col in set(variables):
+                positions = column_positions(weather.columns, col)
+                values[:, positions] = np.where(np.isnan(values[:, positions]), degree_days, values[:, positions])
+
+    # Anything still missing (e.g. before a station's first reading) takes the seasonal median
+    if np.isnan(values).any():
+        fill_seasonal(values, weeks, np.arange(values.shape[1]), np.where(variables.isin(TEMP_COLUMNS), TEMP_NOISE, 0.0), rng)
+
+    return pd.DataFrame(values, index=weather.index, columns=weather.columns)
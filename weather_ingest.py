@@ -0,0 +1,112 @@
+"""Parallel ingestion of daily station weather files for weather.ipynb.
+
+The station exports (e.g. `Weather Data ONTARIO-2023.csv`) start with a metadata
+preamble (station name, climate ID, legend, ...) before the real header row. The
+header is found by streaming the first lines of each file, then only the value
+columns are parsed, straight into float64, so flag and gust columns are never read.
+
+Files are parsed in a process pool and combined into a station x date panel:
+a daily DataFrame whose columns are a (station, variable) MultiIndex, with several
+years of the same station joined into one column block, e.g.
+    panel = read_weather_files(glob.glob('./Raw_Data/*.csv'))
+    weather = panel['TORONTO CITY']
+"""
+import csv
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+DATE_COLUMN = 'Date/Time'
+STATION_COLUMN = 'Station Name'
+
+# Daily values kept from every file, all parsed as float64
+WEATHER_COLUMNS = ['Max Temp (°C)', 'Min Temp (°C)', 'Mean Temp (°C)', 'Heat Deg Days (°C)', 'Cool Deg Days (°C)',
+                   'Total Rain (mm)', 'Total Snow (cm)', 'Total Precip (mm)', 'Snow on Grnd (cm)']
+
+# The header is expected within the first lines of a file
+MAX_PREAMBLE_LINES = 200
+
+
+def find_header(path, marker=DATE_COLUMN, max_lines=MAX_PREAMBLE_LINES):
+    """
+    Stream the start of a file up to its header row.
+    Returns the line number of the header, the header fields and the preamble as a
+    {key: value} dict (e.g. {'Station Name': 'TORONTO CITY', 'Climate ID': '6158355'}).
+    """
+    preamble = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for line_number, row in enumerate(csv.reader(f)):
+            if marker in row:
+                return line_number, row, preamble
+            if line_number >= max_lines:
+                break
+            if len(row) >= 2 and row[0]:
+                preamble[row[0].strip()] = row[1].strip()
+    raise ValueError(f'No header row with {marker!r} in the first {max_lines} lines of {path}')
+
+
+def station_name(path, preamble, stations=None):
+    """Station from the preamble or the station column, else the file name without its year."""
+    if STATION_COLUMN in preamble:
+        return preamble[STATION_COLUMN]
+    if stations is not None and stations.notna().any():
+        return stations.dropna().iloc[0]
+    # Yearly files of the same station then share it
+    return re.sub(r'[-_ ]*\d{4}$', '', os.path.splitext(os.path.basename(path))[0])
+
+
+def read_station_file(path, columns=WEATHER_COLUMNS):
+    """One station file as (station, daily float64 frame indexed by date)."""
+    header_line, header, preamble = find_header(path)
+    missing = [col for col in columns if col not in header]
+    if missing:
+        raise ValueError(f'{path} has no {missing} columns')
+
+    usecols = [DATE_COLUMN] + list(columns) + ([STATION_COLUMN] if STATION_COLUMN in header else [])
+    weather = pd.read_csv(path, skiprows=header_line, usecols=usecols,
+                          dtype={STATION_COLUMN: 'string', **{col: 'float64' for col in columns}},
+                          parse_dates=[DATE_COLUMN], index_col=DATE_COLUMN, encoding='utf-8-sig')
+    weather.index.name = None
+    station = station_name(path, preamble, weather.get(STATION_COLUMN))
+
+    # Days without any observation (outside the station's reporting period) are not kept
+    weather = weather[list(columns)].dropna(how='all')
+    return station, weather
+
+
+def weather_panel(stations, freq='D'):
+    """
+    Daily (or freq) station x date panel from (station, frame) pairs: every station is reindexed
+    to the full date range, and frames of the same station (e.g. one per year) are joined.
+    """
+    frames = {}
+    for station, weather in stations:
+        frames.setdefault(station, []).append(weather)
+
+    joined = {}
+    for station, parts in frames.items():
+        weather = pd.concat(parts).sort_index()
+        joined[station] = weather[~weather.index.duplicated(keep='last')]
+
+    start = min(weather.index.min() for weather in joined.values())
+    end = max(weather.index.max() for weather in joined.values())
+    dates = pd.date_range(start=start, end=end, freq=freq)
+    panel = pd.concat({station: weather.reindex(dates) for station, weather in joined.items()}, axis=1)
+    panel.columns.names = ['station', None]
+    return panel
+
+
+def read_weather_files(paths, columns=WEATHER_COLUMNS, n_jobs=None):
+    """
+    Parse station files in parallel and build the station x date panel.
+    - n_jobs: worker processes (1 parses in this process)
+    """
+    paths = list(paths)
+    if n_jobs == 1 or len(paths) == 1:
+        stations = [read_station_file(path, columns) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            stations = list(executor.map(read_station_file, paths, [columns] * len(paths)))
+    return weather_panel(stations)